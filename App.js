@@ -5,13 +5,16 @@
 import React, { useEffect, useState } from 'react';
 import { View, Text, Linking, StyleSheet } from 'react-native';
 import URL from 'url-parse';
+import { startHeapStatsInterval } from './src/Instrumentation/heapStats';
 
 const ROUTES = {
   '/RenderComponentThroughput':
     require('./src/ReactRender/RenderComponentThroughput').default,
   '/RenderComponentMemory': require('./src/ReactRender/RenderComponentMemory')
     .default,
+  '/RenderWorkload': require('./src/ReactRender/RenderWorkload').default,
   '/TTI': require('./src/TTI/TTIView').default,
+  '/JSKernels': require('./src/JSKernels/JSKernelsView').default,
 };
 
 const NotFoundView = () => (
@@ -34,6 +37,17 @@ function App() {
     setupInitialRoute();
   }, []);
 
+  useEffect(() => {
+    // NOTE: `heapStatsInterval` of any route also logs the heap stats on an
+    // interval, next to the ones logged when the run ends
+    // eslint-disable-next-line no-bitwise
+    const interval = route != null ? route.query.heapStatsInterval | 0 : 0;
+    if (interval <= 0) {
+      return undefined;
+    }
+    return startHeapStatsInterval(interval);
+  }, [route]);
+
   return (
     <View style={styles.container}>
       {route != null && ROUTES[route.pathname] != null ? (
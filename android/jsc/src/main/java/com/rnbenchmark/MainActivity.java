@@ -1,9 +1,14 @@
 package com.rnbenchmark;
 
+import android.net.Uri;
+import android.os.Bundle;
+
 import com.facebook.react.ReactActivity;
 import com.facebook.react.ReactActivityDelegate;
 import com.facebook.react.ReactRootView;
 
+import java.io.File;
+
 public class MainActivity extends ReactActivity {
 
   /**
@@ -15,6 +20,22 @@ public class MainActivity extends ReactActivity {
     return "RNBenchmark";
   }
 
+  @Override
+  protected void onCreate(Bundle savedInstanceState) {
+    // Loads the bundle pushed by start.py, e.g. rnbench://jsc/TTI?bundleFile=<name>
+    // NOTE: Has to be set before the ReactInstanceManager is created
+    Uri data = getIntent().getData();
+    String bundleFile = data != null ? data.getQueryParameter("bundleFile") : null;
+    if (bundleFile != null) {
+      File bundleDir = new File(getExternalFilesDir(null), "bundles");
+      MainApplication.setJSBundleFile(new File(bundleDir, bundleFile).getAbsolutePath());
+    } else {
+      MainApplication.setJSBundleFile(null);
+    }
+    ((MainApplication) getApplication()).onActivityCreate();
+    super.onCreate(savedInstanceState);
+  }
+
   /**
    * Returns the instance of the {@link ReactActivityDelegate}. There the RootView is created and
    * you can specify the rendered you wish to use (Fabric or the older renderer).
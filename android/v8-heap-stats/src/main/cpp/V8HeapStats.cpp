@@ -0,0 +1,65 @@
+// JS heap and GC stats of the V8 isolate running the bundle, for
+// src/Instrumentation/heapStats.js. The functions are called from
+// synchronous native module methods, i.e. on the JS thread while the
+// isolate is entered.
+
+#include <jni.h>
+#include <v8.h>
+
+#include <atomic>
+#include <chrono>
+
+namespace {
+
+std::atomic<bool> sInstalled(false);
+std::atomic<int64_t> sGCCount(0);
+std::atomic<int64_t> sGCTimeNs(0);
+std::chrono::steady_clock::time_point sGCStart;
+
+void onGCPrologue(v8::Isolate *, v8::GCType, v8::GCCallbackFlags) {
+  sGCStart = std::chrono::steady_clock::now();
+}
+
+void onGCEpilogue(v8::Isolate *, v8::GCType, v8::GCCallbackFlags) {
+  auto elapsed = std::chrono::steady_clock::now() - sGCStart;
+  sGCCount += 1;
+  sGCTimeNs +=
+      std::chrono::duration_cast<std::chrono::nanoseconds>(elapsed).count();
+}
+
+} // namespace
+
+extern "C" JNIEXPORT jboolean JNICALL
+Java_com_rnbenchmark_v8heapstats_V8HeapStatsModule_nativeInstall(
+    JNIEnv *, jclass) {
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
+  if (isolate == nullptr) {
+    return JNI_FALSE;
+  }
+  if (!sInstalled.exchange(true)) {
+    isolate->AddGCPrologueCallback(onGCPrologue);
+    isolate->AddGCEpilogueCallback(onGCEpilogue);
+  }
+  return JNI_TRUE;
+}
+
+// Returns [used bytes, total bytes, GC count, GC ms], null without an isolate
+extern "C" JNIEXPORT jdoubleArray JNICALL
+Java_com_rnbenchmark_v8heapstats_V8HeapStatsModule_nativeGetHeapStats(
+    JNIEnv *env, jclass) {
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
+  if (isolate == nullptr) {
+    return nullptr;
+  }
+  v8::HeapStatistics stats;
+  isolate->GetHeapStatistics(&stats);
+  jdouble values[] = {
+      static_cast<jdouble>(stats.used_heap_size()),
+      static_cast<jdouble>(stats.total_heap_size()),
+      static_cast<jdouble>(sGCCount.load()),
+      static_cast<jdouble>(sGCTimeNs.load()) / 1e6,
+  };
+  jdoubleArray result = env->NewDoubleArray(4);
+  env->SetDoubleArrayRegion(result, 0, 4, values);
+  return result;
+}
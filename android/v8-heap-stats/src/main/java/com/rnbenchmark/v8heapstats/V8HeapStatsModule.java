@@ -0,0 +1,57 @@
+package com.rnbenchmark.v8heapstats;
+
+import androidx.annotation.NonNull;
+
+import com.facebook.react.bridge.Arguments;
+import com.facebook.react.bridge.ReactApplicationContext;
+import com.facebook.react.bridge.ReactContextBaseJavaModule;
+import com.facebook.react.bridge.ReactMethod;
+import com.facebook.react.bridge.WritableMap;
+import com.facebook.soloader.SoLoader;
+
+import javax.annotation.Nullable;
+
+/**
+ * Exposes the heap statistics of the V8 isolate to JS, see src/Instrumentation/heapStats.js.
+ * The methods are synchronous, so they run on the JS thread with the isolate entered.
+ */
+public class V8HeapStatsModule extends ReactContextBaseJavaModule {
+  static {
+    SoLoader.loadLibrary("v8heapstats");
+  }
+
+  public V8HeapStatsModule(ReactApplicationContext reactContext) {
+    super(reactContext);
+  }
+
+  @Override
+  public @NonNull String getName() {
+    return "V8HeapStats";
+  }
+
+  /**
+   * Starts counting the GCs and their time, returns false without an isolate on the thread.
+   */
+  @ReactMethod(isBlockingSynchronousMethod = true)
+  public boolean install() {
+    return nativeInstall();
+  }
+
+  @ReactMethod(isBlockingSynchronousMethod = true)
+  public @Nullable WritableMap getHeapStats() {
+    double[] values = nativeGetHeapStats();
+    if (values == null) {
+      return null;
+    }
+    WritableMap stats = Arguments.createMap();
+    stats.putDouble("heap_used", values[0]);
+    stats.putDouble("heap_total", values[1]);
+    stats.putDouble("gc_count", values[2]);
+    stats.putDouble("gc_time", values[3]);
+    return stats;
+  }
+
+  private static native boolean nativeInstall();
+
+  private static native @Nullable double[] nativeGetHeapStats();
+}
@@ -0,0 +1,25 @@
+package com.rnbenchmark.v8heapstats;
+
+import androidx.annotation.NonNull;
+
+import com.facebook.react.ReactPackage;
+import com.facebook.react.bridge.NativeModule;
+import com.facebook.react.bridge.ReactApplicationContext;
+import com.facebook.react.uimanager.ViewManager;
+
+import java.util.Collections;
+import java.util.List;
+
+public class V8HeapStatsPackage implements ReactPackage {
+  @Override
+  public @NonNull List<NativeModule> createNativeModules(
+      @NonNull ReactApplicationContext reactContext) {
+    return Collections.singletonList(new V8HeapStatsModule(reactContext));
+  }
+
+  @Override
+  public @NonNull List<ViewManager> createViewManagers(
+      @NonNull ReactApplicationContext reactContext) {
+    return Collections.emptyList();
+  }
+}
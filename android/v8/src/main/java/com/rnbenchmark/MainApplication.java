@@ -2,6 +2,9 @@ package com.rnbenchmark;
 
 import android.app.Application;
 import android.content.Context;
+import android.os.Build;
+import android.os.Process;
+import android.os.SystemClock;
 import android.util.Log;
 
 import com.facebook.react.PackageList;
@@ -16,9 +19,14 @@ import com.facebook.react.bridge.ReactMarkerConstants;
 import com.facebook.react.modules.systeminfo.AndroidInfoHelpers;
 import com.facebook.soloader.SoLoader;
 import com.rnbenchmark.newarchitecture.MainApplicationReactNativeHost;
+import com.rnbenchmark.v8heapstats.V8HeapStatsPackage;
 
+import java.io.File;
 import java.lang.reflect.InvocationTargetException;
+import java.util.Arrays;
+import java.util.HashSet;
 import java.util.List;
+import java.util.Set;
 
 import javax.annotation.Nullable;
 
@@ -32,6 +40,27 @@ public class MainApplication extends Application implements
   private long mTTIStartTime;
   private long mTTIEndTime;
 
+  // ReactMarkers logged for the TTI phase breakdown, see lib/startup_phases.py
+  private static final Set<String> STARTUP_MARKERS = new HashSet<>(Arrays.asList(
+      "GET_REACT_INSTANCE_MANAGER_START",
+      "CREATE_REACT_CONTEXT_START",
+      "PROCESS_PACKAGES_START",
+      "PROCESS_PACKAGES_END",
+      "CREATE_CATALYST_INSTANCE_START",
+      "CREATE_CATALYST_INSTANCE_END",
+      "JS_BUNDLE_STRING_CONVERT_START",
+      "JS_BUNDLE_STRING_CONVERT_END",
+      "RUN_JS_BUNDLE_START",
+      "RUN_JS_BUNDLE_END",
+      "CONTENT_APPEARED"));
+
+  // JS bundle pushed by start.py, set by MainActivity from the launch link
+  private static @Nullable String sJSBundleFile;
+
+  public static void setJSBundleFile(@Nullable String jsBundleFile) {
+    sJSBundleFile = jsBundleFile;
+  }
+
   private final ReactNativeHost mReactNativeHost = new ReactNativeHost(this) {
     @Override
     public boolean getUseDeveloperSupport() {
@@ -45,6 +74,7 @@ public class MainApplication extends Application implements
       // Packages that cannot be autolinked yet can be added manually here, for example:
       // packages.add(new MyReactNativePackage());
       packages.add(new ReactNativeV8Package());
+      packages.add(new V8HeapStatsPackage());
       return packages;
     }
 
@@ -53,6 +83,15 @@ public class MainApplication extends Application implements
       return "index";
     }
 
+    @Override
+    protected @Nullable String getJSBundleFile() {
+      Log.i("MeasureTTI", "bundleSource=" + (sJSBundleFile != null ? "file" : "asset"));
+      if (sJSBundleFile != null) {
+        return sJSBundleFile;
+      }
+      return super.getJSBundleFile();
+    }
+
     @Override
     protected String getBundleAssetName() {
       final String v8BundleAssetName = V8ExecutorFactory.getBundleAssetName(getApplicationContext(), getUseDeveloperSupport());
@@ -87,7 +126,14 @@ public class MainApplication extends Application implements
 
   @Override
   public void onCreate() {
+    long createTime = SystemClock.uptimeMillis();
     super.onCreate();
+    if (Build.VERSION.SDK_INT >= Build.VERSION_CODES.N) {
+      logStartupMark("PROCESS_START", Process.getStartUptimeMillis());
+    }
+    logStartupMark("APPLICATION_CREATE", createTime);
+    File[] codeCacheFiles = getCodeCacheDir().listFiles();
+    Log.i("MeasureTTI", "codeCacheFiles=" + (codeCacheFiles != null ? codeCacheFiles.length : 0));
     ReactMarker.addListener(this);
     // If you opted-in for the New Architecture, we enable the TurboModule system
     ReactFeatureFlags.useTurboModules = BuildConfig.IS_NEW_ARCHITECTURE_ENABLED;
@@ -124,6 +170,17 @@ public class MainApplication extends Application implements
     }
   }
 
+  /**
+   * Called by MainActivity. A hot launch reuses the ReactInstanceManager, so its TTI starts
+   * from the activity creation instead.
+   */
+  public void onActivityCreate() {
+    logStartupMark("ACTIVITY_CREATE", SystemClock.uptimeMillis());
+    if (getReactNativeHost().hasInstance()) {
+      mTTIStartTime = System.currentTimeMillis();
+    }
+  }
+
   @Override
   public void onTerminate() {
     ReactMarker.removeListener(this);
@@ -135,6 +192,9 @@ public class MainApplication extends Application implements
   //
   @Override
   public void logMarker(ReactMarkerConstants name, @Nullable String tag, int instanceKey) {
+    if (STARTUP_MARKERS.contains(name.name())) {
+      logStartupMark(name.name(), SystemClock.uptimeMillis());
+    }
     if (name == ReactMarkerConstants.GET_REACT_INSTANCE_MANAGER_START) {
       mTTIStartTime = System.currentTimeMillis();
     } else if (name == ReactMarkerConstants.CONTENT_APPEARED) {
@@ -142,4 +202,8 @@ public class MainApplication extends Application implements
       Log.i("MeasureTTI", "TTI=" + (mTTIEndTime - mTTIStartTime));
     }
   }
+
+  private static void logStartupMark(String name, long uptimeMillis) {
+    Log.i("MeasureTTI", "mark=" + name + " t=" + uptimeMillis);
+  }
 }
@@ -1,6 +1,10 @@
+# `integrity` is the npm integrity hash of the tarball,
+# see `npm view <package>@<version> dist.integrity`. A dist without it is
+# installed with a warning, or refused with `--require-dist-integrity`.
 JS_DISTS = {
     "jsc_250230": {
         "download_url": "https://registry.npmjs.org/jsc-android/-/jsc-android-250230.2.1.tgz",
+        "integrity": "sha512-KmxeBlRjwoqCnBBKGsihFtvsBHyUFlBxJPK4FzeYcIuBfdjv6jFys44JITAgSTbQD+vIdwMEfyZklsuQX0yI1Q==",
         "version": "250230.2.1",
         "meta": ("Baseline JIT (but not x86)", "WebKitGTK 2.26.1"),
         "aar_glob": "**/android-jsc/**/*.aar",
@@ -10,8 +14,11 @@ JS_DISTS = {
     },
     "v8_100_jit": {
         "download_url": "https://registry.npmjs.org/v8-android-jit/-/v8-android-jit-10.100.0.tgz",
+        "integrity": None,
         "version": "10.100.0",
         "meta": ("JIT", "V8 10.0.139.9"),
+        # The mksnapshot tools of the prebuilt code cache, a devDependency
+        "tools_package": "v8-android-tools-macos",
         "aar_glob": "**/*.aar",
         "binary_name": "libv8android.so",
         "maven_dist_path": "package/dist",
@@ -19,6 +26,7 @@ JS_DISTS = {
     },
     "v8_100_nointl": {
         "download_url": "https://registry.npmjs.org/v8-android-nointl/-/v8-android-nointl-10.100.0.tgz",
+        "integrity": None,
         "version": "10.100.0",
         "meta": ("V8 Light mode", "V8 10.0.139.9"),
         "aar_glob": "**/*.aar",
@@ -28,6 +36,7 @@ JS_DISTS = {
     },
     "hermes_0110": {
         "download_url": "https://registry.npmjs.org/hermes-engine/-/hermes-engine-0.11.0.tgz",
+        "integrity": "sha512-7aMUlZja2IyLYAcZ69NBnwJAR5ZOYlSllj0oMpx08a8HzxHOys0eKCzfphrf6D0vX1JGO1QQvVsQKe6TkYherw==",
         "version": "0.11.0",
         "meta": ("JIT-less", "bytecode AOT"),
         "aar_glob": "**/android/hermes-release.aar",
@@ -0,0 +1,135 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ApkCache:
+    """Content-addressed store of release APKs
+
+    An APK is keyed by everything which goes into it: the gradle install props,
+    the JS_DISTS entry of the engine, the JS / android sources on disk, and
+    the key of generated inputs, e.g. the TTI data overlay.
+    """
+
+    CACHE_DIR = "apk_cache"
+    EXTENSION = ".apk"
+
+    SOURCE_GLOBS = (
+        "App.js",
+        "index.js",
+        "app.json",
+        "babel.config.js",
+        "metro.config.js",
+        "package.json",
+        "yarn.lock",
+        "src/**/*",
+        "android/build.gradle",
+        "android/settings.gradle",
+        "android/gradle.properties",
+        "android/{app_id}/build.gradle",
+        "android/{app_id}/src/**/*",
+        # Native modules of an app only, e.g. android/v8-heap-stats
+        "android/{app_id}-*/build.gradle",
+        "android/{app_id}-*/src/**/*",
+    )
+
+    # Props which do not change the APK content
+    IGNORED_PROPS = ("verbose", "build_dir")
+
+    @classmethod
+    def compute_key(cls, dist_info, overlay_key=None, **install_props):
+        hasher = hashlib.sha256()
+        props = {
+            k: v for k, v in install_props.items() if k not in cls.IGNORED_PROPS
+        }
+        hasher.update(json.dumps(props, sort_keys=True).encode("utf8"))
+        hasher.update(json.dumps(dist_info, sort_keys=True).encode("utf8"))
+        hasher.update(cls.hash_sources(install_props["app_id"]).encode("utf8"))
+        if overlay_key is not None:
+            hasher.update(overlay_key.encode("utf8"))
+        return hasher.hexdigest()
+
+    @classmethod
+    def hash_sources(cls, app_id):
+        hasher = hashlib.sha256()
+        paths = set()
+        for pattern in cls.SOURCE_GLOBS:
+            paths.update(glob.glob(pattern.format(app_id=app_id), recursive=True))
+        for path in sorted(paths):
+            if not os.path.isfile(path):
+                continue
+            hasher.update(path.encode("utf8"))
+            hasher.update(cls.hash_file(path).encode("utf8"))
+        return hasher.hexdigest()
+
+    @classmethod
+    def hash_file(cls, path):
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    @classmethod
+    def get_path(cls, key):
+        return os.path.abspath(os.path.join(cls.CACHE_DIR, key + cls.EXTENSION))
+
+    @classmethod
+    def lookup(cls, key):
+        path = cls.get_path(key)
+        if os.path.isfile(path):
+            logger.debug("{} hit - {}".format(cls.__name__, path))
+            return path
+        logger.debug("{} miss - {}".format(cls.__name__, key))
+        return None
+
+    @classmethod
+    def store(cls, key, apk_file):
+        os.makedirs(cls.CACHE_DIR, exist_ok=True)
+        path = cls.get_path(key)
+        tmp_path = path + ".tmp"
+        shutil.copyfile(apk_file, tmp_path)
+        os.replace(tmp_path, path)
+        logger.debug("{} store - {}".format(cls.__name__, path))
+        return path
+
+
+class BundleCache(ApkCache):
+    """Content-addressed store of JS bundles and Hermes bytecode
+
+    A bundle is keyed by the JS sources, the entry file, the generated data
+    overlay and the Hermes compiler, if any. The android sources do not go
+    into a bundle.
+    """
+
+    CACHE_DIR = "bundle_cache"
+    EXTENSION = ".bundle"
+
+    SOURCE_GLOBS = (
+        "App.js",
+        "index.js",
+        "app.json",
+        "babel.config.js",
+        "metro.config.js",
+        "package.json",
+        "yarn.lock",
+        "src/**/*",
+    )
+
+    @classmethod
+    def compute_key(cls, overlay_key=None, hermesc=None, entry_file="index.js"):
+        hasher = hashlib.sha256()
+        hasher.update(cls.hash_sources(app_id=None).encode("utf8"))
+        # NOTE: Keeps the keys of the app bundles
+        if entry_file != "index.js":
+            hasher.update(entry_file.encode("utf8"))
+        if overlay_key is not None:
+            hasher.update(overlay_key.encode("utf8"))
+        if hermesc is not None:
+            hasher.update(cls.hash_file(hermesc).encode("utf8"))
+        return hasher.hexdigest()
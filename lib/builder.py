@@ -0,0 +1,108 @@
+import concurrent.futures
+import json
+import os
+import queue
+import typing
+from .logger import get_logger
+from .tools import ApkTool, BundleTool
+from .types import InstallProps
+
+logger = get_logger(__name__)
+
+
+class BuildRequest(typing.NamedTuple):
+    install_props: InstallProps
+    # Identifies builds with the same install props but different sources,
+    # e.g. the TTI bundle size
+    variant: typing.Optional[str] = None
+    # Generated build inputs, e.g. the TTI data, see `ApkTool.build_cached()`
+    overlay: typing.Any = None
+    # Builds the JS bundle on its own and reuses the APK built without the
+    # variant and overlay as a shell, which loads the pushed bundle
+    bundle: bool = False
+    # Hermes compiler for the bundle, None for a plain JS bundle
+    hermesc: typing.Optional[str] = None
+
+    @property
+    def key(self):
+        return (
+            json.dumps(self.install_props, sort_keys=True),
+            self.variant,
+            self.bundle,
+        )
+
+
+class BuildResult(typing.NamedTuple):
+    apk_file: str
+    bundle_file: typing.Optional[str] = None
+
+
+class ApkBuilder:
+    """Builds APKs in background threads while the devices run benchmarks
+
+    Every request returns a future of the BuildResult. Identical requests
+    share one build. With more than one build job, every concurrent gradle
+    invocation gets its own build and project cache directory.
+    """
+
+    BUILD_SLOTS_DIR = os.path.join("android", "build-slots")
+
+    def __init__(self, build_jobs=1):
+        self._build_jobs = build_jobs
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=build_jobs, thread_name_prefix="ApkBuilder"
+        )
+        self._futures = {}
+        self._slots = queue.Queue()
+        for slot in range(build_jobs):
+            self._slots.put(slot)
+
+    def submit(self, request: BuildRequest) -> concurrent.futures.Future:
+        future = self._futures.get(request.key)
+        if future is None:
+            if request.bundle:
+                shell_future = self.submit(BuildRequest(request.install_props))
+                future = self._executor.submit(
+                    self._build_bundle, request, shell_future
+                )
+            else:
+                future = self._executor.submit(self._build, request)
+            self._futures[request.key] = future
+        return future
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _build(self, request: BuildRequest):
+        slot = self._slots.get()
+        try:
+            build_dir = None
+            if self._build_jobs > 1:
+                build_dir = os.path.abspath(
+                    os.path.join(self.BUILD_SLOTS_DIR, str(slot))
+                )
+            logger.debug(
+                "ApkBuilder - build {} {} in slot {}".format(
+                    request.install_props["app_id"], request.variant or "", slot
+                )
+            )
+            apk_file = ApkTool.build_cached(
+                overlay=request.overlay, build_dir=build_dir, **request.install_props
+            )
+            return BuildResult(apk_file)
+        finally:
+            self._slots.put(slot)
+
+    def _build_bundle(self, request: BuildRequest, shell_future):
+        logger.debug(
+            "ApkBuilder - build bundle {} {}".format(
+                request.install_props["app_id"], request.variant or ""
+            )
+        )
+        bundle_file = BundleTool.build_cached(
+            overlay=request.overlay,
+            hermesc=request.hermesc,
+            verbose=request.install_props["verbose"],
+        )
+        # NOTE: The shell is submitted first, so it is not queued behind this
+        return BuildResult(shell_future.result().apk_file, bundle_file)
@@ -0,0 +1,125 @@
+import json
+import os
+import re
+from .logger import get_logger
+from .result_store import ResultStore
+
+logger = get_logger(__name__)
+
+
+class ChartDataGenerator:
+    """Aggregates the result store into the website `ChartData` sections
+
+    Every suite becomes a `ChartData` with one test group per parameter and
+    one `ChartDataGroupSet` per engine, holding the mean of the chart metric
+    from the latest run which measured the (parameter, engine). A section is
+    only rebuilt when its records in the store changed since the last
+    generation. Other sections of the output, e.g. hand written ones, are
+    kept as is.
+    """
+
+    def __init__(self, result_store: ResultStore, suites, state_path):
+        self._store = result_store
+        self._suites = suites
+        self._state_path = state_path
+
+    def generate(self, output_path):
+        chart_data = {}
+        if os.path.exists(output_path):
+            with open(output_path) as f:
+                chart_data = json.load(f)
+        state = self._load_state()
+        output_state = state.get(os.path.abspath(output_path), {})
+
+        for suite in self._suites:
+            fingerprint = self._store.get_suite_fingerprint(suite.name)
+            if fingerprint is None:
+                continue
+            if output_state.get(suite.name) == fingerprint and suite.name in chart_data:
+                logger.debug("ChartDataGenerator - {} is up to date".format(suite.name))
+                continue
+            logger.info("ChartDataGenerator - rebuild {}".format(suite.name))
+            section = self._build_section(suite)
+            comment = chart_data.get(suite.name, {}).get("comment")
+            if comment is not None:
+                section["comment"] = comment
+            chart_data[suite.name] = section
+            output_state[suite.name] = fingerprint
+
+        with open(output_path + ".tmp", "w") as f:
+            f.write(self.dumps(chart_data))
+        os.replace(output_path + ".tmp", output_path)
+        state[os.path.abspath(output_path)] = output_state
+        self._save_state(state)
+
+    def _build_section(self, suite):
+        # NOTE: Records of a resumed run may interleave with a newer run, so
+        # they are grouped by run before the latest run is picked
+        run_order = {
+            run["run_id"]: index for (index, run) in enumerate(self._store.list_runs())
+        }
+        # (parameter, engine) -> run_id -> [sum, count]
+        aggregates = {}
+        for record in self._store.query(suite=suite.name):
+            value = record.metrics.get(suite.chart_metric)
+            if not isinstance(value, (int, float)):
+                continue
+            runs = aggregates.setdefault((record.parameter, record.engine), {})
+            aggregate = runs.setdefault(record.run_id, [0, 0])
+            aggregate[0] += value
+            aggregate[1] += 1
+        # (parameter, engine) -> [sum, count] of the latest run
+        latest = {
+            key: runs[max(runs, key=lambda run_id: run_order.get(run_id, -1))]
+            for (key, runs) in aggregates.items()
+        }
+
+        parameters = sorted(
+            {parameter for (parameter, _) in latest},
+            key=lambda p: (p is not None, p),
+        )
+        engines = []
+        for (_, engine) in latest:
+            if engine not in engines:
+                engines.append(engine)
+
+        data_set = []
+        for engine in engines:
+            group_data = []
+            for parameter in parameters:
+                aggregate = latest.get((parameter, engine))
+                if aggregate is None:
+                    group_data.append(None)
+                    continue
+                mean = aggregate[0] / aggregate[1]
+                group_data.append(
+                    int(mean) if isinstance(aggregate[0], int) else round(mean, 2)
+                )
+            data_set.append({"jsEngine": engine, "groupData": group_data})
+        return {
+            "testGroups": [suite.format_chart_group(p) for p in parameters],
+            "dataSet": data_set,
+        }
+
+    def _load_state(self):
+        if not os.path.exists(self._state_path):
+            return {}
+        with open(self._state_path) as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        with open(self._state_path, "w") as f:
+            json.dump(state, f, indent=2)
+
+    @classmethod
+    def dumps(cls, chart_data):
+        """Dumps as indented JSON but keeps the arrays of scalars on one line"""
+        text = json.dumps(chart_data, indent=2)
+        return (
+            re.sub(
+                r"\[\s+([^\[\]{}]*?)\s+\]",
+                lambda m: "[" + re.sub(r",\s+", ", ", m.group(1)) + "]",
+                text,
+            )
+            + "\n"
+        )
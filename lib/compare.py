@@ -0,0 +1,163 @@
+import collections
+import statistics
+import typing
+from .logger import get_logger
+from .result_store import ResultStore
+from .stats import (
+    bootstrap_median_diff_ci,
+    mann_whitney_min_p_value,
+    mann_whitney_u,
+)
+
+logger = get_logger(__name__)
+
+HIGHER_IS_BETTER = 1
+LOWER_IS_BETTER = -1
+
+
+class Comparison(typing.NamedTuple):
+    suite: str
+    parameter: typing.Any
+    engine: str
+    metric: str
+    baseline: list
+    candidate: list
+    # Relative change of the median, positive when the candidate is larger
+    change: float
+    p_value: typing.Optional[float]
+    is_regression: bool
+    # Bootstrap CI of the median difference, when the U test is too coarse
+    median_diff_ci: typing.Optional[typing.Tuple[float, float]] = None
+
+
+class RegressionDetector:
+    """Compares a candidate run against baseline runs from the result store
+
+    For every (suite, parameter, engine, metric) of the candidate run, the
+    per-iteration samples are compared with the samples of the baseline
+    runs by a two-sided Mann-Whitney U test. A regression is a change of the
+    median in the bad direction larger than `threshold`, which is also
+    significant at `alpha`. When the samples are too few for the U test to
+    ever reach `alpha` (e.g. 3 vs 3), the change is significant if the
+    bootstrap CI of the median difference excludes zero instead. Metrics
+    with less than two samples on either side, e.g. the APK size, are judged
+    by the threshold only.
+
+    Without explicit baseline runs, the `baseline_window` latest runs before
+    the candidate which measured the same configuration are used.
+    """
+
+    def __init__(self, result_store: ResultStore, suites, threshold=0.05, alpha=0.05):
+        self._store = result_store
+        self._suites = {suite.name: suite for suite in suites}
+        self._threshold = threshold
+        self._alpha = alpha
+        self._warned_sample_sizes = set()
+
+    def compare(self, candidate_run_id, baseline_run_ids=None, baseline_window=3):
+        run_order = [run["run_id"] for run in self._store.list_runs()]
+        if candidate_run_id not in run_order:
+            raise RuntimeError("Unknown run - {}".format(candidate_run_id))
+        previous_runs = set(run_order[: run_order.index(candidate_run_id)])
+
+        comparisons = []
+        for suite_name, parameter, engine in self._get_configs(candidate_run_id):
+            suite = self._suites.get(suite_name)
+            if suite is None:
+                continue
+            samples_by_run = collections.OrderedDict()
+            for record in self._store.query(
+                suite=suite_name, parameter=parameter, engine=engine
+            ):
+                samples_by_run.setdefault(record.run_id, []).append(record.metrics)
+            candidate = samples_by_run.get(candidate_run_id, [])
+            if baseline_run_ids is not None:
+                baseline_runs = [r for r in baseline_run_ids if r in samples_by_run]
+            else:
+                baseline_runs = [r for r in samples_by_run if r in previous_runs]
+                baseline_runs = baseline_runs[-baseline_window:]
+            if len(baseline_runs) == 0:
+                logger.debug(
+                    "RegressionDetector - no baseline for {} {} {}".format(
+                        suite_name, parameter, engine
+                    )
+                )
+                continue
+            baseline = [m for run_id in baseline_runs for m in samples_by_run[run_id]]
+
+            for metric, direction in suite.compared_metrics.items():
+                comparison = self._compare_metric(
+                    suite_name,
+                    parameter,
+                    engine,
+                    metric,
+                    direction,
+                    self._get_values(baseline, metric),
+                    self._get_values(candidate, metric),
+                )
+                if comparison is not None:
+                    comparisons.append(comparison)
+        return comparisons
+
+    def _get_configs(self, run_id):
+        configs = []
+        for record in self._store.query(run_ids=[run_id]):
+            config = (record.suite, record.parameter, record.engine)
+            if config not in configs:
+                configs.append(config)
+        return configs
+
+    @classmethod
+    def _get_values(cls, samples, metric):
+        return [
+            m[metric] for m in samples if isinstance(m.get(metric), (int, float))
+        ]
+
+    def _compare_metric(
+        self, suite, parameter, engine, metric, direction, baseline, candidate
+    ):
+        if len(baseline) == 0 or len(candidate) == 0:
+            return None
+        baseline_median = statistics.median(baseline)
+        candidate_median = statistics.median(candidate)
+        if baseline_median == 0:
+            change = 0.0 if candidate_median == 0 else float("inf")
+        else:
+            change = (candidate_median - baseline_median) / abs(baseline_median)
+
+        p_value = None
+        median_diff_ci = None
+        is_significant = True
+        sample_sizes = (len(candidate), len(baseline))
+        if min(sample_sizes) < 2:
+            pass
+        elif mann_whitney_min_p_value(*sample_sizes) < self._alpha:
+            (_, p_value) = mann_whitney_u(candidate, baseline)
+            is_significant = p_value < self._alpha
+        else:
+            if sample_sizes not in self._warned_sample_sizes:
+                self._warned_sample_sizes.add(sample_sizes)
+                logger.warning(
+                    "RegressionDetector - {} vs {} samples cannot reach"
+                    " alpha={} with the U test, use a bootstrap CI instead."
+                    " Raise the iterations or --baseline-window.".format(
+                        sample_sizes[0], sample_sizes[1], self._alpha
+                    )
+                )
+            median_diff_ci = bootstrap_median_diff_ci(
+                candidate, baseline, confidence=1 - self._alpha
+            )
+            is_significant = median_diff_ci[0] > 0 or median_diff_ci[1] < 0
+        is_regression = is_significant and -direction * change > self._threshold
+        return Comparison(
+            suite=suite,
+            parameter=parameter,
+            engine=engine,
+            metric=metric,
+            baseline=baseline,
+            candidate=candidate,
+            change=change,
+            p_value=p_value,
+            is_regression=is_regression,
+            median_diff_ci=median_diff_ci,
+        )
@@ -0,0 +1,173 @@
+import re
+import time
+from .logger import get_logger
+from .tools import AdbTool
+
+logger = get_logger(__name__)
+
+
+class DeviceStateController:
+    """Puts a device into a stable state for measurements and restores it
+
+    `prepare()` records the original settings, turns off animations, keeps
+    the screen on and, on rooted devices, pins the CPU and GPU frequencies to
+    the middle of their available range, which the device can sustain without
+    throttling. `restore()` puts every recorded setting back.
+
+    `read_telemetry()` and `wait_for_cooldown()` are read-only and also work
+    without root.
+    """
+
+    ANIMATION_SETTINGS = (
+        "window_animation_scale",
+        "transition_animation_scale",
+        "animator_duration_scale",
+    )
+    # NOTE: Stays on while plugged in to USB, AC or wireless power
+    STAY_ON_WHILE_PLUGGED_IN = 7
+
+    CPU_POLICY_GLOB = "/sys/devices/system/cpu/cpufreq/policy*"
+    GPU_DEVFREQ_GLOBS = (
+        "/sys/class/kgsl/kgsl-3d0/devfreq",
+        "/sys/class/devfreq/*.gpu",
+        "/sys/class/devfreq/*.mali",
+    )
+
+    def __init__(self, serial=None):
+        self._serial = serial
+        self._saved_settings = {}
+        # (path, value) pairs of the sysfs files to write back, in order
+        self._saved_files = []
+
+    def prepare(self, pin_frequencies=False):
+        for name in self.ANIMATION_SETTINGS + ("stay_on_while_plugged_in",):
+            self._saved_settings[name] = self._shell(
+                "settings get global {}".format(name)
+            ).strip()
+        for name in self.ANIMATION_SETTINGS:
+            self._shell("settings put global {} 0".format(name))
+        self._shell(
+            "settings put global stay_on_while_plugged_in {}".format(
+                self.STAY_ON_WHILE_PLUGGED_IN
+            )
+        )
+        self._shell("input keyevent KEYCODE_WAKEUP")
+        if pin_frequencies and not self._pin_frequencies():
+            logger.warning(
+                "DeviceStateController - [{}] Unable to pin the frequencies"
+                " without root".format(self._serial)
+            )
+
+    def restore(self):
+        for name, value in self._saved_settings.items():
+            if value in ("", "null"):
+                self._shell("settings delete global {}".format(name))
+            else:
+                self._shell("settings put global {} {}".format(name, value))
+        self._saved_settings = {}
+        if len(self._saved_files) > 0:
+            self._write_files(self._saved_files)
+            self._saved_files = []
+
+    def read_telemetry(self):
+        """Returns the battery temperature, thermal status and CPU frequencies"""
+        output = self._shell(
+            "dumpsys battery; echo @@@;"
+            " cat {}/scaling_cur_freq; echo @@@;"
+            " dumpsys thermalservice 2>/dev/null | grep 'Thermal Status'".format(
+                self.CPU_POLICY_GLOB
+            )
+        )
+        battery, freqs, thermal = (output.split("@@@") + ["", ""])[:3]
+        telemetry = {}
+        search = re.search(r"temperature: (\d+)", battery)
+        if search is not None:
+            # NOTE: Reported in tenths of a degree Celsius
+            telemetry["battery_temperature"] = int(search.group(1)) / 10
+        telemetry["cpu_freq_khz"] = [
+            int(freq) for freq in freqs.split() if freq.isdigit()
+        ]
+        search = re.search(r"Thermal Status: (\d+)", thermal)
+        if search is not None:
+            telemetry["thermal_status"] = int(search.group(1))
+        return telemetry
+
+    def wait_for_cooldown(self, max_temperature, timeout=600, interval=10):
+        """Waits for the battery to cool down, returns the seconds waited"""
+        start_time = time.monotonic()
+        while True:
+            temperature = self.read_telemetry().get("battery_temperature")
+            waited = time.monotonic() - start_time
+            if temperature is None or temperature <= max_temperature:
+                return waited
+            if waited >= timeout:
+                logger.warning(
+                    "DeviceStateController - [{}] Still {}C after {}s".format(
+                        self._serial, temperature, int(waited)
+                    )
+                )
+                return waited
+            logger.debug(
+                "DeviceStateController - [{}] {}C, cooling down".format(
+                    self._serial, temperature
+                )
+            )
+            time.sleep(interval)
+
+    def _pin_frequencies(self):
+        writes = []
+        for policy in self._list(self.CPU_POLICY_GLOB):
+            writes += self._plan_pin(
+                policy,
+                "scaling_available_frequencies",
+                "scaling_min_freq",
+                "scaling_max_freq",
+            )
+        for pattern in self.GPU_DEVFREQ_GLOBS:
+            for devfreq in self._list(pattern):
+                writes += self._plan_pin(
+                    devfreq, "available_frequencies", "min_freq", "max_freq"
+                )
+        if len(writes) == 0:
+            return False
+        # NOTE: Recorded first, so a partial failure is restored as well
+        self._saved_files = [
+            (path, self._shell("cat {}".format(path)).strip())
+            for path in dict.fromkeys(path for path, _ in writes)
+        ]
+        # NOTE: The min is written back before the max, so the range stays
+        # valid while restoring
+        self._saved_files.sort(key=lambda item: not item[0].endswith("min_freq"))
+        return self._write_files(writes)
+
+    def _plan_pin(self, directory, available_name, min_name, max_name):
+        available = sorted(
+            int(freq)
+            for freq in self._shell(
+                "cat {}/{}".format(directory, available_name)
+            ).split()
+            if freq.isdigit()
+        )
+        if len(available) == 0:
+            return []
+        freq = available[len(available) // 2]
+        min_path = "{}/{}".format(directory, min_name)
+        max_path = "{}/{}".format(directory, max_name)
+        # NOTE: Widens the range first, so neither write is rejected
+        return [
+            (max_path, available[-1]),
+            (min_path, freq),
+            (max_path, freq),
+        ]
+
+    def _write_files(self, writes):
+        command = "; ".join(
+            "echo {} > {}".format(value, path) for path, value in writes
+        )
+        return AdbTool.root_shell(command, serial=self._serial)
+
+    def _list(self, pattern):
+        return self._shell("ls -d {} 2>/dev/null".format(pattern)).split()
+
+    def _shell(self, command):
+        return AdbTool.shell(command, serial=self._serial)
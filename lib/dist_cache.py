@@ -0,0 +1,181 @@
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import urllib.request
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DistCache:
+    """Downloaded engine dist tarballs, verified by their integrity hash
+
+    Tarballs are kept under CACHE_DIR by file name, so a dist is downloaded
+    once even if `js_dist/` is removed. A mirror directory holding the
+    tarballs by the same file names, e.g. for offline CI, is used before the
+    network. The integrity is an npm / SRI hash like "sha512-<base64>".
+
+    A dist without integrity is installed with a warning, or refused when
+    the integrity is required.
+    """
+
+    CACHE_DIR = "dist_cache"
+    MIRROR_ENV = "RN_BENCH_DIST_MIRROR"
+    REQUIRE_INTEGRITY_ENV = "RN_BENCH_REQUIRE_DIST_INTEGRITY"
+
+    RETRIES = 3
+    # Seconds before the first retry, doubled on every further retry
+    BACKOFF = 5
+
+    @classmethod
+    def fetch(cls, url, integrity=None, mirror=None, require_integrity=False):
+        """Returns the path of the verified tarball of `url`"""
+        require_integrity = require_integrity or bool(
+            os.environ.get(cls.REQUIRE_INTEGRITY_ENV)
+        )
+        if integrity is None and require_integrity:
+            raise RuntimeError(
+                "No integrity recorded for {} - add it to js_dists.py from"
+                " `npm view <package>@<version> dist.integrity`".format(url)
+            )
+        file_name = url.rsplit("/", 1)[-1]
+        path = os.path.abspath(os.path.join(cls.CACHE_DIR, file_name))
+        if os.path.isfile(path):
+            logger.debug("DistCache hit - {}".format(path))
+            cls.verify(path, integrity)
+            return path
+
+        os.makedirs(cls.CACHE_DIR, exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=cls.CACHE_DIR)
+        os.close(tmp_fd)
+        try:
+            mirror = mirror or os.environ.get(cls.MIRROR_ENV)
+            mirror_path = os.path.join(mirror, file_name) if mirror else None
+            if mirror_path is not None and os.path.isfile(mirror_path):
+                logger.debug("DistCache mirror - {}".format(mirror_path))
+                shutil.copyfile(mirror_path, tmp_path)
+            else:
+                cls._download(url, tmp_path)
+            cls.verify(tmp_path, integrity, source=url)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        logger.debug("DistCache store - {}".format(path))
+        return path
+
+    @classmethod
+    def verify(cls, path, integrity, source=None):
+        source = source or path
+        if integrity is None:
+            # NOTE: Prints the hash to record in js_dists.py
+            logger.warning(
+                "DistCache - Unverified {}, its integrity is {}".format(
+                    source, cls.compute_integrity(path)
+                )
+            )
+            return
+        algorithm = integrity.split("-", 1)[0]
+        actual = cls.compute_integrity(path, algorithm)
+        if actual != integrity:
+            os.remove(path)
+            raise RuntimeError(
+                "Integrity mismatch of {} - expected {}, got {}".format(
+                    source, integrity, actual
+                )
+            )
+
+    @classmethod
+    def compute_integrity(cls, path, algorithm="sha512"):
+        hasher = hashlib.new(algorithm)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        return "{}-{}".format(
+            algorithm, base64.b64encode(hasher.digest()).decode("ascii")
+        )
+
+    @classmethod
+    def extract(cls, tarball, output_path):
+        """Extracts the tarball into `output_path`, which appears atomically"""
+        parent = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(parent, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(suffix=".tmp", dir=parent)
+        try:
+            with tarfile.open(tarball) as tar:
+                # NOTE: Rejects absolute paths and links out of the output
+                if hasattr(tarfile, "data_filter"):
+                    tar.extractall(tmp_path, filter="data")
+                else:
+                    tar.extractall(tmp_path)
+            if os.path.isdir(output_path):
+                shutil.rmtree(output_path)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.isdir(tmp_path):
+                shutil.rmtree(tmp_path)
+
+    @classmethod
+    def _download(cls, url, output_path):
+        for attempt in range(cls.RETRIES + 1):
+            logger.debug("DistCache - download {}".format(url))
+            try:
+                with urllib.request.urlopen(url, timeout=60) as response:
+                    with open(output_path, "wb") as f:
+                        shutil.copyfileobj(response, f, 1024 * 1024)
+                return
+            except OSError as e:
+                if attempt >= cls.RETRIES:
+                    raise
+                delay = cls.BACKOFF * 2 ** attempt
+                logger.warning(
+                    "DistCache - download {} failed, retry in {}s - {}".format(
+                        url, delay, e
+                    )
+                )
+                time.sleep(delay)
+
+
+class BinarySizeCache:
+    """Stripped engine binary sizes by (dist, ABI, AAR hash)
+
+    Stripping runs the NDK for every ABI, which dominates `--config-only`.
+    The AAR hash in the key drops the entry when the dist changes.
+    """
+
+    PATH = os.path.join(DistCache.CACHE_DIR, "binary_sizes.json")
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def compute_key(cls, dist_id, abi, aar_hash):
+        return "{}:{}:{}".format(dist_id, abi, aar_hash)
+
+    @classmethod
+    def lookup(cls, key):
+        return cls._load().get(key)
+
+    @classmethod
+    def store(cls, key, size):
+        with cls._lock:
+            sizes = cls._load()
+            sizes[key] = size
+            os.makedirs(os.path.dirname(cls.PATH), exist_ok=True)
+            tmp_path = cls.PATH + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(sizes, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, cls.PATH)
+
+    @classmethod
+    def _load(cls):
+        try:
+            with open(cls.PATH) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
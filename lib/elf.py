@@ -0,0 +1,96 @@
+import struct
+import typing
+
+SHT_NOBITS = 8
+
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+SHF_EXECINSTR = 0x4
+
+# Section categories of `summarize_sections()`, in report order
+SECTION_CATEGORIES = ("text", "rodata", "data", "bss", "debug", "symbols", "other")
+
+
+class ElfSection(typing.NamedTuple):
+    name: str
+    type: int
+    flags: int
+    # Bytes in memory, which is not in the file for SHT_NOBITS, e.g. .bss
+    size: int
+
+
+def read_sections(data) -> typing.List[ElfSection]:
+    """Reads the section headers of an ELF file held in `data`
+
+    Only the headers and the section name table are read, so this works on
+    the bytes of a library read from an APK without writing it to disk.
+    Raises ValueError if `data` is not an ELF file.
+    """
+    if len(data) < 16 or data[:4] != b"\x7fELF":
+        raise ValueError("Not an ELF file")
+    elf_class, byte_order = data[4], data[5]
+    if elf_class not in (1, 2) or byte_order not in (1, 2):
+        raise ValueError("Unsupported ELF class or byte order")
+    endian = "<" if byte_order == 1 else ">"
+    if elf_class == 2:
+        # e_shoff, then e_shentsize, e_shnum, e_shstrndx
+        (sh_offset,) = struct.unpack_from(endian + "Q", data, 0x28)
+        entry_size, count, names_index = struct.unpack_from(endian + "HHH", data, 0x3A)
+        header_format = endian + "IIQQQQIIQQ"
+    else:
+        (sh_offset,) = struct.unpack_from(endian + "I", data, 0x20)
+        entry_size, count, names_index = struct.unpack_from(endian + "HHH", data, 0x2E)
+        header_format = endian + "IIIIIIIIII"
+    if sh_offset == 0 or count == 0:
+        return []
+    if sh_offset + entry_size * count > len(data):
+        raise ValueError("Truncated ELF section headers")
+    if names_index >= count:
+        raise ValueError("Invalid ELF section name table index")
+
+    headers = []
+    for i in range(count):
+        name, sh_type, flags, _, offset, size, *_ = struct.unpack_from(
+            header_format, data, sh_offset + entry_size * i
+        )
+        headers.append((name, sh_type, flags, offset, size))
+
+    _, _, _, names_offset, names_size = headers[names_index]
+    names = bytes(data[names_offset : names_offset + names_size])
+    sections = []
+    for name, sh_type, flags, _, size in headers[1:]:
+        end = names.find(b"\0", name)
+        sections.append(
+            ElfSection(
+                name=names[name:end].decode("utf8", errors="replace"),
+                type=sh_type,
+                flags=flags,
+                size=size,
+            )
+        )
+    return sections
+
+
+def categorize_section(section: ElfSection):
+    if section.name.startswith((".debug", ".zdebug")):
+        return "debug"
+    if section.name in (".symtab", ".strtab"):
+        return "symbols"
+    if not section.flags & SHF_ALLOC:
+        return "other"
+    if section.type == SHT_NOBITS:
+        return "bss"
+    if section.flags & SHF_EXECINSTR:
+        return "text"
+    if section.flags & SHF_WRITE:
+        return "data"
+    # NOTE: Also covers the dynamic symbols, relocations and unwind tables
+    return "rodata"
+
+
+def summarize_sections(sections):
+    """Returns the bytes of every SECTION_CATEGORIES category"""
+    summary = {category: 0 for category in SECTION_CATEGORIES}
+    for section in sections:
+        summary[categorize_section(section)] += section.size
+    return summary
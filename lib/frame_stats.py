@@ -0,0 +1,171 @@
+import re
+import threading
+from .logger import get_logger
+from .stats import percentile
+from .tools import AdbTool
+
+logger = get_logger(__name__)
+
+# Clock ticks per second of /proc/<pid>/stat, USER_HZ is 100 on Android
+CLOCK_TICKS = 100
+
+# Thread names of /proc/<pid>/task/*/stat, the UI thread is the one with the
+# pid as its tid
+JS_THREAD = "mqt_js"
+RENDER_THREAD = "RenderThread"
+
+
+def parse_framestats(output):
+    """Parses the frames of `dumpsys gfxinfo <package> framestats`
+
+    Returns a list of {column: ns} per frame, skipping the frames flagged as
+    invalid, e.g. the first frame of a window.
+    """
+    frames = []
+    for block in output.split("---PROFILEDATA---")[1::2]:
+        lines = [line.strip() for line in block.strip().splitlines()]
+        if len(lines) < 2:
+            continue
+        columns = [column for column in lines[0].split(",") if column]
+        for line in lines[1:]:
+            values = [value for value in line.split(",") if value]
+            if len(values) < len(columns) or not values[0].isdigit():
+                continue
+            frame = dict(zip(columns, (int(value) for value in values)))
+            if frame["Flags"] != 0:
+                continue
+            frames.append(frame)
+    return frames
+
+
+def parse_gfxinfo_summary(output):
+    """Parses the frame counts since the last reset of `dumpsys gfxinfo`"""
+    summary = {}
+    search = re.search(r"Total frames rendered: (\d+)", output)
+    if search is not None:
+        summary["frames"] = int(search.group(1))
+    search = re.search(r"Janky frames: (\d+)", output)
+    if search is not None:
+        summary["janky_frames"] = int(search.group(1))
+    return summary
+
+
+def parse_thread_cpu_times(lines, pid):
+    """Returns {"ui", "js", "render"} CPU ms from /proc/<pid>/task/*/stat"""
+    times = {"ui": 0, "js": 0, "render": 0}
+    for line in lines:
+        # NOTE: The thread name may contain spaces and parentheses
+        head, _, tail = line.rpartition(")")
+        tid, _, name = head.partition(" (")
+        fields = tail.split()
+        if not tid.strip().isdigit() or len(fields) < 13:
+            continue
+        # utime and stime are fields 14 and 15, counting from the tid
+        ms = (int(fields[11]) + int(fields[12])) * 1000 // CLOCK_TICKS
+        if int(tid) == pid:
+            times["ui"] += ms
+        elif name == JS_THREAD:
+            times["js"] += ms
+        elif name == RENDER_THREAD:
+            times["render"] += ms
+    return times
+
+
+class FrameStatsSampler:
+    """Collects the frame timing of a running app in a background thread
+
+    gfxinfo keeps only the last ~120 frames of framestats, so they are polled
+    every `interval` seconds and merged by their IntendedVsync. The frame
+    counts come from the gfxinfo summary, which covers every frame since the
+    app was first seen. CPU time of the UI, JS and render threads is read
+    from /proc at the start and the end.
+
+    Usage:
+        with FrameStatsSampler(app_id) as sampler:
+            start_and_wait_for_the_run()
+        summary = sampler.summary()
+    """
+
+    def __init__(self, app_id, interval=1.0):
+        self._app_id = app_id
+        self._interval = interval
+        # IntendedVsync -> frame
+        self._frames = {}
+        self._pid = None
+        self._start_cpu_times = None
+        self._end_cpu_times = None
+        self._gfxinfo_summary = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(
+            target=self._run, name="FrameStatsSampler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self._stop_event.set()
+        self._thread.join()
+        if self._pid is not None:
+            self._poll()
+            self._gfxinfo_summary = parse_gfxinfo_summary(
+                AdbTool.get_gfxinfo(self._app_id)
+            )
+            self._end_cpu_times = self._read_cpu_times()
+
+    def summary(self):
+        ret = dict(self._gfxinfo_summary)
+        if ret.get("frames"):
+            ret["janky_frames_percent"] = round(
+                ret.get("janky_frames", 0) * 100 / ret["frames"], 2
+            )
+        frames = list(self._frames.values())
+        if len(frames) > 0:
+            durations = [
+                (frame["FrameCompleted"] - frame["IntendedVsync"]) / 1e6
+                for frame in frames
+            ]
+            for p in (50, 90, 95, 99):
+                ret["frame_p{}".format(p)] = round(percentile(durations, p), 2)
+            # NOTE: Input, animation, layout and recording of the draw on the
+            # UI thread, then syncing and drawing on the RenderThread
+            ret["frame_ui_mean"] = round(
+                sum(f["SyncQueued"] - f["IntendedVsync"] for f in frames)
+                / len(frames)
+                / 1e6,
+                2,
+            )
+            ret["frame_render_mean"] = round(
+                sum(f["FrameCompleted"] - f["SyncStart"] for f in frames)
+                / len(frames)
+                / 1e6,
+                2,
+            )
+        if self._start_cpu_times is not None and self._end_cpu_times is not None:
+            for thread, ms in self._end_cpu_times.items():
+                ret["{}_thread_cpu".format(thread)] = (
+                    ms - self._start_cpu_times[thread]
+                )
+        return ret
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self._pid is None:
+                self._pid = AdbTool.get_pid(self._app_id)
+                if self._pid is not None:
+                    # NOTE: Leaves out the frames of a previous run
+                    AdbTool.reset_gfxinfo(self._app_id)
+                    self._start_cpu_times = self._read_cpu_times()
+            else:
+                self._poll()
+            self._stop_event.wait(self._interval)
+
+    def _poll(self):
+        output = AdbTool.get_gfxinfo(self._app_id, framestats=True)
+        for frame in parse_framestats(output):
+            self._frames[frame["IntendedVsync"]] = frame
+
+    def _read_cpu_times(self):
+        return parse_thread_cpu_times(AdbTool.get_thread_stats(self._pid), self._pid)
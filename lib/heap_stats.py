@@ -0,0 +1,86 @@
+import re
+from .tools import AdbTool
+
+_FIELD_PATTERN = re.compile(r"(\w+)=(\S+)")
+
+# Logged field -> result metric, see src/Instrumentation/heapStats.js
+METRICS = {
+    "heap_used": "js_heap_used",
+    "heap_total": "js_heap_total",
+    "gc_count": "gc_count",
+    "gc_time": "gc_time",
+}
+
+
+def parse_heap_stats(lines):
+    """Turns the `HeapStats ...` log lines of one run into a list of dicts
+
+    Every dict has the `at` label (end or interval) and the int fields.
+    """
+    samples = []
+    for line in lines:
+        sample = {}
+        for name, value in _FIELD_PATTERN.findall(line):
+            if name == "at":
+                sample[name] = value
+            elif name in METRICS:
+                sample[name] = int(float(value))
+        if len(sample) > 0:
+            samples.append(sample)
+    return samples
+
+
+def summarize_heap_stats(samples):
+    """Returns the metrics of the last sample, plus the peak of the heap used
+
+    Bytes are reported in KiB, as the PSS of the memory metrics. gc_time is
+    the total GC pause in ms. Empty if the engine logged no stats.
+    """
+    if len(samples) == 0:
+        return {}
+    ends = [sample for sample in samples if sample.get("at") == "end"]
+    last = ends[-1] if len(ends) > 0 else samples[-1]
+    ret = {}
+    for field, metric in METRICS.items():
+        if field in last:
+            ret[metric] = last[field]
+    heap_used = [sample["heap_used"] for sample in samples if "heap_used" in sample]
+    if len(heap_used) > 0:
+        ret["js_heap_peak"] = max(heap_used)
+    for metric in ("js_heap_used", "js_heap_total", "js_heap_peak"):
+        if metric in ret:
+            ret[metric] //= 1024
+    return ret
+
+
+class HeapStatsCollector:
+    """Collects the JS heap stats logged by the app during a run
+
+    Hermes and V8 log them, the summary is empty for JSC.
+
+    Usage:
+        with HeapStatsCollector() as collector:
+            start_and_wait_for_the_run()
+        summary = collector.summary()
+    """
+
+    def __init__(self):
+        self._collector = None
+        self._samples = []
+
+    def __enter__(self):
+        self._collector = AdbTool.get_logcat().collect(
+            r"HeapStats (.*)", tag="ReactNativeJS"
+        )
+        return self
+
+    def __exit__(self, type, value, traceback):
+        matches = self._collector.stop()
+        self._samples = parse_heap_stats(match.group(1) for match in matches)
+
+    @property
+    def samples(self):
+        return list(self._samples)
+
+    def summary(self):
+        return summarize_heap_stats(self._samples)
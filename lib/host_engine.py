@@ -0,0 +1,126 @@
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Where macOS keeps the jsc shell of the system JavaScriptCore
+MACOS_JSC = (
+    "/System/Library/Frameworks/JavaScriptCore.framework/Versions/Current/"
+    "Helpers/jsc"
+)
+
+
+class HostEngine:
+    """A JS engine binary of the host, standing in for the engine of an app
+
+    - hermes: the `hermes` CLI shipped with the hermes-engine dist, i.e. the
+      same engine version as the app
+    - v8: `d8`, or the V8 of `node`, see `version`
+    - jsc: `jsc` of WebKitGTK or macOS
+
+    `$D8`, `$NODE` and `$JSC` override the binaries found on the PATH.
+    """
+
+    # NOTE: Promises of Hermes are behind a flag before 0.12
+    HERMES_ARGS = ("-O", "-w", "-Xes6-promise")
+
+    def __init__(self, app_id, cmd, version):
+        self.app_id = app_id
+        self._cmd = list(cmd)
+        self.version = version
+
+    @property
+    def cmd(self):
+        """The binary and its arguments, equal for dists sharing the binary"""
+        return tuple(self._cmd)
+
+    @classmethod
+    def find(cls, app_id, dist_dir=None):
+        """Returns the host engine of an app id, None if there is none"""
+        if app_id == "hermes":
+            bin_dirs = {"darwin": "osx-bin", "linux": "linux64-bin"}
+            if dist_dir is None or sys.platform not in bin_dirs:
+                return None
+            hermes = os.path.join(dist_dir, "package", bin_dirs[sys.platform], "hermes")
+            if not os.path.isfile(hermes):
+                return None
+            output = cls._read_output([hermes, "--version"])
+            search = re.search(r"release version: (\S+)", output)
+            version = "hermes " + (search.group(1) if search else "unknown")
+            return cls(app_id, [hermes, *cls.HERMES_ARGS], version)
+        if app_id == "v8":
+            d8 = os.environ.get("D8") or shutil.which("d8")
+            if d8:
+                version = cls._read_output([d8, "-e", "print(version())"])
+                return cls(app_id, [d8], "d8 " + version)
+            node = os.environ.get("NODE") or shutil.which("node")
+            if node:
+                version = cls._read_output([node, "-p", "process.versions.v8"])
+                return cls(app_id, [node], "node " + version)
+            return None
+        if app_id == "jsc":
+            jsc = os.environ.get("JSC") or shutil.which("jsc")
+            if jsc is None and os.path.isfile(MACOS_JSC):
+                jsc = MACOS_JSC
+            if jsc:
+                return cls(app_id, [jsc], "jsc " + platform.system())
+            return None
+        return None
+
+    def run(self, script_file, args=None, timeout=None):
+        """Runs a script and returns (stdout, seconds)
+
+        `args` are defined as the `__HOST_ARGS__` global before the script
+        runs, which needs a JS script rather than Hermes bytecode.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if args is not None:
+                # NOTE: Top level vars are not global in node, as in a module
+                prelude = "globalThis.__HOST_ARGS__ = {};\n".format(json.dumps(args))
+                with open(script_file, "rb") as f:
+                    script = f.read()
+                script_file = os.path.join(tmp_dir, "script.js")
+                with open(script_file, "wb") as f:
+                    f.write(prelude.encode("utf8"))
+                    f.write(script)
+            cmd = self._cmd + [script_file]
+            logger.debug("HostEngine::run() - cmd: {}".format(" ".join(cmd)))
+            start_time = time.monotonic()
+            proc = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout
+            )
+            seconds = time.monotonic() - start_time
+        if proc.returncode != 0:
+            raise RuntimeError(
+                "Host engine failed - cmd: {}\n{}".format(
+                    " ".join(cmd), proc.stderr.decode("utf8", errors="replace")
+                )
+            )
+        return (proc.stdout.decode("utf8", errors="replace"), seconds)
+
+    def measure_startup(self):
+        """Returns the seconds to run an empty script, i.e. the process startup"""
+        with tempfile.NamedTemporaryFile("w", suffix=".js", delete=False) as f:
+            f.write(";\n")
+        try:
+            return self.run(f.name)[1]
+        finally:
+            os.unlink(f.name)
+
+    @classmethod
+    def _read_output(cls, cmd):
+        try:
+            output = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30
+            ).stdout.decode("utf8", errors="replace")
+        except (OSError, subprocess.TimeoutExpired):
+            return "unknown"
+        return output.strip() or "unknown"
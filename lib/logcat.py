@@ -0,0 +1,187 @@
+import asyncio
+import atexit
+import concurrent.futures
+import re
+import threading
+import time
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LogcatWaiter:
+    """A pending wait for a log line, returned by `LogcatStream.expect()`"""
+
+    def __init__(self, stream, pattern, timeout):
+        self._stream = stream
+        self.pattern = pattern
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.future = concurrent.futures.Future()
+
+    def result(self):
+        """Blocks until a line matches and returns the `re.Match`
+
+        Raises TimeoutError once the deadline has passed.
+        """
+        timeout = None
+        if self.deadline is not None:
+            timeout = max(0, self.deadline - time.monotonic())
+        try:
+            return self.future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            raise TimeoutError(
+                "Timed out waiting for log - {}".format(self.pattern.pattern)
+            )
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        self._stream._unregister(self)
+        self.future.cancel()
+
+    def _on_match(self, search):
+        """Returns whether the waiter is done with the stream"""
+        try:
+            self.future.set_result(search)
+        except concurrent.futures.InvalidStateError:
+            # Cancelled by the caller in the meantime
+            pass
+        return True
+
+
+class LogcatCollector(LogcatWaiter):
+    """Collects every matching line until stopped, see `LogcatStream.collect()`"""
+
+    def __init__(self, stream, pattern):
+        super().__init__(stream, pattern, None)
+        self._matches = []
+
+    def stop(self):
+        """Stops collecting and returns the `re.Match` of the lines so far"""
+        self.cancel()
+        return list(self._matches)
+
+    def _on_match(self, search):
+        self._matches.append(search)
+        return False
+
+
+class LogcatStream:
+    """A long-lived `adb logcat` reader shared by all waits of a device
+
+    Logs are filtered to `tags` by logcat itself and read on an asyncio loop
+    in a background thread. Every line is only matched against the patterns
+    of the waiters registered at that time, so there is no need to clear the
+    log buffer before a measurement.
+    """
+
+    DEFAULT_TAGS = ("ReactNativeJS", "MeasureTTI")
+
+    def __init__(self, tags=DEFAULT_TAGS):
+        self._tags = tags
+        self._waiters = []
+        self._lock = threading.Lock()
+        self._proc = None
+        self._reader = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="LogcatStream", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def expect(self, regex, tag, timeout=None) -> LogcatWaiter:
+        """Registers a waiter for a line matching `regex` under `tag`
+
+        Only lines arriving after this call are matched. Register the waiter
+        before triggering the log, then block on `LogcatWaiter.result()`.
+        """
+        self._ensure_reader()
+        waiter = LogcatWaiter(self, re.compile(tag + r": " + regex), timeout)
+        with self._lock:
+            self._waiters.append(waiter)
+        return waiter
+
+    def collect(self, regex, tag) -> LogcatCollector:
+        """Registers a collector of all lines matching `regex` under `tag`"""
+        self._ensure_reader()
+        collector = LogcatCollector(self, re.compile(tag + r": " + regex))
+        with self._lock:
+            self._waiters.append(collector)
+        return collector
+
+    def close(self):
+        if self._loop.is_closed() or not self._loop.is_running():
+            return
+        if self._proc is not None and self._proc.returncode is None:
+            self._loop.call_soon_threadsafe(self._proc.terminate)
+            # NOTE: Lets the reader see EOF and finish before the loop stops
+            try:
+                self._reader.result(timeout=5)
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _ensure_reader(self):
+        with self._lock:
+            if self._reader is not None and not self._reader.done():
+                return
+            started = concurrent.futures.Future()
+            self._reader = asyncio.run_coroutine_threadsafe(
+                self._read(started), self._loop
+            )
+        # NOTE: Waits for logcat to be spawned, otherwise lines logged right
+        # after `expect()` may be missed
+        started.result()
+
+    def _unregister(self, waiter):
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    async def _read(self, started):
+        cmd = ["adb", "logcat", "-s"]
+        cmd += ["{}:*".format(tag) for tag in self._tags]
+        logger.debug("LogcatStream - cmd: {}".format(" ".join(cmd)))
+        try:
+            # NOTE: Clears the stale lines once, as the stream dumps the log
+            # buffer before following new lines
+            clear_proc = await asyncio.create_subprocess_exec("adb", "logcat", "-c")
+            await clear_proc.wait()
+            self._proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                limit=1024 * 1024,
+            )
+        except Exception as e:
+            started.set_exception(e)
+            raise
+        started.set_result(True)
+
+        while True:
+            line_in_bytes = await self._proc.stdout.readline()
+            if not line_in_bytes:
+                break
+            self._dispatch(line_in_bytes.decode("utf8", errors="replace"))
+        await self._proc.wait()
+
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.future.done():
+                waiter.future.set_exception(
+                    RuntimeError(
+                        "logcat exited with code {}".format(self._proc.returncode)
+                    )
+                )
+
+    def _dispatch(self, line):
+        with self._lock:
+            waiters = list(self._waiters)
+        for waiter in waiters:
+            if waiter.future.done():
+                continue
+            search = waiter.pattern.search(line)
+            if search is not None and waiter._on_match(search):
+                self._unregister(waiter)
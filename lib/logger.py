@@ -4,6 +4,12 @@ from .colorful import colorful
 
 
 def setup_logger(verbose=False):
+    root_logger = logging.getLogger()
+    # NOTE: Forked worker processes inherit the handler from the parent
+    if len(root_logger.handlers) > 0:
+        root_logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+        return
+
     handler = logging.StreamHandler(sys.stdout)
 
     class LevelFormatter(logging.Formatter):
@@ -17,7 +23,6 @@ def setup_logger(verbose=False):
             return super(LevelFormatter, self).format(record)
 
     handler.setFormatter(LevelFormatter())
-    root_logger = logging.getLogger()
     root_logger.addHandler(handler)
     if verbose:
         root_logger.setLevel(logging.DEBUG)
@@ -0,0 +1,120 @@
+import typing
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+
+class EngineConfig(typing.NamedTuple):
+    name: str
+    app_id: str
+    dist_id: str
+    extra_gradle_props: typing.Tuple[str, ...] = ()
+
+
+class BenchmarkMatrix(typing.NamedTuple):
+    """The engines, suites and run settings of a benchmark run"""
+
+    engines: typing.List[EngineConfig]
+    # Suite name -> suite options, e.g. {"parameters": [10000, 60000]}
+    suites: typing.Dict[str, dict]
+    abis: typing.Tuple[str, ...]
+    devices: typing.List[str]
+    # Keys of ITERATION_KEYS
+    iterations: dict
+
+    def select(self, suites=None, engines=None):
+        """Returns the matrix narrowed to the given suite and engine names"""
+        matrix = self
+        if suites is not None:
+            _check_names("suite", suites, self.suites)
+            matrix = matrix._replace(
+                suites={k: v for k, v in self.suites.items() if k in suites}
+            )
+        if engines is not None:
+            _check_names("engine", engines, [e.name for e in self.engines])
+            matrix = matrix._replace(
+                engines=[e for e in self.engines if e.name in engines]
+            )
+        return matrix
+
+
+APP_IDS = ("jsc", "v8", "hermes")
+DEFAULT_ABIS = ("armeabi-v7a", "arm64-v8a", "x86", "x86_64")
+ENGINE_KEYS = ("name", "app_id", "dist_id", "extra_gradle_props")
+ITERATION_KEYS = ("min", "max", "target_ci", "time_budget")
+TOP_LEVEL_KEYS = ("abis", "devices", "iterations", "engines", "suites")
+
+
+def load_matrix(path, dist_ids, suite_options) -> BenchmarkMatrix:
+    """Loads and validates a TOML matrix file, see benchmark.toml
+
+    `suite_options` maps every known suite name to its option keys. Raises
+    ValueError for unknown keys, dists or suites, so a typo does not silently
+    drop a part of the run.
+    """
+    with open(path, "rb") as f:
+        data = tomllib.load(f)
+    _check_keys(path, data, TOP_LEVEL_KEYS)
+
+    engines = []
+    for engine in data.get("engines", []):
+        _check_keys(path, engine, ENGINE_KEYS)
+        for key in ("name", "app_id", "dist_id"):
+            if key not in engine:
+                raise ValueError(
+                    "Invalid benchmark matrix {} - engine without {}".format(path, key)
+                )
+        if engine["app_id"] not in APP_IDS:
+            raise ValueError(
+                "Invalid benchmark matrix {} - unknown app_id {}".format(
+                    path, engine["app_id"]
+                )
+            )
+        if engine["dist_id"] not in dist_ids:
+            raise ValueError(
+                "Invalid benchmark matrix {} - unknown dist_id {}".format(
+                    path, engine["dist_id"]
+                )
+            )
+        engines.append(
+            EngineConfig(
+                name=engine["name"],
+                app_id=engine["app_id"],
+                dist_id=engine["dist_id"],
+                extra_gradle_props=tuple(engine.get("extra_gradle_props", ())),
+            )
+        )
+    _check_names("engine", [e.name for e in engines], None, unique=True)
+
+    suites = data.get("suites", {})
+    _check_names("suite", list(suites), suite_options)
+    for name, options in suites.items():
+        _check_keys(path, options, suite_options[name])
+    iterations = data.get("iterations", {})
+    _check_keys(path, iterations, ITERATION_KEYS)
+
+    return BenchmarkMatrix(
+        engines=engines,
+        suites={name: dict(options) for name, options in suites.items()},
+        abis=tuple(data.get("abis", DEFAULT_ABIS)),
+        devices=list(data.get("devices", ())),
+        iterations=dict(iterations),
+    )
+
+
+def _check_keys(path, table, known_keys):
+    for key in table:
+        if key not in known_keys:
+            raise ValueError(
+                "Invalid benchmark matrix {} - unknown key {}".format(path, key)
+            )
+
+
+def _check_names(kind, names, known_names, unique=False):
+    for name in names:
+        if known_names is not None and name not in known_names:
+            raise ValueError("Unknown {} - {}".format(kind, name))
+    if unique and len(set(names)) != len(names):
+        raise ValueError("Duplicated {} names - {}".format(kind, ", ".join(names)))
@@ -0,0 +1,88 @@
+import threading
+import time
+from .logger import get_logger
+from .stats import percentile
+from .tools import AdbTool
+
+logger = get_logger(__name__)
+
+
+class MemorySampler:
+    """Polls the memory usage of a running app in a background thread
+
+    PSS and RSS are read from `/proc/<pid>/smaps_rollup`, which is much cheaper
+    than `dumpsys meminfo`. When the proc file is not readable (e.g. on user
+    builds), PSS falls back to the `dumpsys meminfo` TOTAL.
+
+    Usage:
+        with MemorySampler(app_id, interval) as sampler:
+            start_and_wait_for_the_run()
+        summary = sampler.summary()
+    """
+
+    def __init__(self, app_id, interval=1.0):
+        if interval <= 0:
+            raise ValueError("Memory sample interval must be positive")
+        self._app_id = app_id
+        self._interval = interval
+        self._samples = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._use_dumpsys = False
+
+    def __enter__(self):
+        self._thread = threading.Thread(
+            target=self._run, name="MemorySampler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self._stop_event.set()
+        self._thread.join()
+
+    @property
+    def samples(self):
+        """List of (elapsed_seconds, pss_kib, rss_kib), rss_kib may be None"""
+        return list(self._samples)
+
+    def summary(self):
+        pss_values = [pss for (_, pss, _) in self._samples]
+        rss_values = [rss for (_, _, rss) in self._samples if rss is not None]
+        if len(pss_values) == 0:
+            return {}
+        ret = {
+            "memory_peak": max(pss_values),
+            "memory_mean": int(sum(pss_values) / len(pss_values)),
+            "memory_p95": int(percentile(pss_values, 95)),
+            "memory_final": pss_values[-1],
+            "memory_series": self.samples,
+        }
+        if len(rss_values) > 0:
+            ret["rss_peak"] = max(rss_values)
+        return ret
+
+    def _run(self):
+        start_time = time.monotonic()
+        pid = None
+        while not self._stop_event.is_set():
+            if pid is None:
+                pid = AdbTool.get_pid(self._app_id)
+            if pid is not None:
+                sample = self._sample(pid)
+                if sample is not None:
+                    elapsed = round(time.monotonic() - start_time, 3)
+                    self._samples.append((elapsed,) + sample)
+            self._stop_event.wait(self._interval)
+
+    def _sample(self, pid):
+        if not self._use_dumpsys:
+            usage = AdbTool.get_memory_rollup(pid)
+            if usage is not None:
+                return usage
+            logger.debug("MemorySampler - smaps_rollup unreadable, use dumpsys")
+            self._use_dumpsys = True
+        pss = int(AdbTool.get_memory(self._app_id))
+        if pss < 0:
+            return None
+        return (pss, None)
@@ -0,0 +1,120 @@
+import typing
+from .apk_cache import ApkCache, BundleCache
+from .builder import BuildRequest
+from .logger import get_logger
+from .scheduler import Job
+
+logger = get_logger(__name__)
+
+
+class Plan(typing.NamedTuple):
+    # (Job, BuildRequest) pairs, jobs of the same build are next to each other
+    jobs: typing.List[typing.Tuple[Job, BuildRequest]]
+    # Unique build requests in the order they are needed
+    builds: typing.List[BuildRequest]
+
+
+class Estimate(typing.NamedTuple):
+    # Seconds of the uncached builds, divided by the build jobs
+    build_seconds: float
+    # Seconds on the devices with the initial iterations, divided by devices
+    device_seconds: float
+    # Seconds on the devices if every adaptive config runs up to the maximum
+    max_device_seconds: float
+    uncached_builds: int
+
+    @property
+    def seconds(self):
+        # NOTE: The builds run in the background while the devices are busy
+        return max(self.build_seconds, self.device_seconds)
+
+    @property
+    def max_seconds(self):
+        return max(self.build_seconds, self.max_device_seconds)
+
+
+class Planner:
+    """Expands suites x parameters x engines into the job list of a run
+
+    Jobs are grouped by their build, in the order of the first job of every
+    build. A device then runs all jobs of an APK before it moves on, instead
+    of switching APKs on every job.
+    """
+
+    # Rough seconds of an uncached APK and bundle build, for the estimate only
+    APK_BUILD_SECONDS = 180
+    BUNDLE_BUILD_SECONDS = 30
+
+    def __init__(self, suites, dists, iteration_control, stopping_rule):
+        self._suites = suites
+        self._dists = dists
+        self._iteration_control = iteration_control
+        self._rule = stopping_rule
+
+    def plan(self) -> Plan:
+        groups = {}
+        for suite in self._suites:
+            for parameter in suite.parameters:
+                for dist in self._dists:
+                    request = suite.get_build_request(dist, parameter)
+                    group = groups.setdefault(request.key, (request, []))
+                    for iteration in range(
+                        self._iteration_control.get_initial_iterations(suite)
+                    ):
+                        job = Job(suite.name, parameter, dist.name, iteration)
+                        group[1].append(job)
+        jobs = []
+        for request, group_jobs in groups.values():
+            jobs.extend((job, request) for job in group_jobs)
+        return Plan(jobs=jobs, builds=[request for request, _ in groups.values()])
+
+    def estimate(self, plan: Plan, parallelism=1, build_jobs=1) -> Estimate:
+        suites = {suite.name: suite for suite in self._suites}
+        device_seconds = 0.0
+        max_device_seconds = 0.0
+        for job, _ in plan.jobs:
+            suite = suites[job.suite]
+            seconds = suite.estimate_duration(job.parameter)
+            device_seconds += seconds
+            max_device_seconds += seconds
+            if suite.primary_metric is not None and job.iteration == 0:
+                # NOTE: Adaptive iterations run up to the maximum iterations
+                extra_iterations = max(
+                    0, self._rule.max_iterations - self._rule.min_iterations
+                )
+                max_device_seconds += seconds * extra_iterations
+
+        build_seconds = 0.0
+        uncached_builds = 0
+        apk_requests = {}
+        for request in plan.builds:
+            if request.bundle:
+                if not self._is_bundle_cached(request):
+                    uncached_builds += 1
+                    build_seconds += self.BUNDLE_BUILD_SECONDS
+                # NOTE: Bundles are pushed to the APK built without the variant
+                request = BuildRequest(request.install_props)
+            apk_requests.setdefault(request.key, request)
+        for request in apk_requests.values():
+            if not self._is_apk_cached(request):
+                uncached_builds += 1
+                build_seconds += self.APK_BUILD_SECONDS
+
+        return Estimate(
+            build_seconds=build_seconds / build_jobs,
+            device_seconds=device_seconds / parallelism,
+            max_device_seconds=max_device_seconds / parallelism,
+            uncached_builds=uncached_builds,
+        )
+
+    @classmethod
+    def _is_apk_cached(cls, request: BuildRequest):
+        overlay_key = request.overlay.cache_key if request.overlay else None
+        key = ApkCache.compute_key(overlay_key=overlay_key, **request.install_props)
+        return ApkCache.lookup(key) is not None
+
+    @classmethod
+    def _is_bundle_cached(cls, request: BuildRequest):
+        overlay_key = request.overlay.cache_key if request.overlay else None
+        key = BundleCache.compute_key(overlay_key=overlay_key, hermesc=request.hermesc)
+        return BundleCache.lookup(key) is not None
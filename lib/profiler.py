@@ -0,0 +1,153 @@
+import collections
+import os
+import subprocess
+import sys
+from .logger import get_logger
+from .tools import AdbTool
+
+logger = get_logger(__name__)
+
+
+def get_simpleperf_scripts_dir():
+    """Returns the simpleperf scripts shipped with the NDK"""
+    ndk_path = os.environ.get("ANDROID_NDK_HOME")
+    if not ndk_path:
+        raise RuntimeError("ANDROID_NDK_HOME environment variable is not defined.")
+    scripts_dir = os.path.join(ndk_path, "simpleperf")
+    if not os.path.isdir(scripts_dir):
+        raise RuntimeError("Unable to find simpleperf from NDK - " + scripts_dir)
+    return scripts_dir
+
+
+def parse_folded_stacks(lines):
+    """Returns {stack: samples} of folded stacks, e.g. "main;foo;bar 12" """
+    stacks = collections.Counter()
+    for line in lines:
+        stack, _, count = line.rstrip().rpartition(" ")
+        if stack and count.isdigit():
+            stacks[stack] += int(count)
+    return stacks
+
+
+def summarize_folded_stacks(stacks, top=10):
+    """Returns the sample count and the functions with the most self samples"""
+    total = sum(stacks.values())
+    self_samples = collections.Counter()
+    for stack, count in stacks.items():
+        self_samples[stack.rsplit(";", 1)[-1]] += count
+    return {
+        "samples": total,
+        "top_functions": [
+            {"function": name, "percent": round(count * 100 / total, 2)}
+            for name, count in self_samples.most_common(top)
+        ],
+    }
+
+
+class SimpleperfProfiler:
+    """Samples the call stacks of an app with simpleperf while it runs
+
+    simpleperf of the device waits for the app process, so the recording
+    covers the launch as well. The app has to be profileable, which needs
+    Android 10, or the device rooted. On exit, the recording is pulled to
+    `output_dir`, symbolized with the simpleperf scripts of the NDK against
+    the unstripped libraries in `symbol_dir` and written as folded stacks,
+    the input of flamegraph.pl or speedscope.
+
+    Usage:
+        with SimpleperfProfiler(app_id, output_dir, symbol_dir) as profiler:
+            start_and_wait_for_the_run()
+        summary = profiler.summary()
+    """
+
+    DEVICE_RECORD_FILE = "/data/local/tmp/rnbench-perf.data"
+    RECORD_FILE = "perf.data"
+    FOLDED_FILE = "stacks.folded"
+    # Seconds for simpleperf to write out the recording once interrupted
+    STOP_TIMEOUT = 60
+
+    def __init__(self, app_id, output_dir, symbol_dir=None, frequency=1000):
+        self._app_id = app_id
+        self._output_dir = os.path.abspath(output_dir)
+        self._symbol_dir = symbol_dir and os.path.abspath(symbol_dir)
+        self._frequency = frequency
+        self._proc = None
+
+    def __enter__(self):
+        os.makedirs(self._output_dir, exist_ok=True)
+        AdbTool.shell("rm -f {}".format(self.DEVICE_RECORD_FILE))
+        cmd = [
+            "adb",
+            "shell",
+            "simpleperf",
+            "record",
+            "--app",
+            "com.rnbenchmark.{}".format(self._app_id),
+            "-g",
+            "-f",
+            str(self._frequency),
+            "-o",
+            self.DEVICE_RECORD_FILE,
+        ]
+        logger.debug("SimpleperfProfiler - cmd: {}".format(" ".join(cmd)))
+        self._proc = subprocess.Popen(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return self
+
+    def __exit__(self, type, value, traceback):
+        # NOTE: simpleperf writes out the recording once interrupted
+        AdbTool.shell("pkill -INT simpleperf")
+        try:
+            self._proc.wait(timeout=self.STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
+        if type is None:
+            self._collect()
+
+    @property
+    def folded_file(self):
+        return os.path.join(self._output_dir, self.FOLDED_FILE)
+
+    def summary(self):
+        with open(self.folded_file) as f:
+            stacks = parse_folded_stacks(f)
+        return {
+            **summarize_folded_stacks(stacks),
+            "folded_file": self.folded_file,
+        }
+
+    def _collect(self):
+        record_file = os.path.join(self._output_dir, self.RECORD_FILE)
+        cmd = ["adb", "pull", self.DEVICE_RECORD_FILE, record_file]
+        logger.debug("SimpleperfProfiler - cmd: {}".format(" ".join(cmd)))
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL)
+        if proc.returncode != 0:
+            raise RuntimeError(
+                "No simpleperf recording, the app needs to be profileable"
+                " or the device rooted"
+            )
+
+        # NOTE: Collects the device libraries with a matching build id into
+        # binary_cache/, taking the unstripped ones from `symbol_dir`
+        args = ["-i", self.RECORD_FILE]
+        if self._symbol_dir is not None:
+            args += ["-lib", self._symbol_dir]
+        self._run_script("binary_cache_builder.py", args)
+        with open(self.folded_file, "w") as f:
+            self._run_script(
+                "stackcollapse.py",
+                ["-i", self.RECORD_FILE, "--symfs", "binary_cache"],
+                stdout=f,
+            )
+
+    def _run_script(self, script, args, stdout=subprocess.DEVNULL):
+        cmd = [
+            sys.executable,
+            os.path.join(get_simpleperf_scripts_dir(), script),
+        ] + args
+        logger.debug("SimpleperfProfiler - cmd: {}".format(" ".join(cmd)))
+        proc = subprocess.run(cmd, cwd=self._output_dir, stdout=stdout)
+        if proc.returncode != 0:
+            raise RuntimeError("{} failed - cmd: {}".format(script, " ".join(cmd)))
@@ -0,0 +1,226 @@
+import datetime
+import json
+import os
+import sqlite3
+import subprocess
+import typing
+import uuid
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ResultRecord(typing.NamedTuple):
+    run_id: str
+    suite: str
+    parameter: typing.Any
+    engine: str
+    dist_id: str
+    dist_version: str
+    abi: typing.Optional[str]
+    device_serial: typing.Optional[str]
+    device_model: typing.Optional[str]
+    iteration: int
+    timestamp: str
+    # Raw metrics of the iteration, e.g. {"result": 1057, "memory": 123676}
+    metrics: dict
+    git_sha: typing.Optional[str] = None
+    # Seconds spent on the device
+    duration: typing.Optional[float] = None
+
+
+class ResultStore:
+    """Append-only SQLite store of every benchmark iteration
+
+    A run groups the records of one `start.py` invocation together with its
+    metadata. Records are indexed by (suite, parameter, engine) and by run,
+    so queries over long histories do not need to scan the whole table.
+    """
+
+    DEFAULT_PATH = os.path.join("results", "results.sqlite")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            started_at TEXT NOT NULL,
+            git_sha TEXT,
+            metadata TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL REFERENCES runs(run_id),
+            suite TEXT NOT NULL,
+            parameter TEXT NOT NULL,
+            engine TEXT NOT NULL,
+            dist_id TEXT NOT NULL,
+            dist_version TEXT NOT NULL,
+            abi TEXT,
+            device_serial TEXT,
+            device_model TEXT,
+            iteration INTEGER NOT NULL,
+            timestamp TEXT NOT NULL,
+            metrics TEXT NOT NULL,
+            duration REAL
+        );
+        CREATE INDEX IF NOT EXISTS results_by_config
+            ON results (suite, parameter, engine, timestamp);
+        CREATE INDEX IF NOT EXISTS results_by_run ON results (run_id);
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self._path = path
+        dir_path = os.path.dirname(path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(results)")]
+        if "duration" not in columns:
+            # NOTE: Stores created before the duration was recorded
+            with self._conn:
+                self._conn.execute("ALTER TABLE results ADD COLUMN duration REAL")
+
+    def close(self):
+        self._conn.close()
+
+    def create_run(self, metadata):
+        started_at = datetime.datetime.now(datetime.timezone.utc)
+        run_id = "{}-{}".format(
+            started_at.strftime("%Y%m%d-%H%M%S"), uuid.uuid4().hex[:6]
+        )
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, started_at, git_sha, metadata)"
+                " VALUES (?, ?, ?, ?)",
+                (
+                    run_id,
+                    started_at.isoformat(),
+                    get_git_sha(),
+                    json.dumps(metadata, sort_keys=True),
+                ),
+            )
+        logger.debug("ResultStore - create run {}".format(run_id))
+        return run_id
+
+    def add(self, record: ResultRecord):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO results (run_id, suite, parameter, engine, dist_id,"
+                " dist_version, abi, device_serial, device_model, iteration,"
+                " timestamp, metrics, duration)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record.run_id,
+                    record.suite,
+                    json.dumps(record.parameter),
+                    record.engine,
+                    record.dist_id,
+                    record.dist_version,
+                    record.abi,
+                    record.device_serial,
+                    record.device_model,
+                    record.iteration,
+                    record.timestamp,
+                    json.dumps(record.metrics),
+                    record.duration,
+                ),
+            )
+
+    def list_runs(self):
+        cursor = self._conn.execute(
+            "SELECT run_id, started_at, git_sha, metadata FROM runs"
+            " ORDER BY started_at"
+        )
+        for run_id, started_at, git_sha, metadata in cursor:
+            yield {
+                "run_id": run_id,
+                "started_at": started_at,
+                "git_sha": git_sha,
+                "metadata": json.loads(metadata),
+            }
+
+    def get_run(self, run_id):
+        """Returns the run like `list_runs()` does, None if it does not exist"""
+        row = self._conn.execute(
+            "SELECT run_id, started_at, git_sha, metadata FROM runs WHERE run_id = ?",
+            (run_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "run_id": row[0],
+            "started_at": row[1],
+            "git_sha": row[2],
+            "metadata": json.loads(row[3]),
+        }
+
+    def get_suite_fingerprint(self, suite):
+        """Returns a value which changes whenever records of `suite` are added"""
+        count, max_id = self._conn.execute(
+            "SELECT COUNT(*), MAX(id) FROM results WHERE suite = ?", (suite,)
+        ).fetchone()
+        if count == 0:
+            return None
+        return "{}:{}".format(count, max_id)
+
+    def query(self, suite=None, parameter=None, engine=None, run_ids=None):
+        """Yields the matching ResultRecord one by one, oldest first"""
+        conditions = []
+        args = []
+        if suite is not None:
+            conditions.append("results.suite = ?")
+            args.append(suite)
+        if parameter is not None:
+            conditions.append("results.parameter = ?")
+            args.append(json.dumps(parameter))
+        if engine is not None:
+            conditions.append("results.engine = ?")
+            args.append(engine)
+        if run_ids is not None:
+            conditions.append(
+                "results.run_id IN ({})".format(", ".join("?" for _ in run_ids))
+            )
+            args.extend(run_ids)
+        sql = (
+            "SELECT results.run_id, suite, parameter, engine, dist_id, dist_version,"
+            " abi, device_serial, device_model, iteration, timestamp, metrics,"
+            " runs.git_sha, duration"
+            " FROM results JOIN runs ON results.run_id = runs.run_id"
+        )
+        if len(conditions) > 0:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY results.timestamp, results.id"
+
+        for row in self._conn.execute(sql, args):
+            yield ResultRecord(
+                run_id=row[0],
+                suite=row[1],
+                parameter=json.loads(row[2]),
+                engine=row[3],
+                dist_id=row[4],
+                dist_version=row[5],
+                abi=row[6],
+                device_serial=row[7],
+                device_model=row[8],
+                iteration=row[9],
+                timestamp=row[10],
+                metrics=json.loads(row[11]),
+                git_sha=row[12],
+                duration=row[13],
+            )
+
+
+def get_git_sha():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode("utf8")
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
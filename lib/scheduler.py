@@ -0,0 +1,197 @@
+import concurrent.futures
+import contextlib
+import multiprocessing
+import signal
+import time
+import typing
+from .logger import get_logger, setup_logger
+from .tools import AdbTool
+
+logger = get_logger(__name__)
+
+
+class Job(typing.NamedTuple):
+    suite: str
+    parameter: typing.Any
+    dist: str
+    iteration: int
+    # Filled in once the APK of the job is built
+    apk_file: typing.Optional[str] = None
+    # JS bundle pushed next to the APK, for jobs which build it on its own
+    bundle_file: typing.Optional[str] = None
+    # Runs under the CPU profiler, its result is not one of the iterations
+    profile: bool = False
+
+
+class JobResult(typing.NamedTuple):
+    serial: typing.Optional[str]
+    job: Job
+    result: dict
+    # Seconds spent on the device
+    duration: float
+    # Device properties, e.g. {"model": "SM-N920C", "abi": "arm64-v8a"}
+    device: dict
+
+
+class RetryPolicy(typing.NamedTuple):
+    # Seconds before a job is aborted, None for no limit
+    timeout: typing.Optional[float] = None
+    # Further attempts of a failed or timed out job
+    retries: int = 0
+    # Seconds before the first retry, doubled on every further retry
+    backoff: float = 10.0
+    # Seconds to wait for a disconnected device to come back
+    device_timeout: float = 300.0
+
+
+class JobTimeoutError(Exception):
+    pass
+
+
+# Per worker process state, set up by `_init_worker()`
+_worker_runner = None
+_worker_device = None
+_worker_retry_policy = RetryPolicy()
+
+
+def _init_worker(serial_queue, runner, verbose, retry_policy):
+    global _worker_runner, _worker_device, _worker_retry_policy
+    setup_logger(verbose)
+    serial = serial_queue.get()
+    if serial is not None:
+        AdbTool.set_serial(serial)
+    _worker_runner = runner
+    _worker_retry_policy = retry_policy
+    _worker_device = AdbTool.get_device_info()
+
+
+@contextlib.contextmanager
+def _job_timeout(timeout):
+    if timeout is None:
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise JobTimeoutError("Timed out after {}s".format(timeout))
+
+    # NOTE: Jobs run on the main thread of the worker, so the alarm interrupts
+    # whatever the job is blocked on, e.g. a log line which never comes
+    previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def _run_job(job):
+    policy = _worker_retry_policy
+    attempt = 0
+    while True:
+        logger.debug("run_job - [{}] {}".format(AdbTool.serial, job))
+        start_time = time.monotonic()
+        try:
+            with _job_timeout(policy.timeout):
+                result = _worker_runner(job)
+            break
+        except Exception as e:
+            if attempt >= policy.retries:
+                raise
+            delay = policy.backoff * 2 ** attempt
+            attempt += 1
+            logger.warning(
+                "run_job - [{}] {} failed, retry {}/{} in {}s - {}".format(
+                    AdbTool.serial, job, attempt, policy.retries, delay, e
+                )
+            )
+            time.sleep(delay)
+            # NOTE: Covers a device which dropped off USB for a moment
+            AdbTool.wait_for_device(timeout=policy.device_timeout)
+    duration = time.monotonic() - start_time
+    return JobResult(AdbTool.serial, job, result, duration, _worker_device)
+
+
+class DeviceScheduler:
+    """Spreads benchmark jobs over a pool of worker processes, one per device
+
+    Each worker pins itself to a device serial, so a job only ever talks to
+    the device of the worker it runs on. Jobs are handed out in order to
+    whichever worker becomes idle first.
+    """
+
+    def __init__(self, serials, verbose=False, retry_policy=RetryPolicy()):
+        self._serials = list(serials) if serials else [None]
+        self._verbose = verbose
+        self._retry_policy = retry_policy
+
+    @property
+    def serials(self):
+        return self._serials
+
+    def run(self, jobs, runner, on_result=None, on_error=None):
+        """Runs `runner(job)` for every job and returns the list of JobResult
+
+        `jobs` is a list of (Job, Future) pairs, where the future resolves to
+        the BuildResult of the job. A job is only handed to a device once its
+        APK is built, so the devices keep running while the rest is built.
+        `runner` must be picklable. `on_result` is called in this process as
+        soon as a job is done, and may return more jobs to run. Those reuse
+        the APK and bundle of the finished job. A job which still fails after
+        the retries of the RetryPolicy is passed to `on_error(job, error)` and
+        the other jobs go on, without `on_error` the error is raised.
+        """
+        mp_context = multiprocessing.get_context()
+        serial_queue = mp_context.Queue()
+        for serial in self._serials:
+            serial_queue.put(serial)
+
+        pending_builds = {}
+        for job, build_future in jobs:
+            pending_builds.setdefault(build_future, []).append(job)
+        # Future -> Job
+        running = {}
+        results = []
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=len(self._serials),
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(serial_queue, runner, self._verbose, self._retry_policy),
+        ) as executor:
+            while len(pending_builds) > 0 or len(running) > 0:
+                done, _ = concurrent.futures.wait(
+                    list(pending_builds) + list(running),
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                # NOTE: Iterates in the original order to keep the job order
+                for build_future in [f for f in pending_builds if f in done]:
+                    build_jobs = pending_builds.pop(build_future)
+                    try:
+                        build_result = build_future.result()
+                    except Exception as e:
+                        if on_error is None:
+                            raise
+                        for job in build_jobs:
+                            on_error(job, e)
+                        continue
+                    for job in build_jobs:
+                        job = job._replace(
+                            apk_file=build_result.apk_file,
+                            bundle_file=build_result.bundle_file,
+                        )
+                        running[executor.submit(_run_job, job)] = job
+                for future in [f for f in running if f in done]:
+                    job = running.pop(future)
+                    try:
+                        job_result = future.result()
+                    except Exception as e:
+                        if on_error is None:
+                            raise
+                        on_error(job, e)
+                        continue
+                    results.append(job_result)
+                    if on_result is None:
+                        continue
+                    for extra_job in on_result(job_result) or ():
+                        running[executor.submit(_run_job, extra_job)] = extra_job
+        return results
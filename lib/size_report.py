@@ -0,0 +1,135 @@
+import zipfile
+from .elf import SECTION_CATEGORIES, read_sections, summarize_sections
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Entry categories of an APK or AAR, in report order
+ENTRY_CATEGORIES = ("native", "dex", "assets", "resources", "other")
+
+
+def categorize_entry(path):
+    if path.endswith(".so"):
+        return "native"
+    if path.endswith(".dex") or path.endswith("classes.jar"):
+        return "dex"
+    if path.startswith("assets/"):
+        return "assets"
+    if path.startswith("res/") or path in ("resources.arsc", "R.txt"):
+        return "resources"
+    return "other"
+
+
+def get_library_abi(path):
+    """Returns the ABI of lib/<abi>/x.so in an APK or jni/<abi>/x.so in an AAR"""
+    parts = path.split("/")
+    if len(parts) == 3 and parts[0] in ("lib", "jni"):
+        return parts[1]
+    return None
+
+
+def create_size_report(archive_path):
+    """Breaks the size of an APK or AAR down by entry, read in-process
+
+    Returns a JSON serializable dict:
+      - total / categories: {"compressed": bytes, "uncompressed": bytes}
+      - libraries: {abi: {name: {"compressed", "uncompressed", "sections"}}},
+        where sections holds the bytes of every SECTION_CATEGORIES category
+      - assets: {path: {"compressed", "uncompressed"}}, e.g. the JS bundle
+    """
+    report = {
+        "total": {"compressed": 0, "uncompressed": 0},
+        "categories": {
+            category: {"compressed": 0, "uncompressed": 0}
+            for category in ENTRY_CATEGORIES
+        },
+        "libraries": {},
+        "assets": {},
+    }
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            sizes = {"compressed": info.compress_size, "uncompressed": info.file_size}
+            category = categorize_entry(info.filename)
+            for key, size in sizes.items():
+                report["total"][key] += size
+                report["categories"][category][key] += size
+            if category == "assets":
+                report["assets"][info.filename] = sizes
+            abi = get_library_abi(info.filename)
+            if category == "native" and abi is not None:
+                try:
+                    sections = summarize_sections(read_sections(archive.read(info)))
+                except ValueError as e:
+                    logger.debug(
+                        "create_size_report - {}: {}".format(info.filename, e)
+                    )
+                    sections = None
+                name = info.filename.rsplit("/", 1)[-1]
+                report["libraries"].setdefault(abi, {})[name] = {
+                    **sizes,
+                    "sections": sections,
+                }
+    return report
+
+
+def format_size_report(report, baseline=None):
+    """Returns the report lines, with the change against `baseline` if given"""
+    baseline = baseline or {}
+    lines = []
+
+    def add_row(label, sizes, baseline_sizes, sections=None):
+        row = "  {:<36} {:>10} {:>12}".format(
+            label, _kib(sizes["compressed"]), _kib(sizes["uncompressed"])
+        )
+        if sections is not None:
+            row += "".join(
+                " {}={}".format(category, _kib(sections[category]))
+                for category in SECTION_CATEGORIES
+                if sections[category] > 0
+            )
+        if baseline_sizes is not None:
+            change = sizes["compressed"] - baseline_sizes["compressed"]
+            if change != 0:
+                row += " ({})".format(_format_change(change))
+        elif baseline:
+            row += " (new)"
+        lines.append(row)
+
+    lines.append("  {:<36} {:>10} {:>12}".format("", "compressed", "uncompressed"))
+    add_row("total", report["total"], baseline.get("total"))
+    for category in ENTRY_CATEGORIES:
+        sizes = report["categories"][category]
+        baseline_sizes = baseline.get("categories", {}).get(category)
+        if sizes["uncompressed"] > 0 or (baseline_sizes or sizes) != sizes:
+            add_row(category, sizes, baseline_sizes)
+    for abi, libraries in sorted(report["libraries"].items()):
+        baseline_libraries = baseline.get("libraries", {}).get(abi, {})
+        for name, library in sorted(libraries.items()):
+            add_row(
+                "{}/{}".format(abi, name),
+                library,
+                baseline_libraries.get(name),
+                library["sections"],
+            )
+    for abi, libraries in sorted(baseline.get("libraries", {}).items()):
+        for name in sorted(libraries):
+            if name not in report["libraries"].get(abi, {}):
+                lines.append("  {:<36} (removed)".format("{}/{}".format(abi, name)))
+    for path, sizes in sorted(report["assets"].items()):
+        add_row(path, sizes, baseline.get("assets", {}).get(path))
+    for path in sorted(baseline.get("assets", {})):
+        if path not in report["assets"]:
+            lines.append("  {:<36} (removed)".format(path))
+    return lines
+
+
+def _kib(size):
+    return "{:,}K".format(round(size / 1024))
+
+
+def _format_change(change):
+    if abs(change) < 1024:
+        return "{:+,}B".format(change)
+    return "{:+,.1f}K".format(change / 1024)
@@ -0,0 +1,56 @@
+import re
+
+# (phase, start mark, end mark), the marks are logged by MainApplication and
+# src/TTI/startupMarker.js with the uptime clock of the device
+PHASES = (
+    ("process_start", "PROCESS_START", "APPLICATION_CREATE"),
+    (
+        "instance_manager_init",
+        "GET_REACT_INSTANCE_MANAGER_START",
+        "CREATE_REACT_CONTEXT_START",
+    ),
+    ("native_modules", "PROCESS_PACKAGES_START", "PROCESS_PACKAGES_END"),
+    (
+        "catalyst_instance",
+        "CREATE_CATALYST_INSTANCE_START",
+        "CREATE_CATALYST_INSTANCE_END",
+    ),
+    ("bundle_read", "JS_BUNDLE_STRING_CONVERT_START", "JS_BUNDLE_STRING_CONVERT_END"),
+    # Until the first statement of the bundle runs, i.e. reading, parsing and
+    # compiling the bundle, or loading the bytecode / code cache
+    ("bundle_parse", "RUN_JS_BUNDLE_START", "JS_EXECUTION_START"),
+    ("bundle_execute", "JS_EXECUTION_START", "RUN_JS_BUNDLE_END"),
+    ("run_js_bundle", "RUN_JS_BUNDLE_START", "RUN_JS_BUNDLE_END"),
+    ("first_render", "RUN_JS_BUNDLE_END", "CONTENT_APPEARED"),
+    # Hot launches only create the activity and render with the running bridge
+    ("activity_render", "ACTIVITY_CREATE", "CONTENT_APPEARED"),
+)
+
+_MARK_PATTERN = re.compile(r"mark=(\w+) t=(\d+)")
+_INFO_PATTERN = re.compile(r"(bundleSource|codeCacheFiles)=(\S+)")
+
+
+def parse_startup_phases(lines):
+    """Turns the startup log lines of one launch into phase durations
+
+    Returns {"phase_<name>": ms} for every phase with both marks logged, plus
+    "bundle_source" (asset or file) and "code_cache" (hit or miss) when known.
+    A mark logged more than once, e.g. on a reload, keeps its first time.
+    """
+    marks = {}
+    info = {}
+    for line in lines:
+        for name, value in _MARK_PATTERN.findall(line):
+            marks.setdefault(name, int(value))
+        for name, value in _INFO_PATTERN.findall(line):
+            info.setdefault(name, value)
+
+    result = {}
+    for phase, start_mark, end_mark in PHASES:
+        if start_mark in marks and end_mark in marks:
+            result["phase_" + phase] = marks[end_mark] - marks[start_mark]
+    if "bundleSource" in info:
+        result["bundle_source"] = info["bundleSource"]
+    if "codeCacheFiles" in info:
+        result["code_cache"] = "hit" if int(info["codeCacheFiles"]) > 0 else "miss"
+    return result
@@ -0,0 +1,201 @@
+import math
+import random
+import statistics
+import typing
+
+# Two-sided 95% critical values of Student's t distribution by degrees of freedom
+_T_CRITICAL_95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)  # fmt: skip
+
+
+def percentile(values, p):
+    """Linear interpolated percentile of `values`, `p` in [0, 100]"""
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def t_critical_95(df):
+    if df < 1:
+        return math.inf
+    if df <= len(_T_CRITICAL_95):
+        return _T_CRITICAL_95[df - 1]
+    return 1.96
+
+
+def trim_outliers(values):
+    """Drops the values out of 1.5 IQR from the quartiles"""
+    if len(values) < 4:
+        return list(values)
+    q1 = percentile(values, 25)
+    q3 = percentile(values, 75)
+    iqr = q3 - q1
+    return [v for v in values if q1 - 1.5 * iqr <= v <= q3 + 1.5 * iqr]
+
+
+def loglog_slopes(points):
+    """Local exponents k of y ~ x^k between consecutive (x, y) points
+
+    1 is linear growth and above 1 is superlinear. The first point has no
+    slope and gets None, as do points with non-positive values.
+    """
+    slopes = [None]
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        if min(x0, y0, x1, y1) <= 0 or x0 == x1:
+            slopes.append(None)
+            continue
+        slopes.append(math.log(y1 / y0) / math.log(x1 / x0))
+    return slopes
+
+
+class Summary(typing.NamedTuple):
+    n: int
+    mean: float
+    median: float
+    stddev: float
+    # Half-width of the 95% confidence interval of the mean
+    ci95: float
+    trimmed_mean: float
+
+    @property
+    def relative_ci95(self):
+        if self.mean == 0:
+            return 0.0 if self.ci95 == 0 else math.inf
+        return abs(self.ci95 / self.mean)
+
+    def format(self):
+        return (
+            "n={n} mean={mean:.2f} median={median:.2f} stddev={stddev:.2f}"
+            " ci95=±{ci95:.2f} trimmed={trimmed_mean:.2f}".format(**self._asdict())
+        )
+
+
+def summarize(values) -> Summary:
+    n = len(values)
+    mean = statistics.fmean(values)
+    stddev = statistics.stdev(values) if n > 1 else 0.0
+    ci95 = t_critical_95(n - 1) * stddev / math.sqrt(n) if n > 1 else math.inf
+    return Summary(
+        n=n,
+        mean=mean,
+        median=statistics.median(values),
+        stddev=stddev,
+        ci95=ci95,
+        trimmed_mean=statistics.fmean(trim_outliers(values)),
+    )
+
+
+class StoppingRule(typing.NamedTuple):
+    """When to stop sampling a benchmark configuration
+
+    Sampling continues until the 95% CI half-width relative to the mean is
+    below `target_ci`, `max_iterations` is reached, or the samples took
+    more than `time_budget` seconds. With `min_iterations == max_iterations`
+    the iteration count is fixed.
+    """
+
+    min_iterations: int = 3
+    max_iterations: int = 3
+    target_ci: float = 0.02
+    time_budget: typing.Optional[float] = None
+
+    @property
+    def is_adaptive(self):
+        return self.max_iterations > self.min_iterations
+
+    def should_continue(self, values, elapsed=0.0):
+        if len(values) < self.min_iterations:
+            return True
+        if len(values) >= self.max_iterations:
+            return False
+        if self.time_budget is not None and elapsed >= self.time_budget:
+            return False
+        return summarize(values).relative_ci95 > self.target_ci
+
+
+def _exact_mann_whitney_cdf(n1, n2, u):
+    """P(U <= u) under H0 without ties, by counting rank arrangements"""
+    # count(i, j, k): number of arrangements of i + j values with U == k
+    memo = {}
+
+    def count(i, j, k):
+        if k < 0:
+            return 0
+        if i == 0 or j == 0:
+            return 1 if k == 0 else 0
+        key = (i, j, k)
+        if key not in memo:
+            memo[key] = count(i - 1, j, k - j) + count(i, j - 1, k)
+        return memo[key]
+
+    total = math.comb(n1 + n2, n1)
+    return sum(count(n1, n2, k) for k in range(int(u) + 1)) / total
+
+
+def mann_whitney_u(a, b):
+    """Two-sided Mann-Whitney U test, returns (U of `a`, p-value)
+
+    Uses the exact distribution for small samples without ties, otherwise
+    the normal approximation with tie and continuity correction.
+    """
+    n1 = len(a)
+    n2 = len(b)
+    combined = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    ranks = [0.0] * len(combined)
+    tie_term = 0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tie_count = j - i + 1
+        tie_term += tie_count**3 - tie_count
+        i = j + 1
+    rank_sum_a = sum(r for r, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum_a - n1 * (n1 + 1) / 2
+
+    if tie_term == 0 and n1 * n2 <= 400:
+        u_min = min(u, n1 * n2 - u)
+        return (u, min(1.0, 2 * _exact_mann_whitney_cdf(n1, n2, u_min)))
+
+    n = n1 + n2
+    mean_u = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return (u, 1.0)
+    z = (abs(u - mean_u) - 0.5) / math.sqrt(variance)
+    return (u, min(1.0, math.erfc(max(z, 0) / math.sqrt(2))))
+
+
+def mann_whitney_min_p_value(n1, n2):
+    """Smallest two-sided p-value the exact U test can give for the sizes
+
+    E.g. 0.1 for 3 vs 3 samples, which is never significant at 0.05.
+    """
+    return min(1.0, 2 / math.comb(n1 + n2, n1))
+
+
+def bootstrap_median_diff_ci(a, b, confidence=0.95, resamples=2000, seed=0):
+    """Percentile bootstrap CI of median(a) - median(b), returns (low, high)
+
+    Seeded, so the same samples always give the same interval.
+    """
+    rng = random.Random(seed)
+    diffs = sorted(
+        statistics.median(rng.choices(a, k=len(a)))
+        - statistics.median(rng.choices(b, k=len(b)))
+        for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2 * 100
+    return (percentile(diffs, tail), percentile(diffs, 100 - tail))
@@ -1,32 +1,104 @@
-import glob
+import contextlib
 import io
 import os
-import re
 import shlex
 import subprocess
-from pathlib import Path
+import tempfile
+import zipfile
+from .apk_cache import ApkCache, BundleCache
+from .logcat import LogcatStream
 from .logger import get_logger
-from .types import InstallProps
 
 logger = get_logger(__name__)
 
 
 class AdbTool:
+    # The device serial which this process is pinned to, None for the only
+    # attached device
+    serial = None
+
+    _logcat = None
+
+    # App specific storage where `push_bundle()` puts the JS bundles
+    BUNDLE_DIR = "/sdcard/Android/data/com.rnbenchmark.{app_id}/files/bundles"
+
+    @classmethod
+    def set_serial(cls, serial):
+        # NOTE: adb picks the device from ANDROID_SERIAL, which also covers
+        # the adb calls made by gradle and every `os.system("adb ...")`
+        cls.serial = serial
+        os.environ["ANDROID_SERIAL"] = serial
+
+    @classmethod
+    def list_devices(cls):
+        output = subprocess.check_output(["adb", "devices"]).decode("utf8")
+        serials = []
+        for line in output.splitlines()[1:]:
+            columns = line.split()
+            if len(columns) >= 2 and columns[1] == "device":
+                serials.append(columns[0])
+        return serials
+
+    @classmethod
+    def get_logcat(cls):
+        if cls._logcat is None:
+            cls._logcat = LogcatStream()
+        return cls._logcat
+
+    @classmethod
+    def get_prop(cls, name):
+        output = subprocess.run(
+            ["adb", "shell", "getprop", name],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        ).stdout.decode("utf8")
+        return output.strip() or None
+
+    @classmethod
+    def wait_for_device(cls, timeout=None):
+        """Waits until the device is back online, returns False on timeout"""
+        cmd = ["adb", "wait-for-device"]
+        logger.debug("wait_for_device - cmd: {}".format(" ".join(cmd)))
+        try:
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return False
+        return True
+
     @classmethod
-    def wait_for_log(cls, regex, tag):
-        pattern = re.compile(tag + r": " + regex)
-        cmd = ["adb", "logcat"]
-        with subprocess.Popen(cmd, stdout=subprocess.PIPE) as proc:
-            for line_in_bytes in iter(proc.stdout.readline, ""):
-                line = line_in_bytes.decode("utf8")
-                search = pattern.search(line)
-                if search is not None:
-                    proc.terminate()
-                    return search
+    def get_device_info(cls):
+        return {
+            "model": cls.get_prop("ro.product.model"),
+            "abi": cls.get_prop("ro.product.cpu.abi"),
+        }
 
     @classmethod
-    def wait_for_console_log(cls, regex):
-        return cls.wait_for_log(regex, "ReactNativeJS")
+    def wait_for_log(cls, regex, tag, timeout=None):
+        """Waits for a log line emitted after this call"""
+        return cls.get_logcat().expect(regex, tag, timeout=timeout).result()
+
+    @classmethod
+    def wait_for_console_log(cls, regex, timeout=None):
+        return cls.wait_for_log(regex, "ReactNativeJS", timeout=timeout)
+
+    @classmethod
+    def start_and_wait_for_log(
+        cls,
+        app_id,
+        path_with_query,
+        regex,
+        tag="ReactNativeJS",
+        timeout=None,
+        clear_task=False,
+    ):
+        """Starts the app with a deep link and waits for its log line"""
+        waiter = cls.get_logcat().expect(regex, tag, timeout=timeout)
+        try:
+            cls.start_with_link(app_id, path_with_query, clear_task=clear_task)
+        except Exception:
+            waiter.cancel()
+            raise
+        return waiter.result()
 
     @classmethod
     def clear_log(cls):
@@ -46,6 +118,63 @@ class AdbTool:
                         return columns[1]
         return -1
 
+    @classmethod
+    def get_pid(cls, app_id):
+        output = subprocess.run(
+            ["adb", "shell", "pidof", "com.rnbenchmark.{}".format(app_id)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        ).stdout.decode("utf8")
+        columns = output.split()
+        if len(columns) < 1 or not columns[0].isdigit():
+            return None
+        return int(columns[0])
+
+    @classmethod
+    def get_memory_rollup(cls, pid):
+        """Returns (pss, rss) in KiB from /proc/<pid>/smaps_rollup or None"""
+        output = subprocess.run(
+            ["adb", "shell", "cat", "/proc/{}/smaps_rollup".format(pid)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        ).stdout.decode("utf8")
+        usage = {}
+        for line in output.splitlines():
+            columns = line.split()
+            if len(columns) >= 2 and columns[0] in ("Pss:", "Rss:"):
+                usage[columns[0]] = int(columns[1])
+        if "Pss:" not in usage or "Rss:" not in usage:
+            return None
+        return (usage["Pss:"], usage["Rss:"])
+
+    @classmethod
+    def get_gfxinfo(cls, app_id, framestats=False):
+        package = "com.rnbenchmark.{}".format(app_id)
+        cmd = ["adb", "shell", "dumpsys", "gfxinfo", package]
+        if framestats:
+            cmd.append("framestats")
+        return subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        ).stdout.decode("utf8", errors="replace")
+
+    @classmethod
+    def reset_gfxinfo(cls, app_id):
+        os.system(
+            "adb shell dumpsys gfxinfo com.rnbenchmark.{} reset > /dev/null".format(
+                app_id
+            )
+        )
+
+    @classmethod
+    def get_thread_stats(cls, pid):
+        """Returns the /proc/<pid>/task/*/stat lines of every thread"""
+        output = subprocess.run(
+            ["adb", "shell", "cat /proc/{}/task/*/stat".format(pid)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        ).stdout.decode("utf8", errors="replace")
+        return output.splitlines()
+
     @classmethod
     def stop_app(cls, app_id):
         os.system("adb shell am force-stop com.rnbenchmark.{}".format(app_id))
@@ -58,27 +187,139 @@ class AdbTool:
         cls.stop_app("hermes")
 
     @classmethod
-    def start_with_link(cls, app_id, path_with_query):
+    def get_installed_apk_checksum(cls, app_id):
+        package = "com.rnbenchmark.{}".format(app_id)
+        output = subprocess.run(
+            ["adb", "shell", "pm", "path", package],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        ).stdout.decode("utf8")
+        apk_paths = [
+            line[len("package:") :].strip()
+            for line in output.splitlines()
+            if line.startswith("package:")
+        ]
+        if len(apk_paths) < 1:
+            return None
+        base_apk_paths = [p for p in apk_paths if p.endswith("/base.apk")]
+        apk_path = base_apk_paths[0] if base_apk_paths else apk_paths[0]
+
+        output = subprocess.run(
+            ["adb", "shell", "sha256sum", apk_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        ).stdout.decode("utf8")
+        columns = output.split()
+        if len(columns) < 1 or len(columns[0]) != 64:
+            return None
+        return columns[0]
+
+    @classmethod
+    def uninstall(cls, app_id):
+        os.system("adb uninstall com.rnbenchmark.{} > /dev/null".format(app_id))
+
+    @classmethod
+    def install(cls, apk_file, verbose=False):
+        cmd = ["adb", "install", "-r", apk_file]
+        logger.debug("install - cmd: {}".format(" ".join(cmd)))
+        # NOTE: adb reports failures such as INSTALL_FAILED_* on either stream
+        stdout = subprocess.PIPE if not verbose else None
+        stderr = subprocess.STDOUT if not verbose else None
+        proc = subprocess.run(cmd, stdout=stdout, stderr=stderr)
+        if proc.returncode != 0:
+            output = proc.stdout.decode("utf8", errors="replace") if proc.stdout else ""
+            raise RuntimeError(
+                "adb install failed - cmd: {}\n{}".format(" ".join(cmd), output)
+            )
+
+    @classmethod
+    def clear_app_data(cls, app_id):
+        os.system("adb shell pm clear com.rnbenchmark.{} > /dev/null".format(app_id))
+
+    @classmethod
+    def push_bundle(cls, app_id, bundle_file):
+        """Pushes a JS bundle for the app and returns its name on the device
+
+        The app loads it when started with the `bundleFile` query, see
+        MainActivity. Bundle files are content-addressed, so one already on
+        the device is not pushed again. Other bundles of the app are removed.
+        """
+        bundle_dir = cls.BUNDLE_DIR.format(app_id=app_id)
+        name = os.path.basename(bundle_file)
+        remote_path = "{}/{}".format(bundle_dir, name)
+        proc = subprocess.run(
+            ["adb", "shell", "test", "-f", remote_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if proc.returncode == 0:
+            logger.debug("push_bundle - {} is up to date".format(remote_path))
+            return name
+        os.system("adb shell rm -rf {} > /dev/null".format(bundle_dir))
+        os.system("adb shell mkdir -p {} > /dev/null".format(bundle_dir))
+        cmd = ["adb", "push", bundle_file, remote_path]
+        logger.debug("push_bundle - cmd: {}".format(" ".join(cmd)))
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL)
+        if proc.returncode != 0:
+            raise RuntimeError("adb push failed - cmd: {}".format(" ".join(cmd)))
+        return name
+
+    @classmethod
+    def start_with_link(cls, app_id, path_with_query, clear_task=False):
+        # NOTE: FLAG_ACTIVITY_NEW_TASK | FLAG_ACTIVITY_CLEAR_TASK recreates the
+        # activity of a running app while keeping its process
+        flags = " -f 0x10008000" if clear_task else ""
         os.system(
-            'adb shell am start -a android.intent.action.VIEW -d "rnbench://{}{}"'
-            " > /dev/null".format(app_id, path_with_query)
+            'adb shell am start -a android.intent.action.VIEW -d "rnbench://{}{}"{}'
+            " > /dev/null".format(app_id, path_with_query, flags)
         )
 
+    @classmethod
+    def shell(cls, command, serial=None):
+        """Runs a shell command on the device and returns its stdout
+
+        `serial` picks another device than the one of this process.
+        """
+        cmd = ["adb"] + (["-s", serial] if serial else []) + ["shell", command]
+        logger.debug("shell - cmd: {}".format(" ".join(cmd)))
+        return subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        ).stdout.decode("utf8", errors="replace")
+
+    @classmethod
+    def root_shell(cls, command, serial=None):
+        """Runs a shell command as root, returns False without root"""
+        adb = ["adb"] + (["-s", serial] if serial else []) + ["shell"]
+        # NOTE: `su 0` of userdebug builds and `su -c` of Magisk / SuperSU
+        for su_cmd in ("su 0 sh -c {}", "su -c {}"):
+            cmd = adb + [su_cmd.format(shlex.quote(command))]
+            logger.debug("root_shell - cmd: {}".format(" ".join(cmd)))
+            proc = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            if proc.returncode == 0:
+                return True
+        return False
+
+    @classmethod
+    def drop_caches(cls):
+        """Drops the page cache of the device, returns False without root"""
+        return cls.root_shell("sync; echo 3 > /proc/sys/vm/drop_caches")
+
 
 class ApkTool:
     @classmethod
-    def build(
+    def _run_gradle(
         cls,
+        tasks,
         app_id=None,
         maven_repo_prop=None,
         abi=None,
         verbose=False,
         extra_gradle_props=None,
+        build_dir=None,
+        extra_env=None,
     ):
-        assert app_id
-        assert maven_repo_prop
-
-        os.chdir("android")
         gradle_prop = ""
         if verbose:
             gradle_prop += "-q "
@@ -90,63 +331,188 @@ class ApkTool:
             gradle_prop += " "
             prefixed_props = ("--project-prop " + p for p in extra_gradle_props)
             gradle_prop += " ".join(prefixed_props)
-        cmd = "./gradlew {gradle_prop} \
-:{app}:clean :{app}:assembleRelease".format(
-            gradle_prop=gradle_prop, app=app_id
+        if build_dir:
+            gradle_prop += " --project-prop BUILD_DIR={}".format(build_dir)
+            gradle_prop += " --project-cache-dir {}".format(
+                os.path.join(build_dir, ".gradle")
+            )
+        cmd = "./gradlew {gradle_prop} {tasks}".format(
+            gradle_prop=gradle_prop,
+            tasks=" ".join(t.format(app=app_id) for t in tasks),
         )
-        logger.debug("build - cmd: {}".format(cmd))
+        logger.debug("gradle - cmd: {}".format(cmd))
+        env = None
+        if extra_env:
+            logger.debug("gradle - env: {}".format(extra_env))
+            env = dict(os.environ, **extra_env)
         stdout = subprocess.DEVNULL if not verbose else None
         stderr = subprocess.DEVNULL if not verbose else None
-        subprocess.run(shlex.split(cmd), stdout=stdout, stderr=stderr)
-        if abi:
-            apk_file = "{app}/build/outputs/apk/release/{app}-{abi}-release.apk".format(
-                app=app_id, abi=abi
-            )
-        else:
-            apk_file = "{app}/build/outputs/apk/release/{app}-release.apk".format(
-                app=app_id
-            )
-        apk_file = os.path.abspath(apk_file)
-        os.chdir("../")
-        return apk_file
+        proc = subprocess.run(
+            shlex.split(cmd), stdout=stdout, stderr=stderr, cwd="android", env=env
+        )
+        if proc.returncode != 0:
+            raise RuntimeError("gradle failed - cmd: {}".format(cmd))
 
     @classmethod
-    def reinstall(
+    def build(
         cls,
         app_id=None,
         maven_repo_prop=None,
         abi=None,
         verbose=False,
         extra_gradle_props=None,
+        build_dir=None,
+        extra_env=None,
     ):
         assert app_id
         assert maven_repo_prop
 
-        os.chdir("android")
-        gradle_prop = ""
-        if verbose:
-            gradle_prop += "-q "
-        gradle_prop += "--project-prop " + maven_repo_prop
+        cls._run_gradle(
+            (":{app}:clean", ":{app}:assembleRelease"),
+            app_id=app_id,
+            maven_repo_prop=maven_repo_prop,
+            abi=abi,
+            verbose=verbose,
+            extra_gradle_props=extra_gradle_props,
+            build_dir=build_dir,
+            extra_env=extra_env,
+        )
         if abi:
-            gradle_prop += " --project-prop reactNativeArchitectures={}".format(abi)
-            gradle_prop += " --project-prop ABI_BASED_APK=true"
-        if extra_gradle_props:
-            gradle_prop += " "
-            prefixed_props = ("--project-prop " + p for p in extra_gradle_props)
-            gradle_prop += " ".join(prefixed_props)
-        cmd = "./gradlew {gradle_prop} \
-:{app}:clean :{app}:uninstallRelease :{app}:installRelease".format(
-            gradle_prop=gradle_prop, app=app_id
+            apk_name = "{app}-{abi}-release.apk".format(app=app_id, abi=abi)
+        else:
+            apk_name = "{app}-release.apk".format(app=app_id)
+        if build_dir:
+            project_build_dir = os.path.join(build_dir, app_id)
+        else:
+            project_build_dir = os.path.join("android", app_id, "build")
+        return os.path.abspath(
+            os.path.join(project_build_dir, "outputs", "apk", "release", apk_name)
         )
-        logger.debug("reinstall - cmd: {}".format(cmd))
+
+    @classmethod
+    def build_cached(cls, dist_info=None, overlay=None, **install_props):
+        """Returns the cached APK or builds it
+
+        `overlay` is a context manager which generates extra build inputs and
+        returns the environment variables for the build, e.g. `TTIDataOverlay`.
+        It is only entered when the APK has to be built.
+        """
+        overlay_key = overlay.cache_key if overlay is not None else None
+        key = ApkCache.compute_key(dist_info, overlay_key=overlay_key, **install_props)
+        apk_file = ApkCache.lookup(key)
+        if apk_file is not None:
+            return apk_file
+        with overlay or contextlib.nullcontext() as extra_env:
+            return ApkCache.store(key, cls.build(extra_env=extra_env, **install_props))
+
+    @classmethod
+    def reinstall(cls, fresh_install=False, **install_props):
+        """Makes sure the requested build is installed on the device
+
+        The installed APK is left untouched when its checksum matches, unless
+        `fresh_install` is set to wipe the app data (e.g. V8 code cache).
+        """
+        apk_file = cls.build_cached(**install_props)
+        cls.install(
+            apk_file,
+            install_props["app_id"],
+            fresh_install=fresh_install,
+            verbose=install_props.get("verbose", False),
+        )
+        return apk_file
+
+    @classmethod
+    def install(cls, apk_file, app_id, fresh_install=False, verbose=False):
+        if fresh_install:
+            AdbTool.uninstall(app_id)
+        elif AdbTool.get_installed_apk_checksum(app_id) == ApkCache.hash_file(
+            apk_file
+        ):
+            logger.debug("install - {} is up to date".format(app_id))
+            return
+        AdbTool.install(apk_file, verbose=verbose)
+
+    @classmethod
+    def get_assets_size(cls, apk_file):
+        with zipfile.ZipFile(apk_file) as apk:
+            return sum(
+                info.file_size
+                for info in apk.infolist()
+                if info.filename.startswith("assets/") and not info.is_dir()
+            )
+
+
+class BundleTool:
+    """Builds the JS bundle of the app without gradle, like react.gradle does"""
+
+    @classmethod
+    def build(
+        cls, output, minify=True, verbose=False, extra_env=None, entry_file="index.js"
+    ):
+        env = dict(os.environ, **extra_env) if extra_env else None
+        with tempfile.TemporaryDirectory() as assets_dir:
+            cmd = [
+                "node",
+                os.path.join("node_modules", "react-native", "cli.js"),
+                "bundle",
+                "--platform",
+                "android",
+                "--dev",
+                "false",
+                "--entry-file",
+                entry_file,
+                "--bundle-output",
+                output,
+                "--assets-dest",
+                assets_dir,
+            ]
+            if not minify:
+                cmd += ["--minify", "false"]
+            logger.debug("bundle - cmd: {}".format(" ".join(cmd)))
+            stdout = subprocess.DEVNULL if not verbose else None
+            proc = subprocess.run(cmd, stdout=stdout, env=env)
+        if proc.returncode != 0:
+            raise RuntimeError("bundle failed - cmd: {}".format(" ".join(cmd)))
+
+    @classmethod
+    def compile_hermes(cls, hermesc, js_file, output, verbose=False):
+        cmd = [hermesc, "-emit-binary", "-out", output, js_file, "-O", "-w"]
+        logger.debug("hermesc - cmd: {}".format(" ".join(cmd)))
         stdout = subprocess.DEVNULL if not verbose else None
-        stderr = subprocess.DEVNULL if not verbose else None
-        subprocess.run(shlex.split(cmd), stdout=stdout, stderr=stderr)
-        os.chdir("../")
+        proc = subprocess.run(cmd, stdout=stdout)
+        if proc.returncode != 0:
+            raise RuntimeError("hermesc failed - cmd: {}".format(" ".join(cmd)))
 
     @classmethod
-    def get_assets_size(cls, app_id):
-        assets_dir = Path(
-            "android/{}/build/intermediates/merged_assets/release/out".format(app_id)
+    def build_cached(
+        cls, overlay=None, hermesc=None, verbose=False, entry_file="index.js"
+    ):
+        """Returns the cached bundle or builds it
+
+        With `hermesc` the bundle is compiled into Hermes bytecode. `overlay`
+        works as in `ApkTool.build_cached()`. `entry_file` picks another entry
+        than the app, e.g. the host entries of `src/Host/`.
+        """
+        overlay_key = overlay.cache_key if overlay is not None else None
+        key = BundleCache.compute_key(
+            overlay_key=overlay_key, hermesc=hermesc, entry_file=entry_file
         )
-        return sum(f.stat().st_size for f in assets_dir.glob("**/*") if f.is_file())
+        bundle_file = BundleCache.lookup(key)
+        if bundle_file is not None:
+            return bundle_file
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            js_file = os.path.join(tmp_dir, "index.android.bundle")
+            with overlay or contextlib.nullcontext() as extra_env:
+                # NOTE: Like react.gradle, bundles for Hermes are not minified
+                cls.build(
+                    js_file,
+                    minify=hermesc is None,
+                    verbose=verbose,
+                    extra_env=extra_env,
+                    entry_file=entry_file,
+                )
+            if hermesc is None:
+                return BundleCache.store(key, js_file)
+            hbc_file = js_file + ".hbc"
+            cls.compile_hermes(hermesc, js_file, hbc_file, verbose=verbose)
+            return BundleCache.store(key, hbc_file)
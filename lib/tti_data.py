@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import random
+import re
+import string
+import tempfile
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TTIDataGenerator:
+    """Streams a JSON payload of about `size` bytes into a file
+
+    The payload is generated element by element and written through a
+    buffered file, so memory usage does not depend on `size`. The output only
+    depends on (size, shape, seed).
+
+    Shapes:
+      - repeat: a single string of repeated "a", compresses trivially
+      - objects: nested records, like an API response
+      - strings: a table of random words and sentences
+      - numbers: arrays of integers and floats
+      - mixed: all of the above, interleaved
+    """
+
+    SHAPES = ("repeat", "objects", "strings", "numbers", "mixed")
+
+    CHUNK_SIZE = 1024 * 1024
+
+    # Words are drawn from a fixed vocabulary, like real text and identifiers
+    VOCABULARY_SIZE = 4096
+
+    def __init__(self, size, shape="repeat", seed=0):
+        if shape not in self.SHAPES:
+            raise ValueError("Unknown TTI data shape - {}".format(shape))
+        self._size = size
+        self._shape = shape
+        self._seed = seed
+
+    def write(self, path):
+        header = (
+            '{{"description": "GENERATE_FAKE_DATA", "size": {}, "shape": "{}",'
+            ' "data": '.format(self._size, self._shape)
+        )
+        with open(path, "w", encoding="ascii", buffering=self.CHUNK_SIZE) as f:
+            f.write(header)
+            written = len(header)
+            if self._shape == "repeat":
+                # NOTE: The size leaves room for the quotes and the closing brace
+                written += self._write_repeat(f, self._size - written - 3)
+            else:
+                written += self._write_array(f, self._size - written - 1)
+            f.write("}")
+            written += 1
+        assert os.path.getsize(path) == written
+        # NOTE: Arrays stop at an element boundary, only repeat is exact
+        assert self._shape != "repeat" or written == max(self._size, len(header) + 3)
+        logger.debug(
+            "TTIDataGenerator - write {} bytes of {} to {}".format(
+                written, self._shape, path
+            )
+        )
+        return written
+
+    def _write_repeat(self, f, size):
+        size = max(0, size)
+        f.write('"')
+        chunk = "a" * min(size, self.CHUNK_SIZE)
+        remaining = size
+        while remaining > 0:
+            f.write(chunk[:remaining])
+            remaining -= len(chunk)
+        f.write('"')
+        return size + 2
+
+    def _write_array(self, f, size):
+        rng = random.Random(self._seed)
+        vocabulary = [
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 12)))
+            for _ in range(self.VOCABULARY_SIZE)
+        ]
+        element_factories = {
+            "objects": (self._create_object,),
+            "strings": (self._create_string,),
+            "numbers": (self._create_numbers,),
+            "mixed": (self._create_object, self._create_string, self._create_numbers),
+        }[self._shape]
+
+        f.write("[")
+        written = 1
+        index = 0
+        # NOTE: Stops at the first element which reaches the size, so the
+        # output overshoots by less than one element
+        while written + 1 < size:
+            if index > 0:
+                f.write(",")
+                written += 1
+            factory = element_factories[index % len(element_factories)]
+            element = json.dumps(
+                factory(rng, vocabulary, index), separators=(",", ":")
+            )
+            f.write(element)
+            written += len(element)
+            index += 1
+        f.write("]")
+        return written + 1
+
+    @classmethod
+    def _create_object(cls, rng, vocabulary, index):
+        return {
+            "id": index,
+            "uuid": "{:032x}".format(rng.getrandbits(128)),
+            "name": " ".join(rng.choice(vocabulary) for _ in range(2)).title(),
+            "active": rng.random() < 0.5,
+            "score": round(rng.uniform(0, 100), 3),
+            "tags": [rng.choice(vocabulary) for _ in range(rng.randint(0, 5))],
+            "location": {
+                "lat": round(rng.uniform(-90, 90), 6),
+                "lng": round(rng.uniform(-180, 180), 6),
+                "address": {
+                    "city": rng.choice(vocabulary).title(),
+                    "zip": "{:05d}".format(rng.randint(0, 99999)),
+                },
+            },
+            "parent": rng.randint(0, index) if index > 0 else None,
+        }
+
+    @classmethod
+    def _create_string(cls, rng, vocabulary, index):
+        return " ".join(rng.choices(vocabulary, k=rng.randint(1, 24))).capitalize()
+
+    @classmethod
+    def _create_numbers(cls, rng, vocabulary, index):
+        if index % 2 == 0:
+            return [rng.randint(-(2 ** 31), 2 ** 31 - 1) for _ in range(32)]
+        return [round(rng.gauss(0, 1000), 4) for _ in range(32)]
+
+
+class TTIDataOverlay:
+    """Generated TTI data which metro.config.js resolves for `./data.json`
+
+    Entering the context writes the payload into a unique file under
+    OVERLAY_DIR and returns the environment variables pointing Metro at it,
+    so builds of different sizes can run at the same time and the checked-in
+    src/TTI/data.json is never touched. The file is removed on exit.
+    OVERLAY_DIR has to be inside the Metro project root to be bundled.
+    """
+
+    OVERLAY_DIR = "tti_data"
+    ENV_NAME = "RN_BENCH_TTI_DATA"
+
+    def __init__(self, size, shape="repeat", seed=0):
+        self._generator = TTIDataGenerator(size, shape, seed)
+        self._params = {"size": size, "shape": shape, "seed": seed}
+        self._path = None
+
+    @property
+    def cache_key(self):
+        """Identifies the payload without generating it"""
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps(self._params, sort_keys=True).encode("utf8"))
+        # NOTE: Changes to the generator change the payload as well
+        with open(__file__, "rb") as f:
+            hasher.update(f.read())
+        return hasher.hexdigest()
+
+    def __enter__(self):
+        os.makedirs(self.OVERLAY_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".json", dir=self.OVERLAY_DIR)
+        os.close(fd)
+        self._path = os.path.abspath(path)
+        try:
+            self._generator.write(self._path)
+        except BaseException:
+            os.remove(self._path)
+            raise
+        return {self.ENV_NAME: self._path}
+
+    def __exit__(self, type, value, traceback):
+        if self._path is not None and os.path.exists(self._path):
+            os.remove(self._path)
+        self._path = None
+
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 * 1024, "G": 1024 * 1024 * 1024}
+
+
+def parse_size(text):
+    """Parses "512K", "3M" or "1048576" into bytes, units are binary"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)(?:i?B)?\s*", text, re.I)
+    if match is None:
+        raise ValueError("Invalid size - {}".format(text))
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def format_size(size):
+    for unit in ("G", "M", "K"):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return "{}{}iB".format(size // SIZE_UNITS[unit], unit)
+    if size >= SIZE_UNITS["M"]:
+        return "{:.1f}MiB".format(size / SIZE_UNITS["M"])
+    return "{}B".format(size)
+
+
+def parse_size_sweep(spec):
+    """Parses a list of sizes from a sweep spec
+
+    Supported forms:
+      - "3M,10M,15M": explicit sizes
+      - "1M..64M" or "1M..64M:geometric": doubling from 1 MiB to 64 MiB
+      - "1M..64M:geometric:5": 5 geometrically spaced sizes
+      - "1M..64M:linear:8": 8 evenly spaced sizes
+    """
+    if ".." not in spec:
+        return sorted({parse_size(s) for s in spec.split(",") if s.strip()})
+
+    range_spec, _, options = spec.partition(":")
+    start_text, _, end_text = range_spec.partition("..")
+    start, end = parse_size(start_text), parse_size(end_text)
+    mode, _, steps_text = options.partition(":")
+    mode = mode or "geometric"
+    if start <= 0 or end < start:
+        raise ValueError("Invalid size range - {}".format(spec))
+    if mode not in ("geometric", "linear"):
+        raise ValueError("Unknown sweep mode - {}".format(mode))
+
+    if steps_text:
+        steps = int(steps_text)
+        if steps < 2:
+            return [start]
+        if mode == "geometric":
+            ratio = (end / start) ** (1 / (steps - 1))
+            sizes = [start * ratio ** i for i in range(steps)]
+        else:
+            sizes = [start + (end - start) * i / (steps - 1) for i in range(steps)]
+    else:
+        sizes = []
+        size = start
+        while size <= end:
+            sizes.append(size)
+            size = size * 2 if mode == "geometric" else size + start
+    return sorted({int(round(size)) for size in sizes})
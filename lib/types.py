@@ -7,3 +7,4 @@ class InstallProps(typing.TypedDict):
     verbose: bool
     maven_repo_prop: str
     extra_gradle_props: list[str]
+    dist_info: dict
@@ -5,7 +5,26 @@
  * @format
  */
 
+const path = require('path');
+const { resolve } = require('metro-resolver');
+const getPolyfills = require('react-native/rn-get-polyfills');
+
+// Generated TTI data from start.py, see lib/tti_data.py
+const TTI_DATA = process.env.RN_BENCH_TTI_DATA;
+// Modules importing the TTI data, the app view and the host entry
+const TTI_DATA_IMPORTERS = [
+  path.join(__dirname, 'src', 'TTI', 'TTIView.js'),
+  path.join(__dirname, 'src', 'Host', 'tti.js'),
+];
+
 module.exports = {
+  serializer: {
+    // Marks the start of the bundle execution for the TTI phase breakdown
+    getPolyfills: () => [
+      path.join(__dirname, 'src', 'TTI', 'startupMarker.js'),
+      ...getPolyfills(),
+    ],
+  },
   transformer: {
     getTransformOptions: async () => ({
       transform: {
@@ -16,5 +35,21 @@ module.exports = {
   },
   resolver: {
     blockList: [/\/js_dist\//],
+    resolveRequest: (context, moduleName, platform) => {
+      if (
+        TTI_DATA &&
+        moduleName.endsWith('/data.json') &&
+        TTI_DATA_IMPORTERS.includes(context.originModulePath)
+      ) {
+        return { type: 'sourceFile', filePath: TTI_DATA };
+      }
+      // NOTE: Falls back to the default resolution, `context.resolveRequest`
+      // is this function itself
+      return resolve(
+        { ...context, resolveRequest: null },
+        moduleName,
+        platform,
+      );
+    },
   },
 };
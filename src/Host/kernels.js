@@ -0,0 +1,14 @@
+/**
+ * Host entry of the JSKernels suite, see `start.py host`.
+ * `__HOST_ARGS__` is defined by the prelude the host runner prepends.
+ *
+ * @format
+ */
+
+import { runKernel } from '../JSKernels/kernels';
+
+const { kernel, duration, warmup } = global.__HOST_ARGS__;
+
+runKernel(kernel, duration, warmup).then(ops => {
+  console.log(`ops=${ops == null ? -1 : ops.toFixed(2)}`);
+});
@@ -0,0 +1,58 @@
+/**
+ * Host entry of the RenderComponentThroughput suite, see `start.py host`.
+ *
+ * Renders the list of RenderComponentThroughput with react-test-renderer,
+ * one more child per update, as host components instead of native views.
+ * `__HOST_ARGS__` is defined by the prelude the host runner prepends.
+ *
+ * @format
+ */
+
+import React from 'react';
+import TestRenderer from 'react-test-renderer';
+
+// NOTE: Host components in place of the native views of react-native
+const View = 'View';
+const Text = 'Text';
+const ScrollView = 'ScrollView';
+
+const Child = ({ id }) => (
+  <View style={styles.child}>
+    <Text style={styles.childText}>{id}</Text>
+  </View>
+);
+
+const List = ({ count }) => (
+  <ScrollView style={styles.scrollView}>
+    {Array.from({ length: count }, (_, i) => (
+      <Child key={i} id={i} />
+    ))}
+  </ScrollView>
+);
+
+const styles = {
+  scrollView: {
+    flex: 1,
+  },
+  child: {
+    alignSelf: 'center',
+    width: 120,
+    height: 16,
+    marginVertical: 8,
+    backgroundColor: 'lightblue',
+  },
+  childText: {
+    textAlign: 'center',
+  },
+};
+
+const { interval } = global.__HOST_ARGS__;
+
+let count = 1;
+const renderer = TestRenderer.create(<List count={count} />);
+const end = Date.now() + interval;
+while (Date.now() < end) {
+  count += 1;
+  renderer.update(<List count={count} />);
+}
+console.log(`count=${count}`);
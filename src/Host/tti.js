@@ -0,0 +1,12 @@
+/**
+ * Host entry of the TTI suite, see `start.py host`.
+ *
+ * Loads the TTI data, which `metro.config.js` resolves to the generated
+ * data like for TTIView, without React Native.
+ *
+ * @format
+ */
+
+import data from '../TTI/data.json';
+
+console.log(`size=${data.size}`);
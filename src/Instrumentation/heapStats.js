@@ -0,0 +1,55 @@
+/**
+ * JS heap and GC stats of the engine, logged as
+ * `HeapStats at=<label> heap_used=<bytes> heap_total=<bytes> gc_count=<n>
+ * gc_time=<ms>` under the console tag, see lib/heap_stats.py.
+ *
+ * Hermes exposes them to JS through `HermesInternal`, V8 through the
+ * V8HeapStats native module of the V8 app (android/v8-heap-stats), which
+ * counts the GCs from the time this module is loaded. jsc-android exposes
+ * none, so nothing is logged for JSC.
+ *
+ * @format
+ */
+
+import { NativeModules } from 'react-native';
+
+const V8HeapStats = NativeModules.V8HeapStats;
+const hasV8HeapStats = V8HeapStats != null && V8HeapStats.install();
+
+export function getHeapStats() {
+  const hermes = global.HermesInternal;
+  if (hermes != null && typeof hermes.getInstrumentedStats === 'function') {
+    const stats = hermes.getInstrumentedStats();
+    return {
+      heap_used: stats.js_allocatedBytes,
+      heap_total: stats.js_heapSize,
+      gc_count: stats.js_numGCs,
+      // NOTE: Cumulative wall time of the GCs in seconds
+      gc_time: Math.round(stats.js_gcTime * 1000),
+    };
+  }
+  if (hasV8HeapStats) {
+    const stats = V8HeapStats.getHeapStats();
+    if (stats != null) {
+      return { ...stats, gc_time: Math.round(stats.gc_time) };
+    }
+  }
+  return null;
+}
+
+export function logHeapStats(label = 'end') {
+  const stats = getHeapStats();
+  if (stats == null) {
+    return;
+  }
+  const fields = Object.keys(stats).map(key => `${key}=${stats[key]}`);
+  console.log(`HeapStats at=${label} ${fields.join(' ')}`);
+}
+
+/**
+ * Logs the stats every `interval` ms, returns the function to stop it
+ */
+export function startHeapStatsInterval(interval) {
+  const id = setInterval(() => logHeapStats('interval'), interval);
+  return () => clearInterval(id);
+}
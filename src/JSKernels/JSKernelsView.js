@@ -0,0 +1,61 @@
+/**
+ * @format
+ */
+
+import React, { useEffect, useState } from 'react';
+import { View, Text, StyleSheet } from 'react-native';
+import KERNELS, { runKernel } from './kernels';
+import { logHeapStats } from '../Instrumentation/heapStats';
+
+const JSKernelsView = ({ kernel, duration, warmup }) => {
+  const [status, setStatus] = useState('running');
+
+  useEffect(() => {
+    if (KERNELS[kernel] == null) {
+      console.log(`ops=-1 error=unknown kernel ${kernel}`);
+      setStatus('unknown kernel');
+      return;
+    }
+    // NOTE: Starts after the first frame, so the launch is not measured
+    setTimeout(async () => {
+      // eslint-disable-next-line no-bitwise
+      const ops = await runKernel(kernel, duration | 0, warmup | 0);
+      if (ops == null) {
+        console.log('ops=-1 error=unsupported');
+        setStatus('unsupported');
+        return;
+      }
+      logHeapStats();
+      console.log(`ops=${ops.toFixed(2)}`);
+      setStatus(`${ops.toFixed(2)} ops/sec`);
+    }, 0);
+  }, [kernel, duration, warmup]);
+
+  return (
+    <View style={styles.container}>
+      <Text style={styles.titleText}>{kernel}</Text>
+      <Text style={styles.statusText}>{status}</Text>
+    </View>
+  );
+};
+
+const styles = StyleSheet.create({
+  container: {
+    flex: 1,
+    backgroundColor: 'rgb(96, 64, 160)',
+    flexDirection: 'column',
+    justifyContent: 'center',
+  },
+  titleText: {
+    color: 'rgb(255, 255, 255)',
+    fontSize: 32,
+    textAlign: 'center',
+  },
+  statusText: {
+    color: 'rgb(255, 255, 255)',
+    fontSize: 20,
+    textAlign: 'center',
+  },
+});
+
+export default JSKernelsView;
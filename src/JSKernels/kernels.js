@@ -0,0 +1,182 @@
+/**
+ * Pure JS kernels of the JSKernels suite, without React or the bridge.
+ *
+ * Every kernel has a `setup()` building its input once and a `run(state)`
+ * doing one operation, which returns a value so the work is not optimized
+ * away. `async` kernels return a promise from `run()`.
+ *
+ * @format
+ */
+
+function createRecords(count) {
+  const records = [];
+  for (let i = 0; i < count; ++i) {
+    records.push({
+      id: i,
+      name: `user-${i}`,
+      email: `user${i}@example.com`,
+      active: i % 3 !== 0,
+      score: i * 1.25,
+      tags: ['alpha', 'beta', 'gamma'].slice(0, (i % 3) + 1),
+      address: { city: `city-${i % 50}`, zip: String(10000 + i) },
+    });
+  }
+  return records;
+}
+
+const json = {
+  setup: () => JSON.stringify(createRecords(200)),
+  run: text => {
+    const records = JSON.parse(text);
+    records[0].score += 1;
+    return JSON.stringify(records).length;
+  },
+};
+
+const regex = {
+  setup: () =>
+    createRecords(200)
+      .map(
+        record =>
+          `${record.name} <${record.email}> visited https://example.com/u/${record.id}?ref=${record.address.zip}`,
+      )
+      .join('\n'),
+  run: text => {
+    const emails = text.match(/[\w.+-]+@[\w-]+\.[\w.]+/g);
+    const urls = text.match(/https?:\/\/[^\s]+/g);
+    const masked = text.replace(/\d{5}/g, '*****');
+    return emails.length + urls.length + masked.length;
+  },
+};
+
+const string = {
+  setup: () => createRecords(200),
+  run: records => {
+    let html = '';
+    for (const record of records) {
+      html += `<li class="${record.active ? 'on' : 'off'}">` + record.name;
+      html += ' - ' + record.address.city.toUpperCase() + '</li>';
+    }
+    const words = html.split(' ');
+    return words.join('_').indexOf('city-49') + words.length;
+  },
+};
+
+const collections = {
+  setup: () => createRecords(1000).map(record => record.email),
+  run: keys => {
+    const map = new Map();
+    const set = new Set();
+    for (let i = 0; i < keys.length; ++i) {
+      map.set(keys[i], i);
+      set.add(i % 97);
+    }
+    let hits = 0;
+    for (let i = 0; i < keys.length; i += 2) {
+      if (map.has(keys[i])) {
+        hits += map.get(keys[i]);
+      }
+      map.delete(keys[i]);
+    }
+    return hits + map.size + set.size;
+  },
+};
+
+const typedArray = {
+  setup: () => ({
+    floats: new Float64Array(4096).map((_, i) => Math.sin(i)),
+    bytes: new Uint8Array(16384).map((_, i) => i * 31),
+  }),
+  run: ({ floats, bytes }) => {
+    let sum = 0;
+    for (let i = 0; i < floats.length; ++i) {
+      sum += floats[i] * floats[floats.length - 1 - i];
+    }
+    const copy = bytes.slice();
+    let checksum = 0;
+    for (let i = 0; i < copy.length; ++i) {
+      // eslint-disable-next-line no-bitwise
+      checksum = (checksum * 33 + copy[i]) | 0;
+    }
+    return sum + checksum;
+  },
+};
+
+const promise = {
+  async: true,
+  setup: () => 100,
+  run: async count => {
+    let total = 0;
+    for (let i = 0; i < count; ++i) {
+      total += await Promise.resolve(i);
+    }
+    const values = await Promise.all(
+      Array.from({ length: count }, (_, i) => Promise.resolve(i)),
+    );
+    return total + values.length;
+  },
+};
+
+const intl = {
+  // NOTE: Engines built without Intl, e.g. `intl: False` of JS_DISTS, are
+  // reported as unsupported
+  supported: () => typeof Intl !== 'undefined',
+  setup: () => ({
+    number: new Intl.NumberFormat('de-DE', {
+      style: 'currency',
+      currency: 'EUR',
+    }),
+    date: new Intl.DateTimeFormat('en-US', {
+      year: 'numeric',
+      month: 'long',
+      day: 'numeric',
+    }),
+  }),
+  run: ({ number, date }) => {
+    let length = 0;
+    for (let i = 0; i < 50; ++i) {
+      length += number.format(i * 1234.5).length;
+      length += date.format(new Date(2020, i % 12, (i % 28) + 1)).length;
+    }
+    return length;
+  },
+};
+
+const KERNELS = {
+  json,
+  regex,
+  string,
+  collections,
+  typed_array: typedArray,
+  promise,
+  intl,
+};
+
+/**
+ * Runs a kernel for `duration` ms after `warmup` ms and returns its ops/sec,
+ * or null if the engine does not support it.
+ */
+export async function runKernel(name, duration, warmup) {
+  const kernel = KERNELS[name];
+  if (kernel.supported != null && !kernel.supported()) {
+    return null;
+  }
+  const state = kernel.setup();
+  let sink = 0;
+  const runFor = async ms => {
+    const end = Date.now() + ms;
+    let ops = 0;
+    while (Date.now() < end) {
+      sink += kernel.async ? await kernel.run(state) : kernel.run(state);
+      ++ops;
+    }
+    return ops;
+  };
+  await runFor(warmup);
+  const start = Date.now();
+  const ops = await runFor(duration);
+  global.__jsKernelSink = sink;
+  return (ops * 1000) / (Date.now() - start);
+}
+
+export default KERNELS;
@@ -4,6 +4,7 @@
 
 import React, { useEffect, useLayoutEffect, useState, useRef } from 'react';
 import { ScrollView, View, Text, StyleSheet } from 'react-native';
+import { logHeapStats } from '../Instrumentation/heapStats';
 
 const Child = ({ id, onMount }) => {
   useLayoutEffect(() => {
@@ -29,6 +30,7 @@ const RenderComponentMemory = ({ totalCount }) => {
   function handleChildDidMount(id) {
     if (id >= totalCount) {
       setShouldContinue(false);
+      logHeapStats();
       console.log(`count=${latestChildren.current.length}`);
       return;
     }
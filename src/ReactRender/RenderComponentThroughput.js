@@ -4,6 +4,7 @@
 
 import React, { useEffect, useLayoutEffect, useState, useRef } from 'react';
 import { ScrollView, View, Text, StyleSheet } from 'react-native';
+import { logHeapStats } from '../Instrumentation/heapStats';
 
 const Child = ({ id, onMount }) => {
   useLayoutEffect(() => {
@@ -41,6 +42,7 @@ const RenderComponentThroughput = ({ interval }) => {
     const intervalInt = interval | 0;
     setTimeout(() => {
       setShouldContinue(false);
+      logHeapStats();
       console.log(`count=${latestChildren.current.length}`);
     }, intervalInt);
   }, [interval]);
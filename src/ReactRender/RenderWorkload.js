@@ -0,0 +1,235 @@
+/**
+ * Render workloads picked by the `workload` query, each sized by `count`.
+ * Every workload logs `time=<ms>` once done, see RenderWorkloadSuite.
+ *
+ * @format
+ */
+
+import React, {
+  useCallback,
+  useEffect,
+  useLayoutEffect,
+  useMemo,
+  useRef,
+  useState,
+} from 'react';
+import { FlatList, ScrollView, View, Text, StyleSheet } from 'react-native';
+import { logHeapStats } from '../Instrumentation/heapStats';
+
+const ITEM_HEIGHT = 32;
+// Items scrolled per frame by the flatlist workload, a few screens
+const FLATLIST_STEP = 60;
+// Updates of every item by the bulk_update workload
+const BULK_UPDATE_ROUNDS = 20;
+// Nesting depth of every branch of the deep_tree workload
+const DEEP_TREE_DEPTH = 32;
+// Mount and unmount cycles of the churn workload
+const CHURN_ROUNDS = 10;
+
+const Item = ({ label, onLayout }) => (
+  <View style={styles.item} onLayout={onLayout}>
+    <Text style={styles.itemText}>{label}</Text>
+  </View>
+);
+
+function logTime(time) {
+  logHeapStats();
+  console.log(`time=${time}`);
+}
+
+function createItems(count, render) {
+  return Array.from({ length: count }, (_, i) => render(i));
+}
+
+// Scrolls a virtualized list to the end without animation, which renders new
+// windows of items as fast as the JS thread keeps up. Done once the window of
+// the last item is rendered and laid out, not when the offset reaches the end
+const FlatListWorkload = ({ count }) => {
+  const listRef = useRef(null);
+  const startTime = useRef(0);
+  const done = useRef(false);
+  const data = useMemo(() => createItems(count, i => i), [count]);
+
+  useEffect(() => {
+    startTime.current = Date.now();
+    const end = count * ITEM_HEIGHT;
+    let offset = 0;
+    let frame = requestAnimationFrame(function step() {
+      offset = Math.min(offset + FLATLIST_STEP * ITEM_HEIGHT, end);
+      listRef.current.scrollToOffset({ offset, animated: false });
+      if (offset < end) {
+        frame = requestAnimationFrame(step);
+      }
+    });
+    return () => cancelAnimationFrame(frame);
+  }, [count]);
+
+  const handleLastItemLayout = useCallback(() => {
+    if (!done.current) {
+      done.current = true;
+      logTime(Date.now() - startTime.current);
+    }
+  }, []);
+
+  const renderItem = useCallback(
+    ({ item }) => (
+      <Item
+        label={item}
+        onLayout={item === count - 1 ? handleLastItemLayout : undefined}
+      />
+    ),
+    [count, handleLastItemLayout],
+  );
+
+  return (
+    <FlatList
+      ref={listRef}
+      data={data}
+      renderItem={renderItem}
+      keyExtractor={item => String(item)}
+      getItemLayout={(_, index) => ({
+        length: ITEM_HEIGHT,
+        offset: ITEM_HEIGHT * index,
+        index,
+      })}
+    />
+  );
+};
+
+// Re-renders every mounted item with a new label, the mean ms per update
+const BulkUpdateWorkload = ({ count }) => {
+  const [round, setRound] = useState(0);
+  const startTime = useRef(0);
+  const totalTime = useRef(0);
+
+  useLayoutEffect(() => {
+    // NOTE: The initial mount is not measured
+    if (round > 0) {
+      totalTime.current += Date.now() - startTime.current;
+    }
+    if (round < BULK_UPDATE_ROUNDS) {
+      setTimeout(() => {
+        startTime.current = Date.now();
+        setRound(value => value + 1);
+      }, 0);
+    } else {
+      logTime((totalTime.current / BULK_UPDATE_ROUNDS).toFixed(1));
+    }
+  }, [round]);
+
+  return (
+    <ScrollView style={styles.scrollView}>
+      {createItems(count, i => (
+        <Item key={i} label={`${i}:${round}`} />
+      ))}
+    </ScrollView>
+  );
+};
+
+const Branch = ({ depth, id }) =>
+  depth === 0 ? (
+    <Text style={styles.itemText}>{id}</Text>
+  ) : (
+    <View style={styles.branch}>
+      <Branch depth={depth - 1} id={id} />
+    </View>
+  );
+
+// Mounts `count` views nested DEEP_TREE_DEPTH deep, until the native layout
+const DeepTreeWorkload = ({ count }) => {
+  const startTime = useRef(Date.now());
+  const done = useRef(false);
+
+  function handleLayout() {
+    if (!done.current) {
+      done.current = true;
+      logTime(Date.now() - startTime.current);
+    }
+  }
+
+  return (
+    <ScrollView style={styles.scrollView}>
+      <View onLayout={handleLayout}>
+        {createItems(Math.ceil(count / DEEP_TREE_DEPTH), i => (
+          <Branch key={i} depth={DEEP_TREE_DEPTH} id={i} />
+        ))}
+      </View>
+    </ScrollView>
+  );
+};
+
+// Mounts and unmounts `count` items, the mean ms per cycle
+const ChurnWorkload = ({ count }) => {
+  const [round, setRound] = useState(0);
+  const startTime = useRef(0);
+  const totalTime = useRef(0);
+
+  useLayoutEffect(() => {
+    // NOTE: The initial mount is not measured, odd rounds unmount the items
+    // and even rounds mount them again
+    if (round > 0) {
+      totalTime.current += Date.now() - startTime.current;
+    }
+    if (round < CHURN_ROUNDS * 2) {
+      setTimeout(() => {
+        startTime.current = Date.now();
+        setRound(value => value + 1);
+      }, 0);
+    } else {
+      logTime((totalTime.current / CHURN_ROUNDS).toFixed(1));
+    }
+  }, [round]);
+
+  return (
+    <ScrollView style={styles.scrollView}>
+      {round % 2 === 0 && createItems(count, i => <Item key={i} label={i} />)}
+    </ScrollView>
+  );
+};
+
+const WORKLOADS = {
+  flatlist: FlatListWorkload,
+  bulk_update: BulkUpdateWorkload,
+  deep_tree: DeepTreeWorkload,
+  churn: ChurnWorkload,
+};
+
+const RenderWorkload = ({ workload, count }) => {
+  const Workload = WORKLOADS[workload];
+
+  useEffect(() => {
+    if (Workload == null) {
+      console.log(`error=unknown workload ${workload}`);
+    }
+  }, [Workload, workload]);
+
+  if (Workload == null) {
+    return null;
+  }
+  // eslint-disable-next-line no-bitwise
+  return <Workload count={count | 0} />;
+};
+
+const styles = StyleSheet.create({
+  scrollView: {
+    flex: 1,
+  },
+  item: {
+    alignSelf: 'center',
+    width: 120,
+    height: ITEM_HEIGHT,
+    justifyContent: 'center',
+    backgroundColor: 'lightblue',
+  },
+  itemText: {
+    textAlign: 'center',
+  },
+  branch: {
+    // NOTE: A border keeps the view from being collapsed as layout-only
+    paddingLeft: 1,
+    borderLeftWidth: 1,
+    borderColor: 'lightblue',
+  },
+});
+
+export default RenderWorkload;
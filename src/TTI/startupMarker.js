@@ -0,0 +1,19 @@
+/**
+ * Runs as the first polyfill of the bundle and logs when the bundle starts to
+ * execute, i.e. after the engine read and parsed or loaded it.
+ * `nativePerformanceNow` uses the same clock as `SystemClock.uptimeMillis()`
+ * in MainApplication.
+ *
+ * @format
+ */
+
+if (
+  typeof global.nativeLoggingHook === 'function' &&
+  typeof global.nativePerformanceNow === 'function'
+) {
+  global.nativeLoggingHook(
+    'MeasureTTI mark=JS_EXECUTION_START t=' +
+      Math.round(global.nativePerformanceNow()),
+    1,
+  );
+}
@@ -1,17 +1,54 @@
 #!/usr/bin/env python
 import argparse
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import functools
 from gettext import install
 import glob
 import json
 import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
 import sys
 import tempfile
+import time
 import typing
+import zipfile
 from js_dists import JS_DISTS
+from lib.builder import ApkBuilder, BuildRequest
+from lib.chart_data import ChartDataGenerator
 from lib.colorful import colorful
+from lib.device_state import DeviceStateController
+from lib.dist_cache import BinarySizeCache, DistCache
+from lib.frame_stats import FrameStatsSampler
+from lib.heap_stats import HeapStatsCollector
+from lib.host_engine import HostEngine
+from lib.apk_cache import ApkCache
+from lib.compare import HIGHER_IS_BETTER, LOWER_IS_BETTER, RegressionDetector
 from lib.logger import get_logger, setup_logger
+from lib.matrix import BenchmarkMatrix, load_matrix
+from lib.memory_sampler import MemorySampler
+from lib.planner import Planner
+from lib.profiler import SimpleperfProfiler
+from lib.result_store import ResultRecord, ResultStore
+from lib.scheduler import DeviceScheduler, Job, JobResult, RetryPolicy
 from lib.section import h1, h2
-from lib.tools import AdbTool, ApkTool
+from lib.size_report import create_size_report, format_size_report
+from lib.startup_phases import parse_startup_phases
+from lib.stats import StoppingRule, loglog_slopes, summarize
+from lib.tools import AdbTool, ApkTool, BundleTool
+from lib.tti_data import (
+    TTIDataGenerator,
+    TTIDataOverlay,
+    format_size,
+    parse_size,
+    parse_size_sweep,
+)
 from lib.types import InstallProps
 
 
@@ -20,141 +57,244 @@ ROOT_DIR = os.path.dirname(os.path.realpath(__file__))
 logger = get_logger(__name__)
 
 
+def with_heap_stats_interval(path_with_query, heap_stats_interval):
+    """Asks the app to also log the JS heap stats every N ms, 0 to only log once"""
+    if heap_stats_interval <= 0:
+        return path_with_query
+    return "{}&heapStatsInterval={}".format(path_with_query, heap_stats_interval)
+
+
+def create_run_samplers(stack, app_id, memory_sample_interval, frame_stats=False):
+    """Enters the samplers of a render run into `stack`, returns them
+
+    The memory and frame stats are polled over adb inside the measured
+    window, which disturbs the result. Memory is not sampled when
+    `memory_sample_interval` is None, the frame stats are opt-in.
+    """
+    samplers = [stack.enter_context(HeapStatsCollector())]
+    if memory_sample_interval is not None:
+        samplers.append(
+            stack.enter_context(MemorySampler(app_id, memory_sample_interval))
+        )
+    if frame_stats:
+        samplers.append(stack.enter_context(FrameStatsSampler(app_id)))
+    return samplers
+
+
 class RenderComponentThroughput:
-    def __init__(self, name, app_id, interval):
+    def __init__(
+        self,
+        name,
+        app_id,
+        interval,
+        memory_sample_interval=1.0,
+        heap_stats_interval=0,
+        frame_stats=False,
+    ):
         self._name = name
         self._app_id = app_id
         self._interval = interval
+        self._memory_sample_interval = memory_sample_interval
+        self._heap_stats_interval = heap_stats_interval
+        self._frame_stats = frame_stats
 
     def run(self):
         AdbTool.stop_apps()
-        AdbTool.clear_log()
-        AdbTool.start_with_link(
-            self._app_id,
-            "/RenderComponentThroughput?interval={}".format(self._interval),
-        )
-        result = AdbTool.wait_for_console_log(r"count=(\d+)").group(1)
+        with contextlib.ExitStack() as stack:
+            samplers = create_run_samplers(
+                stack, self._app_id, self._memory_sample_interval, self._frame_stats
+            )
+            result = AdbTool.start_and_wait_for_log(
+                self._app_id,
+                with_heap_stats_interval(
+                    "/RenderComponentThroughput?interval={}".format(self._interval),
+                    self._heap_stats_interval,
+                ),
+                r"count=(\d+)",
+                timeout=self._interval / 1000 + 120,
+            ).group(1)
         memory = AdbTool.get_memory(self._app_id)
-        return (int(result), int(memory))
-
-    def run_with_average(self, times):
-        ret = {
-            "result": 0,
-            "memory": 0,
-        }
-        for _ in range(times):
-            (result, memory) = self.run()
-            ret["result"] += result
-            ret["memory"] += memory
-
-        # NOTE(kudo): Keeps thing simpler to trim as integer
-        ret["result"] = int(ret["result"] / times)
-        ret["memory"] = int(ret["memory"] / times)
+        ret = {"result": int(result), "memory": int(memory)}
+        for sampler in samplers:
+            ret.update(sampler.summary())
         return ret
 
 
 class RenderComponentMemory:
-    def __init__(self, name, app_id, total_count):
+    TIMEOUT = 600
+
+    def __init__(
+        self,
+        name,
+        app_id,
+        total_count,
+        memory_sample_interval=1.0,
+        heap_stats_interval=0,
+    ):
         self._name = name
         self._app_id = app_id
         self._total_count = total_count
+        self._memory_sample_interval = memory_sample_interval
+        self._heap_stats_interval = heap_stats_interval
 
     def run(self):
         AdbTool.stop_apps()
-        AdbTool.clear_log()
-        AdbTool.start_with_link(
-            self._app_id,
-            "/RenderComponentMemory?totalCount={}".format(self._total_count),
-        )
-        result = AdbTool.wait_for_console_log(r"count=(\d+)").group(1)
+        with MemorySampler(
+            self._app_id, self._memory_sample_interval
+        ) as sampler, HeapStatsCollector() as heap_collector:
+            result = AdbTool.start_and_wait_for_log(
+                self._app_id,
+                with_heap_stats_interval(
+                    "/RenderComponentMemory?totalCount={}".format(self._total_count),
+                    self._heap_stats_interval,
+                ),
+                r"count=(\d+)",
+                timeout=self.TIMEOUT,
+            ).group(1)
         memory = AdbTool.get_memory(self._app_id)
-        return (int(result), int(memory))
-
-    def run_with_average(self, times):
-        ret = {
-            "result": 0,
-            "memory": 0,
+        return {
+            "result": int(result),
+            "memory": int(memory),
+            **sampler.summary(),
+            **heap_collector.summary(),
         }
-        for _ in range(times):
-            (result, memory) = self.run()
-            ret["result"] += result
-            ret["memory"] += memory
-
-        # NOTE(kudo): Keeps thing simpler to trim as integer
-        ret["result"] = int(ret["result"] / times)
-        ret["memory"] = int(ret["memory"] / times)
-        return ret
 
 
-class TTI:
-    def __init__(self, name, app_id, size):
+class RenderWorkload:
+    TIMEOUT = 600
+
+    def __init__(
+        self,
+        name,
+        app_id,
+        workload,
+        count,
+        memory_sample_interval=1.0,
+        heap_stats_interval=0,
+        frame_stats=False,
+    ):
         self._name = name
         self._app_id = app_id
-        self._size = size
+        self._workload = workload
+        self._count = count
+        self._memory_sample_interval = memory_sample_interval
+        self._heap_stats_interval = heap_stats_interval
+        self._frame_stats = frame_stats
 
-    def run(self, apk_install_kwargs):
-        data_file_path = os.path.join(ROOT_DIR, "src", "TTI", "data.json")
-        with self.PatchBundleContext(data_file_path, self._size):
-            ApkTool.reinstall(**apk_install_kwargs)
-            result = self._run_batch_with_average(3)
-            logger.info(
-                "{app} tti={tti}, assets_size={assets_size} MiB".format(
-                    app=self._name,
-                    tti=result["tti"],
-                    assets_size=result["assets_size"],
-                )
+    def run(self):
+        AdbTool.stop_apps()
+        with contextlib.ExitStack() as stack:
+            samplers = create_run_samplers(
+                stack, self._app_id, self._memory_sample_interval, self._frame_stats
             )
+            result = AdbTool.start_and_wait_for_log(
+                self._app_id,
+                with_heap_stats_interval(
+                    "/RenderWorkload?workload={}&count={}".format(
+                        self._workload, self._count
+                    ),
+                    self._heap_stats_interval,
+                ),
+                r"time=([\d.]+)",
+                timeout=self.TIMEOUT,
+            ).group(1)
+        memory = AdbTool.get_memory(self._app_id)
+        ret = {"time": float(result), "memory": int(memory)}
+        for sampler in samplers:
+            ret.update(sampler.summary())
+        return ret
 
-    class PatchBundleContext:
-        def __init__(self, data_file_path, size):
-            self._data_file_path = data_file_path
-            self._size = size
 
-        def __enter__(self):
-            os.rename(self._data_file_path, self._data_file_path + ".bak")
-            with open(self._data_file_path, "w") as f:
-                f.write(self._generate_json_string(self._size))
+class TTI:
+    TIMEOUT = 120
 
-        def _generate_json_string(self, size):
-            data = {
-                "description": "GENERATE_FAKE_DATA",
-                "size": size,
-                "data": "a" * size,
-            }
-            return json.dumps(data)
+    # cold: force-stop and drop the page cache, as after a reboot
+    # warm: restart the process with the page cache and code cache in place
+    # hot: recreate the activity in the running process
+    LAUNCH_MODES = ("cold", "warm", "hot")
 
-        def __exit__(self, type, value, traceback):
-            os.rename(self._data_file_path + ".bak", self._data_file_path)
+    _warned_drop_caches = False
 
-    @classmethod
-    def _wait_for_tti_log(cls):
-        return int(AdbTool.wait_for_log(r"TTI=(\d+)", "MeasureTTI").group(1))
+    def __init__(self, name, app_id, size, launch_mode="cold"):
+        self._name = name
+        self._app_id = app_id
+        self._size = size
+        self._launch_mode = launch_mode
+
+    def run(self, apk_file, bundle_file=None):
+        if bundle_file is not None:
+            bundle_name = AdbTool.push_bundle(self._app_id, bundle_file)
+            return {
+                **self._run_batch("/TTI?bundleFile=" + bundle_name),
+                "bundle_size": round(os.path.getsize(bundle_file) / 1024 / 1024, 2),
+            }
+        return {
+            **self._run_batch(),
+            "assets_size": round(ApkTool.get_assets_size(apk_file) / 1024 / 1024, 2),
+        }
 
-    @classmethod
-    def _start(cls, app_id):
-        os.system(
-            'adb shell am start -a android.intent.action.VIEW -d "rnbench://{}/TTI" > /dev/null'.format(
-                app_id
-            )
+    def _run_batch(self, path_with_query="/TTI"):
+        AdbTool.stop_apps()
+        if self._launch_mode == "cold":
+            if not AdbTool.drop_caches() and not TTI._warned_drop_caches:
+                TTI._warned_drop_caches = True
+                logger.warning(
+                    "TTI - Unable to drop the page cache without root,"
+                    " cold launches only force-stop the app"
+                )
+            return self._launch(path_with_query)
+
+        # NOTE: Primes the process and caches with a launch which is not measured
+        self._launch(path_with_query)
+        if self._launch_mode == "warm":
+            AdbTool.stop_app(self._app_id)
+            return self._launch(path_with_query)
+        return self._launch(path_with_query, clear_task=True)
+
+    def _launch(self, path_with_query, clear_task=False):
+        # NOTE: The startup marks come from MainApplication and the first JS
+        # polyfill, which logs under the console tag
+        collector = AdbTool.get_logcat().collect(
+            r"(?:MeasureTTI )?(\w+=.*)", tag=r"(?:MeasureTTI|ReactNativeJS)"
         )
+        try:
+            search = AdbTool.start_and_wait_for_log(
+                self._app_id,
+                path_with_query,
+                r"TTI=(\d+)",
+                tag="MeasureTTI",
+                timeout=self.TIMEOUT,
+                clear_task=clear_task,
+            )
+        finally:
+            matches = collector.stop()
+        return {
+            "tti": int(search.group(1)),
+            **parse_startup_phases(match.group(1) for match in matches),
+        }
+
+
+class JSKernels:
+    def __init__(self, name, app_id, kernel, duration, warmup):
+        self._name = name
+        self._app_id = app_id
+        self._kernel = kernel
+        self._duration = duration
+        self._warmup = warmup
 
-    def _run_batch(self):
+    def run(self):
         AdbTool.stop_apps()
-        AdbTool.clear_log()
-        self._start(self._app_id)
-        return self._wait_for_tti_log()
-
-    def _run_batch_with_average(self, times):
-        result = {
-            "tti": 0,
-            "assets_size": 0,
-        }
-        for _ in range(times):
-            result["tti"] += self._run_batch()
-            result["assets_size"] += ApkTool.get_assets_size(self._app_id)
-        result["tti"] = int(result["tti"] / times)
-        result["assets_size"] = round((result["assets_size"] / times) / 1024 / 1024, 2)
-        return result
+        with HeapStatsCollector() as heap_collector:
+            result = AdbTool.start_and_wait_for_log(
+                self._app_id,
+                "/JSKernels?kernel={}&duration={}&warmup={}".format(
+                    self._kernel, self._duration, self._warmup
+                ),
+                r"ops=(-?[\d.]+)",
+                timeout=(self._duration + self._warmup) / 1000 + 120,
+            ).group(1)
+        # NOTE: -1 if the engine does not support the kernel, e.g. Intl
+        return {"ops": float(result), **heap_collector.summary()}
 
 
 class JSDistManager:
@@ -167,14 +307,24 @@ class JSDistManager:
         self._dist_info = JS_DISTS[self._dist_id]
         self._extra_gradle_props = kwargs.get("extra_gradle_props", [])
         self.install_props: typing.Optional[InstallProps] = None
+        self._aar_hash = None
 
-    def prepare(self):
+    def prepare(self, mirror=None, require_integrity=False):
         js_dist_path = os.path.join(self.STORE_DIST_DIR, self._dist_id)
         maven_dist_path = os.path.join(js_dist_path, self._dist_info["maven_dist_path"])
         if not os.path.isdir(maven_dist_path):
-            logger.info("JSDistManager::prepare() - Download and extract\n")
-            os.system("mkdir -p {}".format(js_dist_path))
-            self._download_dist(self._dist_info["download_url"], js_dist_path)
+            logger.info(
+                "JSDistManager::prepare() - Download and extract {}\n".format(
+                    self._dist_id
+                )
+            )
+            tarball = DistCache.fetch(
+                self._dist_info["download_url"],
+                integrity=self._dist_info.get("integrity"),
+                mirror=mirror,
+                require_integrity=require_integrity,
+            )
+            DistCache.extract(tarball, js_dist_path)
         return maven_dist_path
 
     def create_install_props(self, abi: str, verbose: bool) -> InstallProps:
@@ -195,10 +345,11 @@ class JSDistManager:
             "verbose": verbose,
             "maven_repo_prop": "MAVEN_REPO=" + self.prepare(),
             "extra_gradle_props": extra_gradle_props,
+            "dist_info": self._dist_info,
         }
         return self.install_props
 
-    def get_binary_size(self, abi):
+    def get_aar_path(self):
         js_dist_path = os.path.join(self.STORE_DIST_DIR, self._dist_id)
         if not os.path.exists(js_dist_path):
             raise RuntimeError("js_dist_path is not existed - " + js_dist_path)
@@ -206,33 +357,82 @@ class JSDistManager:
             os.path.join(js_dist_path, self._dist_info["aar_glob"]), recursive=True
         )
         if len(aar_paths) < 1:
+            return None
+        return aar_paths[0]
+
+    def extract_native_libraries(self, abi):
+        """Extracts the unstripped libraries of the AAR, e.g. to symbolize profiles
+
+        Returns the directory of the libraries, None if there is no AAR.
+        """
+        aar_path = self.get_aar_path()
+        if aar_path is None:
+            return None
+        output_dir = os.path.join(DistCache.CACHE_DIR, "symbols", self._dist_id, abi)
+        if os.path.isdir(output_dir):
+            return output_dir
+        # NOTE: Extracted aside and renamed, as workers may extract at once
+        os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=os.path.dirname(output_dir))
+        prefix = "jni/{}/".format(abi)
+        with zipfile.ZipFile(aar_path) as aar:
+            for name in aar.namelist():
+                if name.startswith(prefix) and name.endswith(".so"):
+                    logger.debug("extract_native_libraries - extract {}".format(name))
+                    path = os.path.join(temp_dir, os.path.basename(name))
+                    with open(path, "wb") as f:
+                        f.write(aar.read(name))
+        try:
+            os.rename(temp_dir, output_dir)
+        except OSError:
+            shutil.rmtree(temp_dir)
+        return output_dir
+
+    def get_binary_size(self, abi):
+        aar_path = self.get_aar_path()
+        if aar_path is None:
             return -1
-        aar_path = aar_paths[0]
-        binary_path = os.path.join("jni", abi, self._dist_info["binary_name"])
+        if self._aar_hash is None:
+            self._aar_hash = ApkCache.hash_file(aar_path)
+        key = BinarySizeCache.compute_key(self._dist_id, abi, self._aar_hash)
+        size = BinarySizeCache.lookup(key)
+        if size is not None:
+            return size
+
+        binary_path = "jni/{}/{}".format(abi, self._dist_info["binary_name"])
         output_file = tempfile.NamedTemporaryFile(delete=False)
         output_path = output_file.name
-        output_file.close()
-        cmd = "unzip -p {aar_path} {binary_path} > {output_path}".format(
-            aar_path=aar_path, binary_path=binary_path, output_path=output_path
-        )
-        logger.debug("get_binary_size - cmd: {}".format(cmd))
-        os.system(cmd)
+        with output_file, zipfile.ZipFile(aar_path) as aar:
+            logger.debug("get_binary_size - extract {}".format(binary_path))
+            output_file.write(aar.read(binary_path))
         self._strip_binary(output_path, abi)
         size = round(float(os.path.getsize(output_path)) / 1024 / 1024, 2)
         os.unlink(output_path)
+        BinarySizeCache.store(key, size)
         return size
 
     @property
     def info(self):
         return self._dist_info
 
-    @classmethod
-    def _download_dist(cls, url, output_path):
-        cmd = 'wget -O- "{url}" | tar x - -C "{output_path}"'.format(
-            url=url, output_path=output_path
+    @property
+    def dist_id(self):
+        return self._dist_id
+
+    def get_hermesc(self):
+        """Returns the Hermes compiler shipped with the dist, None for other engines"""
+        if self.app_id != "hermes":
+            return None
+        bin_dirs = {"darwin": "osx-bin", "linux": "linux64-bin"}
+        if sys.platform not in bin_dirs:
+            raise RuntimeError("No hermesc for the platform - {}".format(sys.platform))
+        return os.path.join(
+            self.STORE_DIST_DIR,
+            self._dist_id,
+            "package",
+            bin_dirs[sys.platform],
+            "hermesc",
         )
-        logger.debug("download_dist - cmd: {}".format(cmd))
-        os.system(cmd)
 
     @classmethod
     def _strip_binary(cls, file_path, abi):
@@ -258,6 +458,59 @@ class JSDistManager:
         os.system(cmd)
 
 
+# Code cache variants of v8-android-jit, see `v8.cacheMode` of react-native-v8
+V8_CACHE_MODES = {
+    "normal": "normal codecache",
+    "prebuilt": "prebuilt cache",
+    "normalWithStubBundle": "cache with stub bundle",
+}
+
+
+def create_v8_cache_dist(cache_mode):
+    """Raises RuntimeError if the V8 tools do not match the version of the dist"""
+    dist_info = JS_DISTS["v8_100_jit"]
+    extra_gradle_props = ["v8.cacheMode={}".format(cache_mode)]
+    if cache_mode == "prebuilt":
+        tools_dir = os.path.join(ROOT_DIR, "node_modules", dist_info["tools_package"])
+        try:
+            with open(os.path.join(tools_dir, "package.json")) as f:
+                tools_version = json.load(f)["version"]
+        except (OSError, ValueError, KeyError):
+            tools_version = None
+        if tools_version != dist_info["version"]:
+            raise RuntimeError(
+                "{} {} does not match v8-android-jit {}".format(
+                    dist_info["tools_package"], tools_version, dist_info["version"]
+                )
+            )
+        extra_gradle_props.append(
+            "v8.android.tools.dir={}".format(os.path.join(tools_dir, "v8-android-jit"))
+        )
+    return JSDistManager(
+        name="v8-android-jit + {}".format(V8_CACHE_MODES[cache_mode]),
+        app_id="v8",
+        dist_id="v8_100_jit",
+        extra_gradle_props=extra_gradle_props,
+    )
+
+
+def prepare_dists(
+    js_dist_managers: list[JSDistManager], mirror=None, require_integrity=False
+):
+    """Downloads and extracts the dists at the same time"""
+    # NOTE: Dists sharing a dist_id, e.g. the V8 cache modes, share the files
+    dists = {dist.dist_id: dist for dist in js_dist_managers}
+    if len(dists) == 0:
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(dists)) as executor:
+        futures = [
+            executor.submit(dist.prepare, mirror, require_integrity)
+            for dist in dists.values()
+        ]
+        for future in futures:
+            future.result()
+
+
 def show_configs(abis, js_dist_managers: list[JSDistManager]):
     logger.info(h2("ABIs: {}".format(", ".join(abis))))
 
@@ -275,6 +528,26 @@ def show_configs(abis, js_dist_managers: list[JSDistManager]):
         logger.info("\n")
 
 
+def parse_choices(text, choices):
+    values = [value.strip() for value in text.split(",") if value.strip()]
+    for value in values:
+        if value not in choices:
+            raise argparse.ArgumentTypeError(
+                "invalid choice: {} (choose from {})".format(value, ", ".join(choices))
+            )
+    return values
+
+
+def parse_positive_float(text):
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid number: {}".format(text))
+    if value <= 0:
+        raise argparse.ArgumentTypeError("must be positive: {}".format(text))
+    return value
+
+
 def parse_args():
     arg_parser = argparse.ArgumentParser()
 
@@ -287,10 +560,168 @@ def parse_args():
     arg_parser.add_argument(
         "--config-only", action="store_true", help="Show JS dist config only"
     )
+    arg_parser.add_argument(
+        "--dist-mirror",
+        help="Directory of engine dist tarballs to install from before downloading, e.g. for offline CI - defaults to $"
+        + DistCache.MIRROR_ENV,
+    )
+    arg_parser.add_argument(
+        "--require-dist-integrity",
+        action="store_true",
+        help="Refuse engine dists without an integrity hash in js_dists.py instead of logging their hash, e.g. for CI - defaults to $"
+        + DistCache.REQUIRE_INTEGRITY_ENV,
+    )
+    arg_parser.add_argument(
+        "--matrix",
+        default=os.path.join(ROOT_DIR, "benchmark.toml"),
+        help="TOML file of the engines, suites, parameters, iterations and devices to run",
+    )
+    arg_parser.add_argument(
+        "--engines",
+        type=lambda text: [name.strip() for name in text.split(",") if name.strip()],
+        help="Comma separated engine names of the matrix to run - defaults to all engines",
+    )
+    arg_parser.add_argument(
+        "--parameters",
+        type=lambda text: [value.strip() for value in text.split(",") if value.strip()],
+        help="Comma separated parameters replacing the ones of the matrix, e.g. 60000 or 3M,10M - requires a single suite",
+    )
+    arg_parser.add_argument(
+        "--fresh-install",
+        action="store_true",
+        help="Always uninstall and install the APK before a benchmark, even if the installed APK matches",
+    )
+    arg_parser.add_argument(
+        "--devices",
+        help="Comma separated device serials to run on in parallel - defaults to the matrix devices or all attached devices",
+    )
+    arg_parser.add_argument(
+        "--build-jobs",
+        type=int,
+        default=1,
+        help="Number of APK builds running at the same time",
+    )
+    arg_parser.add_argument(
+        "--memory-sample-interval",
+        type=parse_positive_float,
+        default=1.0,
+        help="Seconds between memory samples during RenderComponent benchmarks",
+    )
+    arg_parser.add_argument(
+        "--no-memory-sampling",
+        action="store_true",
+        help="Do not sample memory during RenderComponentThroughput and render workloads, keeping the adb polling out of the measured window - RenderComponentMemory always samples",
+    )
+    arg_parser.add_argument(
+        "--frame-stats",
+        action="store_true",
+        help="Capture frame timing and jank with dumpsys gfxinfo during RenderComponentThroughput and render workloads - the polling runs in the measured window, so compare the results only with runs of the same setting",
+    )
+    arg_parser.add_argument(
+        "--heap-stats-interval",
+        type=int,
+        default=0,
+        help="Milliseconds between JS heap stats logged by the app during render benchmarks, 0 to only log them once a run ends (Hermes and V8, JSC logs none)",
+    )
+    arg_parser.add_argument(
+        "--launch-modes",
+        type=functools.partial(parse_choices, choices=TTI.LAUNCH_MODES),
+        help="Comma separated TTI launch modes, each runs as a suite of its own: cold (drop page cache and force-stop), warm (process restart), hot (activity relaunch)",
+    )
+    arg_parser.add_argument(
+        "--v8-cache-modes",
+        type=functools.partial(parse_choices, choices=tuple(V8_CACHE_MODES)),
+        default=[],
+        help="Comma separated V8 code cache modes to benchmark as extra engines: "
+        + ", ".join(V8_CACHE_MODES),
+    )
+    arg_parser.add_argument(
+        "--tti-sizes",
+        help="Sweep the TTI bundle size, e.g. 1M..64M:geometric, 1M..8M:linear:8 or 3M,10M,15M - only the bundle is built per size and pushed to the APK",
+    )
+    arg_parser.add_argument(
+        "--tti-data-shape",
+        choices=TTIDataGenerator.SHAPES,
+        help="Shape of the generated TTI bundle data - repeat is a single repeated character",
+    )
+    arg_parser.add_argument(
+        "--iterations",
+        type=int,
+        help="Minimum iterations of every benchmark - overrides the matrix",
+    )
+    arg_parser.add_argument(
+        "--max-iterations",
+        type=int,
+        help="Keep sampling until the 95%% CI is within --target-ci, up to this many iterations",
+    )
+    arg_parser.add_argument(
+        "--target-ci",
+        type=float,
+        help="Target 95%% CI half-width relative to the mean for adaptive iterations",
+    )
+    arg_parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="Seconds of device time per benchmark configuration for adaptive iterations",
+    )
+    arg_parser.add_argument(
+        "--result-store",
+        default=ResultStore.DEFAULT_PATH,
+        help="SQLite file where every benchmark iteration is recorded",
+    )
+    arg_parser.add_argument(
+        "--prepare-devices",
+        action="store_true",
+        help="Turn off animations and keep the screen on during the run, the original settings are restored afterward",
+    )
+    arg_parser.add_argument(
+        "--pin-frequencies",
+        action="store_true",
+        help="Pin the CPU and GPU frequencies to the middle of their range during the run - requires root, implies --prepare-devices",
+    )
+    arg_parser.add_argument(
+        "--max-battery-temp",
+        type=float,
+        help="Wait before every iteration until the battery temperature is at most this many degrees Celsius",
+    )
+    arg_parser.add_argument(
+        "--cooldown-timeout",
+        type=float,
+        default=600,
+        help="Maximum seconds to wait for --max-battery-temp",
+    )
+    arg_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run one more iteration of every suite parameter and engine, except ApkSize, under the simpleperf CPU profiler, and write its folded stacks next to the result store - requires ANDROID_NDK_HOME",
+    )
+    arg_parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Continue an interrupted run of the result store, skipping the iterations it has recorded - pass the same suites and options",
+    )
+    arg_parser.add_argument(
+        "--job-timeout",
+        type=float,
+        default=1800,
+        help="Seconds before a benchmark iteration is aborted and retried",
+    )
+    arg_parser.add_argument(
+        "--retries",
+        type=int,
+        default=2,
+        help="Retries of a failed or timed out benchmark iteration",
+    )
+    arg_parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=10,
+        help="Seconds before the first retry, doubled on every further retry",
+    )
     arg_parser.add_argument(
         "suites",
         nargs="*",
-        help="Benchmark suites to run - supported arguments: RenderComponentThroughput, RenderComponentMemory, TTI, ApkSize",
+        help="Benchmark suites of the matrix to run - supported arguments: RenderComponentThroughput, RenderComponentMemory, RenderFlatList, RenderBulkUpdate, RenderDeepTree, RenderChurn, TTI, JSKernels, ApkSize",
     )
 
     args = arg_parser.parse_args()
@@ -300,187 +731,1811 @@ def parse_args():
     return args
 
 
+def average_results(samples):
+    ret = {}
+    for key in samples[0]:
+        values = [sample.get(key) for sample in samples]
+        # NOTE: Raw series (e.g. memory_series) are not averaged
+        if not all(isinstance(value, (int, float)) for value in values):
+            continue
+        mean = sum(values) / len(values)
+        if all(isinstance(value, int) for value in values):
+            # NOTE(kudo): Keeps thing simpler to trim as integer
+            ret[key] = int(mean)
+        else:
+            ret[key] = round(mean, 2)
+    return ret
+
+
 class RenderComponentThroughputSuite:
-    def run(self, js_dist_managers: list[JSDistManager]):
-        logger.info(h1("RenderComponentThroughput Suite"))
+    name = "RenderComponentThroughput"
+    title = "RenderComponentThroughput Suite"
+    parameters = (10000, 60000, 180000)
+    compared_metrics = {
+        "result": HIGHER_IS_BETTER,
+        "memory": LOWER_IS_BETTER,
+        "memory_peak": LOWER_IS_BETTER,
+        "frame_p90": LOWER_IS_BETTER,
+        "janky_frames_percent": LOWER_IS_BETTER,
+    }
+    chart_metric = "result"
+    primary_metric = "result"
+    curve_metric = None
+    profileable = True
+
+    def __init__(
+        self,
+        fresh_install=False,
+        memory_sample_interval=1.0,
+        heap_stats_interval=0,
+        frame_stats=False,
+        parameters=None,
+    ):
+        self._fresh_install = fresh_install
+        self._memory_sample_interval = memory_sample_interval
+        self._heap_stats_interval = heap_stats_interval
+        self._frame_stats = frame_stats
+        if parameters is not None:
+            self.parameters = tuple(int(parameter) for parameter in parameters)
+
+    def format_parameter(self, interval):
+        return "{}s".format(interval // 1000)
+
+    def format_chart_group(self, interval):
+        return "{}s".format(interval // 1000)
+
+    def get_build_request(self, dist: JSDistManager, interval):
+        return BuildRequest(dist.install_props)
+
+    def estimate_duration(self, interval):
+        return interval / 1000 + 15
+
+    def run_iteration(
+        self, dist: JSDistManager, interval, iteration, apk_file, bundle_file=None
+    ):
+        ApkTool.install(
+            apk_file,
+            dist.app_id,
+            fresh_install=self._fresh_install and iteration == 0,
+            verbose=dist.install_props["verbose"],
+        )
+        return RenderComponentThroughput(
+            dist.name,
+            dist.app_id,
+            interval,
+            memory_sample_interval=self._memory_sample_interval,
+            heap_stats_interval=self._heap_stats_interval,
+            frame_stats=self._frame_stats,
+        ).run()
 
-        logger.info(h2("RenderComponentThroughput 10s"))
-        for dist in js_dist_managers:
-            ApkTool.reinstall(**dist.install_props)
-            logger.info(
-                "{} {}".format(
-                    dist.name,
-                    RenderComponentThroughput(
-                        dist.name, dist.app_id, 10000
-                    ).run_with_average(3),
+
+class RenderComponentMemorySuite:
+    name = "RenderComponentMemory"
+    title = "RenderComponentMemory Suite"
+    parameters = (100, 1000, 3000)
+    compared_metrics = {
+        "memory": LOWER_IS_BETTER,
+        "memory_peak": LOWER_IS_BETTER,
+        "js_heap_used": LOWER_IS_BETTER,
+        "gc_time": LOWER_IS_BETTER,
+    }
+    chart_metric = "memory"
+    primary_metric = "memory"
+    curve_metric = None
+    profileable = True
+
+    def __init__(
+        self,
+        fresh_install=False,
+        memory_sample_interval=1.0,
+        heap_stats_interval=0,
+        parameters=None,
+    ):
+        self._fresh_install = fresh_install
+        self._memory_sample_interval = memory_sample_interval
+        self._heap_stats_interval = heap_stats_interval
+        if parameters is not None:
+            self.parameters = tuple(int(parameter) for parameter in parameters)
+
+    def format_parameter(self, total_count):
+        return "{} items".format(total_count)
+
+    def format_chart_group(self, total_count):
+        return "{} items".format(total_count)
+
+    def get_build_request(self, dist: JSDistManager, total_count):
+        return BuildRequest(dist.install_props)
+
+    def estimate_duration(self, total_count):
+        return 20 + total_count / 100
+
+    def run_iteration(
+        self, dist: JSDistManager, total_count, iteration, apk_file, bundle_file=None
+    ):
+        ApkTool.install(
+            apk_file,
+            dist.app_id,
+            fresh_install=self._fresh_install and iteration == 0,
+            verbose=dist.install_props["verbose"],
+        )
+        return RenderComponentMemory(
+            dist.name,
+            dist.app_id,
+            total_count,
+            self._memory_sample_interval,
+            self._heap_stats_interval,
+        ).run()
+
+
+class RenderWorkloadSuite:
+    """Base of the suites of `src/ReactRender/RenderWorkload.js`
+
+    Every subclass is one workload, run with each item count of its
+    parameters. `time` is in ms, see the workload for what it covers.
+    """
+
+    workload = None
+    compared_metrics = {
+        "time": LOWER_IS_BETTER,
+        "memory_peak": LOWER_IS_BETTER,
+        "frame_p90": LOWER_IS_BETTER,
+        "janky_frames_percent": LOWER_IS_BETTER,
+    }
+    chart_metric = "time"
+    primary_metric = "time"
+    curve_metric = None
+    profileable = True
+    # Rough device seconds per item, for the runtime estimate
+    seconds_per_item = 0.001
+
+    def __init__(
+        self,
+        fresh_install=False,
+        memory_sample_interval=1.0,
+        heap_stats_interval=0,
+        frame_stats=False,
+        parameters=None,
+    ):
+        self._fresh_install = fresh_install
+        self._memory_sample_interval = memory_sample_interval
+        self._heap_stats_interval = heap_stats_interval
+        self._frame_stats = frame_stats
+        if parameters is not None:
+            self.parameters = tuple(int(parameter) for parameter in parameters)
+
+    def format_parameter(self, count):
+        return "{} items".format(count)
+
+    def format_chart_group(self, count):
+        return "{} items".format(count)
+
+    def get_build_request(self, dist: JSDistManager, count):
+        return BuildRequest(dist.install_props)
+
+    def estimate_duration(self, count):
+        return 15 + count * self.seconds_per_item
+
+    def run_iteration(
+        self, dist: JSDistManager, count, iteration, apk_file, bundle_file=None
+    ):
+        ApkTool.install(
+            apk_file,
+            dist.app_id,
+            fresh_install=self._fresh_install and iteration == 0,
+            verbose=dist.install_props["verbose"],
+        )
+        return RenderWorkload(
+            dist.name,
+            dist.app_id,
+            self.workload,
+            count,
+            memory_sample_interval=self._memory_sample_interval,
+            heap_stats_interval=self._heap_stats_interval,
+            frame_stats=self._frame_stats,
+        ).run()
+
+
+class RenderFlatListSuite(RenderWorkloadSuite):
+    """Scrolls a FlatList of N items until the last item is rendered"""
+
+    name = "RenderFlatList"
+    title = "RenderFlatList Suite"
+    workload = "flatlist"
+    parameters = (1000, 10000, 30000)
+
+
+class RenderBulkUpdateSuite(RenderWorkloadSuite):
+    """Re-renders all of N mounted items, the mean time of an update"""
+
+    name = "RenderBulkUpdate"
+    title = "RenderBulkUpdate Suite"
+    workload = "bulk_update"
+    parameters = (1000, 3000, 10000)
+    seconds_per_item = 0.005
+
+
+class RenderDeepTreeSuite(RenderWorkloadSuite):
+    """Mounts N views in branches nested 32 deep, until the native layout"""
+
+    name = "RenderDeepTree"
+    title = "RenderDeepTree Suite"
+    workload = "deep_tree"
+    parameters = (1000, 5000, 20000)
+
+
+class RenderChurnSuite(RenderWorkloadSuite):
+    """Mounts and unmounts N items, the mean time of a cycle"""
+
+    name = "RenderChurn"
+    title = "RenderChurn Suite"
+    workload = "churn"
+    parameters = (1000, 3000, 10000)
+    seconds_per_item = 0.005
+
+
+# Suites of `src/ReactRender/RenderWorkload.js` by name
+RENDER_WORKLOAD_SUITES = {
+    suite.name: suite
+    for suite in (
+        RenderFlatListSuite,
+        RenderBulkUpdateSuite,
+        RenderDeepTreeSuite,
+        RenderChurnSuite,
+    )
+}
+
+
+class TTISuite:
+    name = "TTI"
+    title = "TTI Suite"
+    parameters = (1024 * 1024 * 3, 1024 * 1024 * 10, 1024 * 1024 * 15)
+    compared_metrics = {
+        "tti": LOWER_IS_BETTER,
+        "assets_size": LOWER_IS_BETTER,
+        "phase_bundle_read": LOWER_IS_BETTER,
+        "phase_bundle_parse": LOWER_IS_BETTER,
+        "phase_bundle_execute": LOWER_IS_BETTER,
+        "phase_first_render": LOWER_IS_BETTER,
+    }
+    chart_metric = "tti"
+    primary_metric = "tti"
+    # Reports the metric against the parameter once the suite is done
+    curve_metric = None
+    # Whether `--profile` runs an iteration under the CPU profiler
+    profileable = True
+
+    # Suite name suffix of every launch mode, cold keeps the plain name
+    LAUNCH_MODE_SUFFIXES = {"cold": "", "warm": "Warm", "hot": "Hot"}
+
+    def __init__(self, data_shape="repeat", launch_mode="cold", parameters=None):
+        self._data_shape = data_shape
+        self._launch_mode = launch_mode
+        if parameters is not None:
+            # NOTE: Sizes may be given as "3M" as well as in bytes
+            self.parameters = tuple(parse_size(str(size)) for size in parameters)
+        # NOTE: Every launch mode is a suite of its own, so it gets its own
+        # iteration control, results and charts
+        self.name = type(self).name + self.LAUNCH_MODE_SUFFIXES[launch_mode]
+        if launch_mode != "cold":
+            self.title = "{} ({} launch)".format(type(self).title, launch_mode)
+
+    def format_parameter(self, size):
+        return "{}MiB".format(size // 1024 // 1024)
+
+    def format_chart_group(self, size):
+        return "{}MB bundle".format(size // 1024 // 1024)
+
+    def get_build_request(self, dist: JSDistManager, size):
+        return BuildRequest(
+            dist.install_props,
+            variant="TTI-{}-{}".format(size, self._data_shape),
+            overlay=TTIDataOverlay(size, self._data_shape),
+        )
+
+    def estimate_duration(self, size):
+        # NOTE: Warm and hot launches are preceded by a priming launch
+        launches = 1 if self._launch_mode == "cold" else 2
+        return 10 + launches * (5 + size / 1024 / 1024 / 2)
+
+    def run_iteration(
+        self, dist: JSDistManager, size, iteration, apk_file, bundle_file=None
+    ):
+        ApkTool.install(
+            apk_file,
+            dist.app_id,
+            fresh_install=iteration == 0,
+            verbose=dist.install_props["verbose"],
+        )
+        return TTI(dist.name, dist.app_id, size, self._launch_mode).run(apk_file)
+
+
+class TTISweepSuite(TTISuite):
+    """TTI over a sweep of bundle sizes, e.g. `--tti-sizes 1M..64M:geometric`
+
+    Every size only builds its JS bundle, or Hermes bytecode, which is pushed
+    to one APK shell per engine instead of building and installing an APK.
+    """
+
+    name = "TTISweep"
+    title = "TTI Sweep Suite"
+    compared_metrics = {
+        "tti": LOWER_IS_BETTER,
+        "bundle_size": LOWER_IS_BETTER,
+        "phase_bundle_read": LOWER_IS_BETTER,
+        "phase_bundle_parse": LOWER_IS_BETTER,
+        "phase_bundle_execute": LOWER_IS_BETTER,
+        "phase_first_render": LOWER_IS_BETTER,
+    }
+    curve_metric = "tti"
+
+    def __init__(
+        self, sizes=TTISuite.parameters, data_shape="repeat", launch_mode="cold"
+    ):
+        super().__init__(data_shape=data_shape, launch_mode=launch_mode)
+        self.parameters = tuple(sizes)
+
+    def format_parameter(self, size):
+        return format_size(size)
+
+    def format_chart_group(self, size):
+        return "{} bundle".format(format_size(size))
+
+    def get_build_request(self, dist: JSDistManager, size):
+        return BuildRequest(
+            dist.install_props,
+            variant="TTI-{}-{}".format(size, self._data_shape),
+            overlay=TTIDataOverlay(size, self._data_shape),
+            bundle=True,
+            hermesc=dist.get_hermesc(),
+        )
+
+    def run_iteration(
+        self, dist: JSDistManager, size, iteration, apk_file, bundle_file=None
+    ):
+        ApkTool.install(apk_file, dist.app_id, verbose=dist.install_props["verbose"])
+        if iteration == 0:
+            # NOTE: Wipes the app data, e.g. V8 code cache, as the fresh
+            # install of TTISuite does, but keeps the shell installed
+            AdbTool.clear_app_data(dist.app_id)
+        return TTI(dist.name, dist.app_id, size, self._launch_mode).run(
+            apk_file, bundle_file
+        )
+
+
+class JSKernelsSuite:
+    """Pure JS kernels run inside the app, without React, Yoga or the bridge
+
+    Every kernel of `src/JSKernels/kernels.js` is a parameter, run in a fresh
+    app process for `duration` ms after `warmup` ms, and reports its ops/sec.
+    """
+
+    name = "JSKernels"
+    title = "JS Kernels Suite"
+    parameters = (
+        "json",
+        "regex",
+        "string",
+        "collections",
+        "typed_array",
+        "promise",
+        "intl",
+    )
+    compared_metrics = {
+        "ops": HIGHER_IS_BETTER,
+    }
+    chart_metric = "ops"
+    primary_metric = "ops"
+    curve_metric = None
+    profileable = True
+
+    def __init__(
+        self, fresh_install=False, duration=5000, warmup=1000, parameters=None
+    ):
+        self._fresh_install = fresh_install
+        self._duration = int(duration)
+        self._warmup = int(warmup)
+        if parameters is not None:
+            unknown = [kernel for kernel in parameters if kernel not in self.parameters]
+            if len(unknown) > 0:
+                raise ValueError("Unknown JS kernels - {}".format(", ".join(unknown)))
+            self.parameters = tuple(parameters)
+
+    def format_parameter(self, kernel):
+        return kernel
+
+    def format_chart_group(self, kernel):
+        return "{} (ops/sec)".format(kernel)
+
+    def get_build_request(self, dist: JSDistManager, kernel):
+        return BuildRequest(dist.install_props)
+
+    def estimate_duration(self, kernel):
+        return (self._duration + self._warmup) / 1000 + 10
+
+    def run_iteration(
+        self, dist: JSDistManager, kernel, iteration, apk_file, bundle_file=None
+    ):
+        ApkTool.install(
+            apk_file,
+            dist.app_id,
+            fresh_install=self._fresh_install and iteration == 0,
+            verbose=dist.install_props["verbose"],
+        )
+        return JSKernels(
+            dist.name, dist.app_id, kernel, self._duration, self._warmup
+        ).run()
+
+
+class ApkSize:
+    name = "ApkSize"
+    title = "APK Size Suite"
+    parameters = (None,)
+    # NOTE: The APK size is deterministic, no need for repetitions
+    compared_metrics = {
+        "size": LOWER_IS_BETTER,
+        "native_size": LOWER_IS_BETTER,
+        "assets_size": LOWER_IS_BETTER,
+    }
+    chart_metric = "size"
+    primary_metric = None
+    curve_metric = None
+    profileable = False
+    iterations = 1
+
+    # The ABIs of a universal APK
+    UNIVERSAL_ABIS = ("armeabi-v7a", "arm64-v8a", "x86", "x86_64")
+
+    def __init__(self, abis=None):
+        self._abis = abis
+
+    def format_parameter(self, _):
+        return None
+
+    def format_chart_group(self, _):
+        if not self._abis or set(self._abis) == set(self.UNIVERSAL_ABIS):
+            return "universal build (MB)"
+        return "{} build (MB)".format(" + ".join(self._abis))
+
+    def get_build_request(self, dist: JSDistManager, _):
+        return BuildRequest(dist.install_props)
+
+    def estimate_duration(self, _):
+        return 0
+
+    def run_iteration(
+        self, dist: JSDistManager, _, iteration, apk_file, bundle_file=None
+    ):
+        apk_report = create_size_report(apk_file)
+        aar_path = dist.get_aar_path()
+        categories = apk_report["categories"]
+        return {
+            "size": round(float(os.path.getsize(apk_file)) / 1024 / 1024, 2),
+            "native_size": round(categories["native"]["compressed"] / 1024 / 1024, 2),
+            "assets_size": round(categories["assets"]["compressed"] / 1024 / 1024, 2),
+            # NOTE: The breakdown is shown by `start.py size-report`
+            "size_report": {
+                "apk": apk_report,
+                "aar": create_size_report(aar_path) if aar_path else None,
+            },
+        }
+
+
+# Entry files of the host suites, bundled with metro like the app
+HOST_ENTRY_DIR = os.path.join("src", "Host")
+
+
+class HostRenderComponentThroughputSuite:
+    """RenderComponentThroughput on a host engine, see `start.py host`
+
+    The list is rendered with react-test-renderer into host components, so
+    this covers React and the engine but not Yoga or the native views.
+    """
+
+    name = "HostRenderComponentThroughput"
+    title = "RenderComponentThroughput Suite (host)"
+    parameters = RenderComponentThroughputSuite.parameters
+    compared_metrics = {
+        "result": HIGHER_IS_BETTER,
+    }
+    chart_metric = "result"
+    primary_metric = "result"
+    curve_metric = None
+    profileable = False
+
+    def __init__(self, parameters=None, verbose=False):
+        self._verbose = verbose
+        if parameters is not None:
+            self.parameters = tuple(int(parameter) for parameter in parameters)
+
+    def format_parameter(self, interval):
+        return "{}s".format(interval // 1000)
+
+    def format_chart_group(self, interval):
+        return "{}s".format(interval // 1000)
+
+    def estimate_duration(self, interval):
+        return interval / 1000 + 1
+
+    def run_iteration(self, dist: JSDistManager, interval, iteration, engine):
+        bundle_file = BundleTool.build_cached(
+            verbose=self._verbose,
+            entry_file=os.path.join(HOST_ENTRY_DIR, "render.js"),
+        )
+        stdout, _ = engine.run(
+            bundle_file, args={"interval": interval}, timeout=interval / 1000 + 120
+        )
+        return {"result": int(_search_host_output(r"count=(\d+)", stdout))}
+
+
+class HostTTISuite:
+    """TTI on a host engine, see `start.py host`
+
+    `tti` is the time to run the TTI bundle, Hermes bytecode for Hermes,
+    less the time to run an empty script, i.e. the startup of the engine
+    process. Nothing of React Native is in the bundle.
+    """
+
+    name = "HostTTI"
+    title = "TTI Suite (host)"
+    parameters = TTISuite.parameters
+    compared_metrics = {
+        "tti": LOWER_IS_BETTER,
+        "bundle_size": LOWER_IS_BETTER,
+    }
+    chart_metric = "tti"
+    primary_metric = "tti"
+    curve_metric = None
+    profileable = False
+
+    TIMEOUT = 120
+
+    def __init__(self, data_shape="repeat", parameters=None, verbose=False):
+        self._data_shape = data_shape
+        self._verbose = verbose
+        if parameters is not None:
+            self.parameters = tuple(parse_size(str(size)) for size in parameters)
+
+    def format_parameter(self, size):
+        return format_size(size)
+
+    def format_chart_group(self, size):
+        return "{} bundle".format(format_size(size))
+
+    def estimate_duration(self, size):
+        return 1 + size / 1024 / 1024 / 20
+
+    def run_iteration(self, dist: JSDistManager, size, iteration, engine):
+        bundle_file = BundleTool.build_cached(
+            overlay=TTIDataOverlay(size, self._data_shape),
+            hermesc=dist.get_hermesc(),
+            verbose=self._verbose,
+            entry_file=os.path.join(HOST_ENTRY_DIR, "tti.js"),
+        )
+        startup = engine.measure_startup()
+        stdout, seconds = engine.run(bundle_file, timeout=self.TIMEOUT)
+        _search_host_output(r"size=(\d+)", stdout)
+        return {
+            "tti": round((seconds - startup) * 1000),
+            "startup": round(startup * 1000),
+            "bundle_size": round(os.path.getsize(bundle_file) / 1024 / 1024, 2),
+        }
+
+
+class HostJSKernelsSuite:
+    """JSKernels on a host engine, see `start.py host`"""
+
+    name = "HostJSKernels"
+    title = "JS Kernels Suite (host)"
+    parameters = JSKernelsSuite.parameters
+    compared_metrics = JSKernelsSuite.compared_metrics
+    chart_metric = "ops"
+    primary_metric = "ops"
+    curve_metric = None
+    profileable = False
+
+    def __init__(self, duration=5000, warmup=1000, parameters=None, verbose=False):
+        self._kernels = JSKernelsSuite(
+            duration=duration, warmup=warmup, parameters=parameters
+        )
+        self.parameters = self._kernels.parameters
+        self._duration = int(duration)
+        self._warmup = int(warmup)
+        self._verbose = verbose
+
+    def format_parameter(self, kernel):
+        return kernel
+
+    def format_chart_group(self, kernel):
+        return "{} (ops/sec)".format(kernel)
+
+    def estimate_duration(self, kernel):
+        return (self._duration + self._warmup) / 1000 + 1
+
+    def run_iteration(self, dist: JSDistManager, kernel, iteration, engine):
+        bundle_file = BundleTool.build_cached(
+            verbose=self._verbose,
+            entry_file=os.path.join(HOST_ENTRY_DIR, "kernels.js"),
+        )
+        stdout, _ = engine.run(
+            bundle_file,
+            args={"kernel": kernel, "duration": self._duration, "warmup": self._warmup},
+            timeout=(self._duration + self._warmup) / 1000 + 120,
+        )
+        return {"ops": float(_search_host_output(r"ops=(-?[\d.]+)", stdout))}
+
+
+def _search_host_output(regex, stdout):
+    search = re.search(regex, stdout)
+    if search is None:
+        raise RuntimeError("Unexpected host engine output - {}".format(stdout))
+    return search.group(1)
+
+
+class JobRunner:
+    """Runs a single scheduler Job inside a device worker process"""
+
+    # NOTE: Profiled runs are not iterations, so they are kept apart from the
+    # adaptive iteration numbers, and never install a fresh APK
+    PROFILE_ITERATION = -1
+
+    def __init__(
+        self,
+        suites,
+        js_dist_managers: list[JSDistManager],
+        max_battery_temperature=None,
+        cooldown_timeout=600,
+        profile_dir=None,
+    ):
+        self._suites = {suite.name: suite for suite in suites}
+        self._dists = {dist.name: dist for dist in js_dist_managers}
+        self._max_battery_temperature = max_battery_temperature
+        self._cooldown_timeout = cooldown_timeout
+        self._profile_dir = profile_dir
+
+    def __call__(self, job: Job):
+        device_state = DeviceStateController()
+        cooldown = 0
+        if self._max_battery_temperature is not None:
+            cooldown = device_state.wait_for_cooldown(
+                self._max_battery_temperature, timeout=self._cooldown_timeout
+            )
+        telemetry_start = device_state.read_telemetry()
+        run_iteration = functools.partial(
+            self._suites[job.suite].run_iteration,
+            self._dists[job.dist],
+            job.parameter,
+            job.iteration,
+            job.apk_file,
+            bundle_file=job.bundle_file,
+        )
+        if job.profile:
+            result = self._run_profiled(job, run_iteration)
+        else:
+            result = run_iteration()
+        # NOTE: Kept apart from the metrics, so throttled iterations can be
+        # told apart when looking into the variance
+        result["device_state"] = {
+            "cooldown": round(cooldown, 1),
+            "start": telemetry_start,
+            "end": device_state.read_telemetry(),
+        }
+        return result
+
+    @classmethod
+    def get_profile_output_dir(cls, profile_dir, job: Job):
+        return os.path.join(
+            profile_dir, "{}-{}-{}".format(job.suite, job.parameter, job.dist)
+        )
+
+    @classmethod
+    def has_profile(cls, profile_dir, job: Job):
+        """Whether the profile of a job was collected, e.g. before a resume"""
+        return os.path.isfile(
+            os.path.join(
+                cls.get_profile_output_dir(profile_dir, job),
+                SimpleperfProfiler.FOLDED_FILE,
+            )
+        )
+
+    def _run_profiled(self, job: Job, run_iteration):
+        dist = self._dists[job.dist]
+        abi = dist.install_props["abi"] or AdbTool.get_device_info()["abi"]
+        output_dir = self.get_profile_output_dir(self._profile_dir, job)
+        with SimpleperfProfiler(
+            dist.app_id, output_dir, dist.extract_native_libraries(abi)
+        ) as profiler:
+            result = run_iteration()
+        result["profile"] = profiler.summary()
+        return result
+
+
+class IterationControl:
+    """Decides how many iterations every (suite, parameter, dist) runs
+
+    Suites with a primary metric are sampled until the StoppingRule is met,
+    pooling the samples from all devices. Other suites run a fixed number of
+    iterations.
+    """
+
+    def __init__(self, suites, stopping_rule: StoppingRule, parallelism=1):
+        self._suites = {suite.name: suite for suite in suites}
+        self._rule = stopping_rule
+        self._parallelism = parallelism
+        self._values = collections.defaultdict(list)
+        self._elapsed = collections.defaultdict(float)
+        self._pending = collections.Counter()
+        self._next_iteration = collections.Counter()
+        self._done = set()
+
+    def get_initial_iterations(self, suite):
+        if suite.primary_metric is None:
+            return suite.iterations
+        return self._rule.min_iterations
+
+    def start(self, job: Job):
+        key = (job.suite, job.parameter, job.dist)
+        self._pending[key] += 1
+        self._next_iteration[key] = max(self._next_iteration[key], job.iteration + 1)
+
+    def add(self, job_result: JobResult):
+        """Records a result and returns the jobs for the further iterations"""
+        job = job_result.job
+        suite = self._suites[job.suite]
+        key = (job.suite, job.parameter, job.dist)
+        self._pending[key] -= 1
+        self._elapsed[key] += job_result.duration
+        if suite.primary_metric is not None:
+            self._values[key].append(job_result.result[suite.primary_metric])
+        if self._pending[key] > 0:
+            return []
+
+        values = self._values[key]
+        if suite.primary_metric is None or not self._rule.should_continue(
+            values, self._elapsed[key]
+        ):
+            self._done.add(key)
+            return []
+        count = min(self._parallelism, self._rule.max_iterations - len(values))
+        extra_jobs = [
+            job._replace(iteration=self._next_iteration[key] + i) for i in range(count)
+        ]
+        for extra_job in extra_jobs:
+            self.start(extra_job)
+        return extra_jobs
+
+    def is_done(self, suite_name, parameter, dist_name):
+        return (suite_name, parameter, dist_name) in self._done
+
+
+class BenchmarkReport:
+    """Logs the results of a suite parameter once all its iterations are done
+
+    A suite parameter with failed jobs is never done, `flush()` logs it with
+    the samples which succeeded once the run is over.
+    """
+
+    def __init__(
+        self,
+        suites,
+        js_dist_managers: list[JSDistManager],
+        serials,
+        iteration_control: IterationControl,
+    ):
+        self._suites = {suite.name: suite for suite in suites}
+        self._dists = js_dist_managers
+        self._serials = serials
+        self._iteration_control = iteration_control
+        self._samples = collections.defaultdict(lambda: collections.defaultdict(list))
+        self._reported_suites = set()
+        self._reported_groups = set()
+
+    def add(self, job_result: JobResult):
+        job = job_result.job
+        suite = self._suites[job.suite]
+        group = self._samples[(job.suite, job.parameter)]
+        group[(job.dist, job_result.serial)].append(job_result.result)
+        if all(
+            self._iteration_control.is_done(job.suite, job.parameter, dist.name)
+            for dist in self._dists
+        ):
+            self._reported_groups.add((job.suite, job.parameter))
+            self._report(suite, job.parameter, group)
+
+    def flush(self, failed_jobs):
+        """Logs the suite parameters left unreported, e.g. by failed jobs"""
+        failed_dists = collections.defaultdict(set)
+        for job in failed_jobs:
+            failed_dists[(job.suite, job.parameter)].add(job.dist)
+        for key in list(self._samples) + list(failed_dists):
+            if key in self._reported_groups:
+                continue
+            self._reported_groups.add(key)
+            (suite_name, parameter) = key
+            self._report(
+                self._suites[suite_name],
+                parameter,
+                self._samples[key],
+                failed_dists=failed_dists.get(key, ()),
+            )
+
+    def _report(self, suite, parameter, group, failed_dists=()):
+        if suite.name not in self._reported_suites:
+            self._reported_suites.add(suite.name)
+            logger.info(h1(suite.title))
+        parameter_label = suite.format_parameter(parameter)
+        if parameter_label is not None:
+            logger.info(h2("{} {}".format(suite.name, parameter_label)))
+        for dist in self._dists:
+            if dist.name in failed_dists:
+                message = "{} - some iterations failed".format(dist.name)
+                logger.info(str(colorful.bold_red(message)))
+            for serial in self._serials:
+                samples = group.get((dist.name, serial))
+                if not samples:
+                    continue
+                name = dist.name
+                if len(self._serials) > 1:
+                    name = "{} [{}]".format(dist.name, serial)
+                logger.info("{} {}".format(name, average_results(samples)))
+                if suite.primary_metric is not None:
+                    values = [sample[suite.primary_metric] for sample in samples]
+                    logger.info(
+                        "    {}: {}".format(
+                            suite.primary_metric, summarize(values).format()
+                        )
+                    )
+
+    # Local log-log slope above which the growth is reported as superlinear
+    SUPERLINEAR_SLOPE = 1.1
+
+    def report_curves(self):
+        """Logs the curve metric against the parameter, e.g. TTI vs size"""
+        for suite in self._suites.values():
+            if suite.curve_metric is None:
+                continue
+            logger.info(h1("{}: {} vs size".format(suite.title, suite.curve_metric)))
+            for dist in self._dists:
+                points = []
+                for parameter in sorted(suite.parameters):
+                    group = self._samples[(suite.name, parameter)]
+                    values = []
+                    for serial in self._serials:
+                        for sample in group.get((dist.name, serial), ()):
+                            values.append(sample[suite.curve_metric])
+                    if len(values) > 0:
+                        points.append((parameter, statistics.median(values)))
+                if len(points) == 0:
+                    continue
+                logger.info(h2(dist.name))
+                logger.info(
+                    "{:>10} {:>10} {:>10} {:>8}".format(
+                        "size", suite.curve_metric, "per MiB", "slope"
+                    )
                 )
+                for (size, value), slope in zip(points, loglog_slopes(points)):
+                    logger.info(
+                        "{:>10} {:>10} {:>10.2f} {:>8}{}".format(
+                            format_size(size),
+                            value,
+                            value / (size / 1024 / 1024),
+                            "-" if slope is None else "{:.2f}".format(slope),
+                            " superlinear"
+                            if slope is not None and slope > self.SUPERLINEAR_SLOPE
+                            else "",
+                        )
+                    )
+
+    def report_profiles(self, profile_results):
+        """Logs the profiled runs and their overhead, returns the summaries
+
+        The overhead is the change of the primary metric against the median
+        of the unprofiled iterations, positive when the profiled run is worse.
+        """
+        if len(profile_results) > 0:
+            logger.info(h1("Profiles"))
+        summaries = []
+        for job_result in profile_results:
+            job = job_result.job
+            suite = self._suites[job.suite]
+            metric = suite.primary_metric
+            group = self._samples[(job.suite, job.parameter)]
+            values = [
+                sample[metric]
+                for serial in self._serials
+                for sample in group.get((job.dist, serial), ())
+            ]
+            profiled = job_result.result[metric]
+            baseline = statistics.median(values) if len(values) > 0 else None
+            overhead = None
+            if baseline:
+                overhead = (profiled - baseline) * 100 / baseline
+                if suite.compared_metrics.get(metric) == HIGHER_IS_BETTER:
+                    overhead = -overhead
+                overhead = round(overhead, 2)
+            profile = job_result.result["profile"]
+            summaries.append(
+                {
+                    "suite": job.suite,
+                    "parameter": job.parameter,
+                    "engine": job.dist,
+                    "device_serial": job_result.serial,
+                    "metric": metric,
+                    "profiled": profiled,
+                    "baseline": baseline,
+                    "overhead_percent": overhead,
+                    **profile,
+                }
             )
 
-        logger.info(h2("RenderComponentThroughput 60s"))
-        for dist in js_dist_managers:
-            ApkTool.reinstall(**dist.install_props)
+            label = " ".join(
+                part
+                for part in (job.suite, suite.format_parameter(job.parameter), job.dist)
+                if part is not None
+            )
+            logger.info(h2(label))
             logger.info(
-                "{} {}".format(
-                    dist.name,
-                    RenderComponentThroughput(
-                        dist.name, dist.app_id, 60000
-                    ).run_with_average(3),
+                "{}: {} profiled, {} unprofiled ({}), {} samples".format(
+                    metric,
+                    profiled,
+                    "-" if baseline is None else baseline,
+                    "-" if overhead is None else "{:+.2f}% overhead".format(overhead),
+                    profile["samples"],
                 )
             )
+            for function in profile["top_functions"]:
+                logger.info(
+                    "    {:>6.2f}% {}".format(function["percent"], function["function"])
+                )
+            logger.info("    {}".format(profile["folded_file"]))
+        return summaries
+
+
+def create_known_suites(apk_size_abis=None):
+    """Every suite which may have results in the result store"""
+    return [
+        RenderComponentThroughputSuite(),
+        RenderComponentMemorySuite(),
+        *(suite() for suite in RENDER_WORKLOAD_SUITES.values()),
+        *(TTISuite(launch_mode=mode) for mode in TTI.LAUNCH_MODES),
+        *(TTISweepSuite(launch_mode=mode) for mode in TTI.LAUNCH_MODES),
+        JSKernelsSuite(),
+        ApkSize(abis=apk_size_abis),
+        HostRenderComponentThroughputSuite(),
+        HostTTISuite(),
+        HostJSKernelsSuite(),
+    ]
 
-        logger.info(h2("RenderComponentThroughput 180s"))
-        for dist in js_dist_managers:
-            ApkTool.reinstall(**dist.install_props)
-            logger.info(
-                "{} {}".format(
-                    dist.name,
-                    RenderComponentThroughput(
-                        dist.name, dist.app_id, 180000
-                    ).run_with_average(3),
+
+# Options of every suite in the matrix file
+SUITE_OPTIONS = {
+    "RenderComponentThroughput": ("parameters",),
+    "RenderComponentMemory": ("parameters",),
+    **{name: ("parameters",) for name in RENDER_WORKLOAD_SUITES},
+    "TTI": ("parameters", "sweep", "launch_modes", "data_shape"),
+    "JSKernels": ("parameters", "duration", "warmup"),
+    "ApkSize": (),
+}
+
+
+def create_suites(matrix: BenchmarkMatrix, args):
+    """Creates the suites of the matrix, command line options override it"""
+    if args.parameters is not None and len(matrix.suites) != 1:
+        raise ValueError("--parameters requires a single suite")
+
+    # NOTE: RenderComponentMemory measures the memory, it always samples
+    throughput_memory_sample_interval = (
+        None if args.no_memory_sampling else args.memory_sample_interval
+    )
+    suites = []
+    for name, options in matrix.suites.items():
+        parameters = args.parameters or options.get("parameters")
+        if name == "RenderComponentThroughput":
+            suites.append(
+                RenderComponentThroughputSuite(
+                    fresh_install=args.fresh_install,
+                    memory_sample_interval=throughput_memory_sample_interval,
+                    heap_stats_interval=args.heap_stats_interval,
+                    frame_stats=args.frame_stats,
+                    parameters=parameters,
                 )
             )
+        elif name == "RenderComponentMemory":
+            suites.append(
+                RenderComponentMemorySuite(
+                    fresh_install=args.fresh_install,
+                    memory_sample_interval=args.memory_sample_interval,
+                    heap_stats_interval=args.heap_stats_interval,
+                    parameters=parameters,
+                )
+            )
+        elif name in RENDER_WORKLOAD_SUITES:
+            suites.append(
+                RENDER_WORKLOAD_SUITES[name](
+                    fresh_install=args.fresh_install,
+                    memory_sample_interval=throughput_memory_sample_interval,
+                    heap_stats_interval=args.heap_stats_interval,
+                    frame_stats=args.frame_stats,
+                    parameters=parameters,
+                )
+            )
+        elif name == "TTI":
+            launch_modes = args.launch_modes or options.get("launch_modes", ["cold"])
+            data_shape = args.tti_data_shape or options.get("data_shape", "repeat")
+            parse_choices(",".join(launch_modes), TTI.LAUNCH_MODES)
+            if data_shape not in TTIDataGenerator.SHAPES:
+                raise ValueError("Unknown TTI data shape - {}".format(data_shape))
+            sweep = args.tti_sizes or options.get("sweep")
+            for launch_mode in launch_modes:
+                if sweep:
+                    suites.append(
+                        TTISweepSuite(
+                            sizes=parse_size_sweep(sweep),
+                            data_shape=data_shape,
+                            launch_mode=launch_mode,
+                        )
+                    )
+                else:
+                    suites.append(
+                        TTISuite(
+                            data_shape=data_shape,
+                            launch_mode=launch_mode,
+                            parameters=parameters,
+                        )
+                    )
+        elif name == "JSKernels":
+            suites.append(
+                JSKernelsSuite(
+                    fresh_install=args.fresh_install,
+                    duration=options.get("duration", 5000),
+                    warmup=options.get("warmup", 1000),
+                    parameters=parameters,
+                )
+            )
+        elif name == "ApkSize":
+            suites.append(ApkSize(abis=matrix.abis))
+    return suites
 
 
-class RenderComponentMemorySuite:
-    def run(self, js_dist_managers: list[JSDistManager]):
-        logger.info(h1("RenderComponentMemory Suite"))
+def chart_data_main(argv):
+    arg_parser = argparse.ArgumentParser(
+        prog="start.py chart-data",
+        description="Generate the website chart data from the result store",
+    )
+    arg_parser.add_argument(
+        "--verbose", "-v", action="store_true", help="Enable verbose log"
+    )
+    arg_parser.add_argument(
+        "--result-store",
+        default=ResultStore.DEFAULT_PATH,
+        help="SQLite file of the benchmark results",
+    )
+    arg_parser.add_argument(
+        "--output",
+        default=os.path.join("website", "public", "data.json"),
+        help="ChartData JSON file to update",
+    )
+    args = arg_parser.parse_args(argv)
+    setup_logger(args.verbose)
 
-        logger.info(h2("RenderComponentMemory 100 items"))
-        for dist in js_dist_managers:
-            ApkTool.reinstall(**dist.install_props)
-            logger.info(
-                "{} {}".format(
-                    dist.name,
-                    RenderComponentMemory(dist.name, dist.app_id, 100).run_with_average(
-                        3
-                    ),
+    result_store = ResultStore(args.result_store)
+    # NOTE: The ApkSize label names the ABIs of the latest run which measured it
+    apk_size_runs = {record.run_id for record in result_store.query(suite=ApkSize.name)}
+    apk_size_abis = None
+    for run in result_store.list_runs():
+        if run["run_id"] in apk_size_runs:
+            apk_size_abis = run["metadata"].get("abis")
+    suites = create_known_suites(apk_size_abis=apk_size_abis)
+    state_path = os.path.join(
+        os.path.dirname(args.result_store), "chart_data_state.json"
+    )
+    ChartDataGenerator(result_store, suites, state_path).generate(args.output)
+    result_store.close()
+    return 0
+
+
+def compare_main(argv):
+    arg_parser = argparse.ArgumentParser(
+        prog="start.py compare",
+        description="Compare a run against baseline runs and report regressions",
+    )
+    arg_parser.add_argument(
+        "--verbose", "-v", action="store_true", help="Enable verbose log"
+    )
+    arg_parser.add_argument(
+        "--result-store",
+        default=ResultStore.DEFAULT_PATH,
+        help="SQLite file of the benchmark results",
+    )
+    arg_parser.add_argument(
+        "--baseline",
+        action="append",
+        help="Baseline run ID, may be given multiple times - defaults to the latest runs before the candidate",
+    )
+    arg_parser.add_argument(
+        "--baseline-window",
+        type=int,
+        default=3,
+        help="Number of latest runs used as baseline when --baseline is not given",
+    )
+    arg_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.05,
+        help="Relative change of the median regarded as regression",
+    )
+    arg_parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="Significance level of the Mann-Whitney U test, or of the bootstrap CI when the samples are too few",
+    )
+    arg_parser.add_argument(
+        "candidate", nargs="?", help="Candidate run ID - defaults to the latest run"
+    )
+    args = arg_parser.parse_args(argv)
+    setup_logger(args.verbose)
+
+    result_store = ResultStore(args.result_store)
+    candidate = args.candidate
+    if candidate is None:
+        runs = list(result_store.list_runs())
+        if len(runs) == 0:
+            logger.error("No runs in {}".format(args.result_store))
+            return 2
+        candidate = runs[-1]["run_id"]
+    suites = create_known_suites()
+    detector = RegressionDetector(
+        result_store, suites, threshold=args.threshold, alpha=args.alpha
+    )
+    comparisons = detector.compare(
+        candidate,
+        baseline_run_ids=args.baseline,
+        baseline_window=args.baseline_window,
+    )
+    result_store.close()
+
+    logger.info(h1("Compare {}".format(candidate)))
+    suites_by_name = {suite.name: suite for suite in suites}
+    regressions = 0
+    for comparison in comparisons:
+        suite = suites_by_name[comparison.suite]
+        parameter_label = suite.format_parameter(comparison.parameter)
+        significance = "p=n/a"
+        if comparison.p_value is not None:
+            significance = "p={:.4f}".format(comparison.p_value)
+        elif comparison.median_diff_ci is not None:
+            significance = "diff CI=[{:.2f}, {:.2f}]".format(*comparison.median_diff_ci)
+        line = (
+            "{suite}{parameter} {engine} {metric}: {baseline} -> {candidate}"
+            " ({change:+.2%}, {significance})"
+        ).format(
+            suite=comparison.suite,
+            parameter=" " + parameter_label if parameter_label else "",
+            engine=comparison.engine,
+            metric=comparison.metric,
+            baseline=statistics.median(comparison.baseline),
+            candidate=statistics.median(comparison.candidate),
+            change=comparison.change,
+            significance=significance,
+        )
+        if comparison.is_regression:
+            regressions += 1
+            logger.info(str(colorful.bold_red("REGRESSION ")) + line)
+        else:
+            logger.info(line)
+
+    logger.info(
+        "\n{} regression(s) in {} comparison(s)".format(regressions, len(comparisons))
+    )
+    return 1 if regressions > 0 else 0
+
+
+def size_report_main(argv):
+    arg_parser = argparse.ArgumentParser(
+        prog="start.py size-report",
+        description="Show where the size of every engine goes, from the ApkSize results",
+    )
+    arg_parser.add_argument(
+        "--verbose", "-v", action="store_true", help="Enable verbose log"
+    )
+    arg_parser.add_argument(
+        "--result-store",
+        default=ResultStore.DEFAULT_PATH,
+        help="SQLite file of the benchmark results",
+    )
+    arg_parser.add_argument(
+        "--baseline",
+        help="Run ID to diff against - defaults to the previous run with ApkSize results",
+    )
+    arg_parser.add_argument(
+        "candidate",
+        nargs="?",
+        help="Run ID - defaults to the latest run with ApkSize results",
+    )
+    args = arg_parser.parse_args(argv)
+    setup_logger(args.verbose)
+
+    result_store = ResultStore(args.result_store)
+    # Run ID -> engine -> size report, oldest run first
+    reports = {}
+    for record in result_store.query(suite=ApkSize.name):
+        if "size_report" in record.metrics:
+            engines = reports.setdefault(record.run_id, {})
+            engines[record.engine] = record.metrics["size_report"]
+    result_store.close()
+
+    run_ids = list(reports)
+    candidate = args.candidate or (run_ids[-1] if len(run_ids) > 0 else None)
+    if candidate not in reports:
+        logger.error("No ApkSize results with a size report - {}".format(candidate))
+        return 2
+    baseline = args.baseline
+    if baseline is None and run_ids.index(candidate) > 0:
+        baseline = run_ids[run_ids.index(candidate) - 1]
+    if baseline is not None and baseline not in reports:
+        logger.error("No ApkSize results with a size report - {}".format(baseline))
+        return 2
+
+    title = "Size report {}".format(candidate)
+    if baseline is not None:
+        title += " (vs {})".format(baseline)
+    logger.info(h1(title))
+    for engine, size_report in reports[candidate].items():
+        baseline_report = reports[baseline].get(engine) if baseline else None
+        for kind in ("apk", "aar"):
+            if size_report[kind] is None:
+                continue
+            logger.info(h2("{} {}".format(engine, kind.upper())))
+            lines = format_size_report(
+                size_report[kind], baseline_report[kind] if baseline_report else None
+            )
+            logger.info("\n".join(lines) + "\n")
+    return 0
+
+
+def create_host_suites(matrix: BenchmarkMatrix, args):
+    """Creates the host suites standing in for the suites of the matrix"""
+    if args.parameters is not None and len(matrix.suites) != 1:
+        raise ValueError("--parameters requires a single suite")
+
+    suites = []
+    for name, options in matrix.suites.items():
+        parameters = args.parameters or options.get("parameters")
+        if name == "RenderComponentThroughput":
+            suites.append(
+                HostRenderComponentThroughputSuite(
+                    parameters=parameters, verbose=args.verbose
                 )
             )
-        logger.info(h2("RenderComponentMemory 1000 items"))
-        for dist in js_dist_managers:
-            ApkTool.reinstall(**dist.install_props)
-            logger.info(
-                "{} {}".format(
-                    dist.name,
-                    RenderComponentMemory(
-                        dist.name, dist.app_id, 1000
-                    ).run_with_average(3),
+        elif name == "TTI":
+            sweep = options.get("sweep")
+            if sweep and args.parameters is None:
+                parameters = parse_size_sweep(sweep)
+            suites.append(
+                HostTTISuite(
+                    data_shape=options.get("data_shape", "repeat"),
+                    parameters=parameters,
+                    verbose=args.verbose,
                 )
             )
-        logger.info(h2("RenderComponentMemory 3000 items"))
-        for dist in js_dist_managers:
-            ApkTool.reinstall(**dist.install_props)
-            logger.info(
-                "{} {}".format(
-                    dist.name,
-                    RenderComponentMemory(
-                        dist.name, dist.app_id, 3000
-                    ).run_with_average(3),
+        elif name == "JSKernels":
+            suites.append(
+                HostJSKernelsSuite(
+                    duration=options.get("duration", 5000),
+                    warmup=options.get("warmup", 1000),
+                    parameters=parameters,
+                    verbose=args.verbose,
                 )
             )
+        else:
+            logger.info("{} has no host mode, skipped".format(name))
+    return suites
 
 
-class TTISuite:
-    def run(self, js_dist_managers: list[JSDistManager]):
-        logger.info(h1("TTI Suite"))
+def host_main(argv):
+    arg_parser = argparse.ArgumentParser(
+        prog="start.py host",
+        description="Run the benchmark JS on the engine binaries of the host instead of a device",
+    )
+    arg_parser.add_argument(
+        "--verbose", "-v", action="store_true", help="Enable verbose log"
+    )
+    arg_parser.add_argument(
+        "--all", "-a", action="store_true", help="Run all benchmarks"
+    )
+    arg_parser.add_argument(
+        "--matrix",
+        default=os.path.join(ROOT_DIR, "benchmark.toml"),
+        help="TOML file of the engines, suites, parameters and iterations to run",
+    )
+    arg_parser.add_argument(
+        "--engines",
+        type=lambda text: [name.strip() for name in text.split(",") if name.strip()],
+        help="Comma separated engine names of the matrix to run - defaults to all engines",
+    )
+    arg_parser.add_argument(
+        "--parameters",
+        type=lambda text: [value.strip() for value in text.split(",") if value.strip()],
+        help="Comma separated parameters replacing the ones of the matrix - requires a single suite",
+    )
+    arg_parser.add_argument(
+        "--iterations",
+        type=int,
+        help="Iterations of every benchmark - overrides the matrix",
+    )
+    arg_parser.add_argument(
+        "--dist-mirror",
+        help="Directory with the dist tarballs to use instead of the npm registry",
+    )
+    arg_parser.add_argument(
+        "--require-dist-integrity",
+        action="store_true",
+        help="Refuse engine dists without an integrity hash in js_dists.py",
+    )
+    arg_parser.add_argument(
+        "--result-store",
+        default=ResultStore.DEFAULT_PATH,
+        help="SQLite file where every benchmark iteration is recorded",
+    )
+    arg_parser.add_argument(
+        "suites",
+        nargs="*",
+        help="Benchmark suites of the matrix to run - supported arguments: RenderComponentThroughput, TTI, JSKernels",
+    )
+    args = arg_parser.parse_args(argv)
+    setup_logger(args.verbose)
+    if not args.all and len(args.suites) == 0:
+        arg_parser.print_help()
+        return 1
 
-        logger.info(h2("TTI 3MiB"))
-        size = 1024 * 1024 * 3
-        for dist in js_dist_managers:
-            TTI(dist.name, dist.app_id, size).run(dist.install_props)
+    try:
+        matrix = load_matrix(args.matrix, JS_DISTS, SUITE_OPTIONS).select(
+            suites=None if args.all else args.suites, engines=args.engines
+        )
+        suites = create_host_suites(matrix, args)
+    except ValueError as e:
+        logger.error("{}".format(e))
+        return 2
+
+    js_dist_managers = [
+        JSDistManager(name=engine.name, app_id=engine.app_id, dist_id=engine.dist_id)
+        for engine in matrix.engines
+    ]
+    # NOTE: Only Hermes ships a host binary with its dist
+    try:
+        prepare_dists(
+            [dist for dist in js_dist_managers if dist.app_id == "hermes"],
+            mirror=args.dist_mirror,
+            require_integrity=args.require_dist_integrity,
+        )
+    except (RuntimeError, OSError) as e:
+        logger.error("Unable to prepare the engine dists - {}".format(e))
+        return 2
+    engines = {}
+    for dist in js_dist_managers:
+        engine = HostEngine.find(
+            dist.app_id, os.path.join(JSDistManager.STORE_DIST_DIR, dist.dist_id)
+        )
+        if engine is None:
+            logger.warning("No host engine for {}, skipped".format(dist.name))
+            continue
+        # NOTE: V8 and JSC dists run the same host binary, whatever their build
+        same = [name for name, other in engines.items() if other.cmd == engine.cmd]
+        if len(same) > 0:
+            logger.warning(
+                "{} runs the same host engine as {}, skipped".format(dist.name, same[0])
+            )
+            continue
+        engines[dist.name] = engine
+    js_dist_managers = [dist for dist in js_dist_managers if dist.name in engines]
 
-        logger.info(h2("TTI 10MiB"))
-        size = 1024 * 1024 * 10
-        for dist in js_dist_managers:
-            TTI(dist.name, dist.app_id, size).run(dist.install_props)
+    logger.info(h1("Host engines"))
+    for dist in js_dist_managers:
+        logger.info("{}: {}".format(dist.name, engines[dist.name].version))
+    logger.info("")
+    if len(suites) == 0 or len(js_dist_managers) == 0:
+        return 0
+
+    iterations = args.iterations or matrix.iterations.get("min", 3)
+    # NOTE: A fixed number of iterations keeps screening runs predictable
+    stopping_rule = StoppingRule(min_iterations=iterations, max_iterations=iterations)
+    iteration_control = IterationControl(suites, stopping_rule)
+    device = {"model": "host {}".format(platform.platform()), "abi": platform.machine()}
+    report = BenchmarkReport(suites, js_dist_managers, ["host"], iteration_control)
+
+    result_store = ResultStore(args.result_store)
+    run_id = result_store.create_run(
+        {
+            "argv": ["host"] + argv,
+            "matrix": args.matrix,
+            "suites": [suite.name for suite in suites],
+            "engines": [dist.name for dist in js_dist_managers],
+            "host_engines": {name: engine.version for name, engine in engines.items()},
+            "devices": ["host"],
+        }
+    )
+    logger.info("Run ID: {}\n".format(run_id))
 
-        logger.info(h2("TTI 15MiB"))
-        size = 1024 * 1024 * 15
-        for dist in js_dist_managers:
-            TTI(dist.name, dist.app_id, size).run(dist.install_props)
+    queue = collections.deque()
+    for suite in suites:
+        for parameter in suite.parameters:
+            for dist in js_dist_managers:
+                for iteration in range(iteration_control.get_initial_iterations(suite)):
+                    job = Job(suite.name, parameter, dist.name, iteration)
+                    iteration_control.start(job)
+                    queue.append(job)
+    suites_by_name = {suite.name: suite for suite in suites}
+    dists_by_name = {dist.name: dist for dist in js_dist_managers}
+    failed_jobs = []
+    try:
+        while len(queue) > 0:
+            job = queue.popleft()
+            dist = dists_by_name[job.dist]
+            engine = engines[job.dist]
+            start_time = time.monotonic()
+            try:
+                result = suites_by_name[job.suite].run_iteration(
+                    dist, job.parameter, job.iteration, engine
+                )
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                logger.error("Job failed - {}: {}".format(job, e))
+                failed_jobs.append(job)
+                continue
+            result["engine_version"] = engine.version
+            job_result = JobResult(
+                serial="host",
+                job=job,
+                result=result,
+                duration=time.monotonic() - start_time,
+                device=device,
+            )
+            result_store.add(
+                ResultRecord(
+                    run_id=run_id,
+                    suite=job.suite,
+                    parameter=job.parameter,
+                    engine=dist.name,
+                    dist_id=dist.dist_id,
+                    dist_version=engine.version,
+                    abi=device["abi"],
+                    device_serial=job_result.serial,
+                    device_model=device["model"],
+                    iteration=job.iteration,
+                    timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    metrics=result,
+                    duration=job_result.duration,
+                )
+            )
+            queue.extend(iteration_control.add(job_result))
+            report.add(job_result)
+    finally:
+        result_store.close()
+
+    if len(failed_jobs) > 0:
+        logger.error("{} job(s) failed".format(len(failed_jobs)))
+        return 1
+    return 0
 
 
-class ApkSize:
-    def run(self, js_dist_managers: list[JSDistManager]):
-        logger.info(h1("APK Size Suite"))
+COMMANDS = {
+    "chart-data": chart_data_main,
+    "compare": compare_main,
+    "host": host_main,
+    "size-report": size_report_main,
+}
+
+
+def get_profile_dir(result_store_path, run_id):
+    return os.path.join(os.path.dirname(result_store_path), "profiles", run_id)
+
+
+def write_profile_summaries(profile_dir, summaries):
+    """Writes profiles.json, keeping the profiles of a resumed run"""
+    path = os.path.join(profile_dir, "profiles.json")
+    keys = {(s["suite"], s["parameter"], s["engine"]) for s in summaries}
+    previous = []
+    if os.path.isfile(path):
+        with open(path) as f:
+            previous = [
+                s
+                for s in json.load(f)
+                if (s["suite"], s["parameter"], s["engine"]) not in keys
+            ]
+    with open(path, "w") as f:
+        json.dump(previous + summaries, f, indent=2)
+
+
+def restore_jobs(records, plan_jobs, iteration_control, report):
+    """Replays the recorded iterations of a resumed run
+
+    Every planned job with a record is handled as if it had just finished, so
+    the adaptive iterations and reports go on where the run stopped. Returns
+    the (Job, BuildRequest) pairs which are left to run.
+    """
+    requests = {}
+    for job, request in plan_jobs:
+        iteration_control.start(job)
+        requests[(job.suite, job.parameter, job.dist)] = request
+    finished = {}
+    for record in records:
+        job = Job(record.suite, record.parameter, record.engine, record.iteration)
+        finished[job] = JobResult(
+            serial=record.device_serial,
+            job=job,
+            result=record.metrics,
+            duration=record.duration or 0.0,
+            device={"model": record.device_model, "abi": record.abi},
+        )
 
-        for dist in js_dist_managers:
-            install_props = dist.install_props
-            apk_file = ApkTool.build(**install_props)
-            size = round(float(os.path.getsize(apk_file)) / 1024 / 1024, 2)
-            logger.info("{} {} MiB".format(dist.name, size))
+    remaining = []
+    queue = collections.deque(job for job, _ in plan_jobs)
+    while len(queue) > 0:
+        job = queue.popleft()
+        job_result = finished.pop(job, None)
+        if job_result is None:
+            remaining.append((job, requests[(job.suite, job.parameter, job.dist)]))
+            continue
+        queue.extend(iteration_control.add(job_result))
+        report.add(job_result)
+    return remaining
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return COMMANDS[sys.argv[1]](sys.argv[2:])
+
     args = parse_args()
     setup_logger(args.verbose)
 
-    suites = []
-    if args.all or "RenderComponentThroughput" in args.suites:
-        suites.append(RenderComponentThroughputSuite())
-    if args.all or "RenderComponentMemory" in args.suites:
-        suites.append(RenderComponentMemorySuite())
-    if args.all or "TTI" in args.suites:
-        suites.append(TTISuite())
-    if args.all or "ApkSize" in args.suites:
-        suites.append(ApkSize())
-
-    abis = ("armeabi-v7a", "arm64-v8a", "x86", "x86_64")
-    # abis = ("arm64-v8a",)
+    try:
+        matrix = load_matrix(args.matrix, JS_DISTS, SUITE_OPTIONS).select(
+            suites=None if args.all else args.suites, engines=args.engines
+        )
+        suites = create_suites(matrix, args)
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        logger.error("{}".format(e))
+        return 2
+
+    abis = matrix.abis
     apk_abi = abis[0] if len(abis) == 1 else None
 
     js_dist_managers = [
-        JSDistManager(name="jsc", app_id="jsc", dist_id="jsc_250230"),
-        JSDistManager(name="v8-android-jit", app_id="v8", dist_id="v8_100_jit"),
-        JSDistManager(name="v8-android-nointl", app_id="v8", dist_id="v8_100_nointl"),
-        # JSDistManager(
-        #     name="v8-android-jit + normal codecache",
-        #     app_id="v8",
-        #     dist_id="v8_100_jit",
-        #     extra_gradle_props=[
-        #         "v8.cacheMode=normal",
-        #     ],
-        # ),
-        # JSDistManager(
-        #     name="v8-android-jit + prebuilt cache",
-        #     app_id="v8",
-        #     dist_id="v8_100_jit",
-        #     extra_gradle_props=[
-        #         "v8.cacheMode=prebuilt",
-        #         # TODO: tools should be in js_dists for versioning
-        #         "v8.android.tools.dir={}".format(
-        #             os.path.join(
-        #                 ROOT_DIR,
-        #                 "node_modules",
-        #                 "v8-android-tools-macos",
-        #                 "v8-android-jit",
-        #             )
-        #         ),
-        #     ],
-        # ),
-        # JSDistManager(
-        #     name="v8-android-jit + cache with stub bundle",
-        #     app_id="v8",
-        #     dist_id="v8_100_jit",
-        #     extra_gradle_props=[
-        #         "v8.cacheMode=normalWithStubBundle",
-        #     ],
-        # ),
-        JSDistManager(name="hermes", app_id="hermes", dist_id="hermes_0110"),
+        JSDistManager(
+            name=engine.name,
+            app_id=engine.app_id,
+            dist_id=engine.dist_id,
+            extra_gradle_props=list(engine.extra_gradle_props),
+        )
+        for engine in matrix.engines
     ]
+    try:
+        for cache_mode in args.v8_cache_modes:
+            js_dist_managers.append(create_v8_cache_dist(cache_mode))
+        prepare_dists(
+            js_dist_managers,
+            mirror=args.dist_mirror,
+            require_integrity=args.require_dist_integrity,
+        )
+    except (RuntimeError, OSError) as e:
+        logger.error("Unable to prepare the engine dists - {}".format(e))
+        return 2
     for dist in js_dist_managers:
-        dist.prepare()
         dist.create_install_props(abi=apk_abi, verbose=args.verbose)
 
     logger.info(h1("Config"))
     show_configs(abis, js_dist_managers)
 
-    for suite in suites:
-        suite.run(js_dist_managers)
+    if len(suites) == 0:
+        return 0
+
+    result_store = ResultStore(args.result_store)
+    records = []
+    if args.resume:
+        run = result_store.get_run(args.resume)
+        if run is None:
+            logger.error("Unknown run to resume - {}".format(args.resume))
+            result_store.close()
+            return 2
+        metadata = run["metadata"]
+        suite_names = [suite.name for suite in suites]
+        engine_names = [dist.name for dist in js_dist_managers]
+        if metadata["suites"] != suite_names or metadata["engines"] != engine_names:
+            logger.warning(
+                "The suites or engines differ from the resumed run - {}".format(
+                    " ".join(metadata["argv"])
+                )
+            )
+        records = list(result_store.query(run_ids=[args.resume]))
+
+    serials = (
+        args.devices.split(",")
+        if args.devices
+        else matrix.devices or AdbTool.list_devices()
+    )
+    scheduler = DeviceScheduler(
+        serials,
+        verbose=args.verbose,
+        retry_policy=RetryPolicy(
+            timeout=args.job_timeout,
+            retries=args.retries,
+            backoff=args.retry_backoff,
+        ),
+    )
+    # NOTE: All builds are queued upfront and run in the background, every job
+    # starts as soon as its APK is ready
+    builder = ApkBuilder(build_jobs=args.build_jobs)
+    min_iterations = args.iterations or matrix.iterations.get("min", 3)
+    max_iterations = args.max_iterations or matrix.iterations.get("max", 0)
+    stopping_rule = StoppingRule(
+        min_iterations=min_iterations,
+        max_iterations=max(min_iterations, max_iterations),
+        target_ci=(
+            args.target_ci
+            if args.target_ci is not None
+            else matrix.iterations.get("target_ci", 0.02)
+        ),
+        time_budget=args.time_budget or matrix.iterations.get("time_budget"),
+    )
+    iteration_control = IterationControl(
+        suites, stopping_rule, parallelism=len(scheduler.serials)
+    )
+    # NOTE: Recorded iterations of a resumed run may come from other devices
+    report_serials = list(scheduler.serials)
+    for record in records:
+        if record.device_serial not in report_serials:
+            report_serials.append(record.device_serial)
+    report = BenchmarkReport(
+        suites, js_dist_managers, report_serials, iteration_control
+    )
+    planner = Planner(suites, js_dist_managers, iteration_control, stopping_rule)
+    plan = planner.plan()
+    remaining_jobs = restore_jobs(records, plan.jobs, iteration_control, report)
+    if args.profile:
+        # NOTE: Runs after the initial iterations of the same APK, which are
+        # the baseline of the profiling overhead
+        suites_by_name = {suite.name: suite for suite in suites}
+        resumed_profile_dir = (
+            get_profile_dir(args.result_store, args.resume) if args.resume else None
+        )
+        for job, request in plan.jobs:
+            suite = suites_by_name[job.suite]
+            if not suite.profileable or job.iteration != 0:
+                continue
+            profile_job = job._replace(
+                iteration=JobRunner.PROFILE_ITERATION, profile=True
+            )
+            if resumed_profile_dir is not None and JobRunner.has_profile(
+                resumed_profile_dir, profile_job
+            ):
+                continue
+            remaining_jobs.append((profile_job, request))
+    builds = {request.key: request for _, request in remaining_jobs}
+    remaining_plan = plan._replace(jobs=remaining_jobs, builds=list(builds.values()))
+    estimate = planner.estimate(
+        remaining_plan, parallelism=len(scheduler.serials), build_jobs=args.build_jobs
+    )
+    logger.info(h2("Plan"))
+    if args.resume:
+        logger.info(
+            "{} iterations recorded, {} jobs left".format(
+                len(records), len(remaining_jobs)
+            )
+        )
+    logger.info(
+        "{} jobs, {} builds ({} not cached)".format(
+            len(remaining_plan.jobs),
+            len(remaining_plan.builds),
+            estimate.uncached_builds,
+        )
+    )
+    runtime = "Estimated runtime: ~{:.0f} min".format(estimate.seconds / 60)
+    if estimate.max_seconds > estimate.seconds:
+        runtime += ", up to {:.0f} min with adaptive iterations".format(
+            estimate.max_seconds / 60
+        )
+    logger.info(runtime + "\n")
+
+    # NOTE: Builds are submitted in the plan order, so the APK of the first
+    # jobs is built first
+    build_futures = {
+        request.key: builder.submit(request) for request in remaining_plan.builds
+    }
+    jobs = [
+        (job, build_futures[request.key]) for job, request in remaining_plan.jobs
+    ]
 
+    if args.resume:
+        run_id = args.resume
+    else:
+        run_id = result_store.create_run(
+            {
+                "argv": sys.argv[1:],
+                "matrix": args.matrix,
+                "suites": [suite.name for suite in suites],
+                "engines": [dist.name for dist in js_dist_managers],
+                "abis": abis,
+                "devices": scheduler.serials,
+            }
+        )
+    logger.info("Run ID: {}\n".format(run_id))
+    dists_by_name = {dist.name: dist for dist in js_dist_managers}
+    profile_dir = get_profile_dir(args.result_store, run_id)
+    profile_results = []
+
+    def on_result(job_result: JobResult):
+        job = job_result.job
+        if job.profile:
+            profile_results.append(job_result)
+            return []
+        dist = dists_by_name[job.dist]
+        result_store.add(
+            ResultRecord(
+                run_id=run_id,
+                suite=job.suite,
+                parameter=job.parameter,
+                engine=dist.name,
+                dist_id=dist.dist_id,
+                dist_version=dist.info["version"],
+                abi=dist.install_props["abi"] or job_result.device["abi"],
+                device_serial=job_result.serial,
+                device_model=job_result.device["model"],
+                iteration=job.iteration,
+                timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                metrics=job_result.result,
+                duration=job_result.duration,
+            )
+        )
+        extra_jobs = iteration_control.add(job_result)
+        report.add(job_result)
+        return extra_jobs
+
+    failed_jobs = []
+
+    def on_error(job: Job, error):
+        logger.error("Job failed - {}: {}".format(job, error))
+        failed_jobs.append(job)
+
+    device_states = []
+    try:
+        if args.prepare_devices or args.pin_frequencies:
+            for serial in scheduler.serials:
+                device_state = DeviceStateController(serial)
+                device_states.append(device_state)
+                device_state.prepare(pin_frequencies=args.pin_frequencies)
+        scheduler.run(
+            jobs,
+            JobRunner(
+                suites,
+                js_dist_managers,
+                max_battery_temperature=args.max_battery_temp,
+                cooldown_timeout=args.cooldown_timeout,
+                profile_dir=profile_dir,
+            ),
+            on_result=on_result,
+            on_error=on_error,
+        )
+        report.flush([job for job in failed_jobs if not job.profile])
+        report.report_curves()
+        if len(profile_results) > 0:
+            write_profile_summaries(
+                profile_dir, report.report_profiles(profile_results)
+            )
+    finally:
+        for device_state in device_states:
+            device_state.restore()
+        builder.shutdown()
+        result_store.close()
+
+    if len(failed_jobs) > 0:
+        logger.error(
+            "{} job(s) failed, rerun them with `--resume {}`".format(
+                len(failed_jobs), run_id
+            )
+        )
+        return 1
     return 0
 
 
 if __name__ == "__main__":
     os.chdir(ROOT_DIR)
-    main()
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import unittest
+from lib.compare import HIGHER_IS_BETTER, LOWER_IS_BETTER, RegressionDetector
+from lib.stats import mann_whitney_min_p_value
+
+
+class RegressionDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self.detector = RegressionDetector(None, [], threshold=0.05, alpha=0.05)
+
+    def compare(self, direction, baseline, candidate):
+        return self.detector._compare_metric(
+            "Suite", 1, "engine", "metric", direction, baseline, candidate
+        )
+
+    def test_three_vs_three_cannot_reach_alpha_with_u_test(self):
+        self.assertAlmostEqual(mann_whitney_min_p_value(3, 3), 0.1)
+
+    def test_three_vs_three_regressions(self):
+        tti = self.compare(LOWER_IS_BETTER, [2000, 2010, 1990], [2990, 3000, 2980])
+        self.assertTrue(tti.is_regression)
+        self.assertIsNone(tti.p_value)
+        self.assertGreater(tti.median_diff_ci[0], 0)
+
+        throughput = self.compare(HIGHER_IS_BETTER, [800, 810, 790], [400, 405, 398])
+        self.assertTrue(throughput.is_regression)
+
+    def test_three_vs_three_noise(self):
+        comparison = self.compare(
+            LOWER_IS_BETTER, [2000, 2300, 1900], [2100, 1950, 2250]
+        )
+        self.assertFalse(comparison.is_regression)
+
+    def test_three_vs_three_improvement(self):
+        comparison = self.compare(
+            LOWER_IS_BETTER, [2990, 3000, 2980], [2000, 2010, 1990]
+        )
+        self.assertFalse(comparison.is_regression)
+
+    def test_u_test_with_enough_samples(self):
+        baseline = [2000, 2010, 1990, 2005, 1995, 2002, 1998, 2008, 1992]
+        comparison = self.compare(LOWER_IS_BETTER, baseline, [2990, 3000, 2980])
+        self.assertTrue(comparison.is_regression)
+        self.assertLess(comparison.p_value, 0.05)
+        self.assertIsNone(comparison.median_diff_ci)
+
+
+if __name__ == "__main__":
+    unittest.main()
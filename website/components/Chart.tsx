@@ -66,6 +66,7 @@ export default function ChartWithSection(props: Props) {
     labels: props.data.testGroups,
     datasets: props.data.dataSet.map((data) => ({
       label: data.jsEngine,
+      // NOTE: Chart.js skips the bar of a null value
       data: data.groupData,
       backgroundColor: getBackgroundColor(data.jsEngine),
     })),
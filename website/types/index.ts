@@ -6,5 +6,6 @@ export interface ChartData {
 
 export interface ChartDataGroupSet {
   jsEngine: string;
-  groupData: string[] | number[];
+  // NOTE: null when the engine has no result for the test group
+  groupData: string[] | (number | null)[];
 }